@@ -23,6 +23,26 @@ hiddenimports = [
     'json',
     'struct',
     'can_protocol_config',
+    'can_frames',
+    'can_backends',
+    'can_batch_decoder',
+    'can_ui_queue',
+    'can_log_buffer',
+    'can_capture',
+    'can_statistics',
+    'can_watchdog',
+    'can_timeseries',
+    'can_plot',
+    'can_acquisition',
+    'can_timebase',
+    'can_acceptance',
+    'can_dispatcher',
+    'can_tx_scheduler',
+    'can_trace_io',
+    'can_headless',
+    'can_offline_decode',
+    'can_cell_analytics',
+    'can_delta',
 ]
 
 # 分析
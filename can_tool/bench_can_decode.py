@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CAN报文解析性能测试
+
+用虚拟总线的模拟BMS报文（16个电池地址）反复调用parse_can_message，输出帧/秒。
+装有numpy时同时测试整批解码（can_batch_decoder）的帧/秒。
+用法: python bench_can_decode.py [轮数]
+      python bench_can_decode.py --replay 录制文件.cancap [倍速，默认0即最快]
+"""
+
+import sys
+import time
+
+from can_backends import ReplayCANBus, build_virtual_bms_frames
+from can_batch_decoder import NUMPY_AVAILABLE, decode_batch
+from can_frames import CANFrameBatch
+from can_protocol_config import FIXED_ID_PARSERS, parse_can_message
+
+
+def bench_parse_can_message(rounds=200):
+    """返回 (总帧数, 耗时秒, 帧/秒)"""
+    frames = [(can_id, bytes(data)) for can_id, data in build_virtual_bms_frames()]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for can_id, data in frames:
+            parse_can_message(can_id, data)
+    elapsed = time.perf_counter() - start
+    total = rounds * len(frames)
+    return total, elapsed, total / elapsed
+
+
+def bench_by_family(rounds=200):
+    """按报文系列（0x21n、0x22n...）分别统计帧/秒"""
+    families = {}
+    for can_id, data in build_virtual_bms_frames():
+        key = can_id if can_id in FIXED_ID_PARSERS else can_id & 0xFF0
+        families.setdefault(key, []).append((can_id, bytes(data)))
+    results = {}
+    for key, frames in sorted(families.items()):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for can_id, data in frames:
+                parse_can_message(can_id, data)
+        elapsed = time.perf_counter() - start
+        results[key] = rounds * len(frames) / elapsed
+    return results
+
+
+def bench_decode_batch(rounds=200, batch_size=2500):
+    """整批向量化解码，返回 (总帧数, 耗时秒, 帧/秒)"""
+    frames = build_virtual_bms_frames()
+    frames = (frames * (batch_size // len(frames) + 1))[:batch_size]
+    batch = CANFrameBatch.from_frames(frames)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decode_batch(batch)
+    elapsed = time.perf_counter() - start
+    total = rounds * len(batch)
+    return total, elapsed, total / elapsed
+
+
+def bench_replay(filename, speed=0):
+    """把录制文件经回放总线送入parse_can_message，返回 (回放统计, 解析帧数, 解码帧/秒)"""
+    bus = ReplayCANBus(filename, speed=speed)
+    bus.connect()
+    parsed = 0
+    decode_time = 0.0
+    try:
+        while True:
+            batch = bus.receive(timeout=100)
+            if not batch:
+                if bus.finished:
+                    break
+                continue
+            start = time.perf_counter()
+            for frame in batch:
+                if parse_can_message(frame.id, frame.data) is not None:
+                    parsed += 1
+            decode_time += time.perf_counter() - start
+        stats = bus.stats()
+    finally:
+        bus.disconnect()
+    return stats, parsed, stats['frames'] / decode_time if decode_time > 0 else 0
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--replay':
+        speed = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+        stats, parsed, decode_rate = bench_replay(sys.argv[2], speed)
+        print(f"回放: {stats['frames']} 帧 (解析 {parsed}), 耗时 {stats['elapsed']:.3f} s, "
+              f"{stats['fps']:,.0f} 帧/秒, 解码 {decode_rate:,.0f} 帧/秒")
+        return
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    total, elapsed, rate = bench_parse_can_message(rounds)
+    print(f"parse_can_message: {total} 帧, 耗时 {elapsed:.3f} s, {rate:,.0f} 帧/秒")
+    for key, family_rate in bench_by_family(rounds).items():
+        print(f"  0x{key:03X}: {family_rate:,.0f} 帧/秒")
+    if NUMPY_AVAILABLE:
+        total, elapsed, rate = bench_decode_batch(rounds)
+        print(f"decode_batch: {total} 帧, 耗时 {elapsed:.3f} s, {rate:,.0f} 帧/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+硬件验收滤波
+
+由解码器支持的ID（加上用户指定的额外ID）计算验收码/屏蔽码，交给CAN控制器过滤，
+无关报文不经过USB/套接字，也不进入Python接收循环。屏蔽码按SJA1000约定：位为1表示该位不比较。
+先按ID高7位（同一系列的16个地址）分组，再反复合并“合并后多接收的ID最少”的两组，
+直到不超过硬件支持的过滤器数。过滤器是粗筛，process_received_message仍按注册表精确判断。
+只处理11位标准帧ID；包含扩展帧ID时不设置硬件滤波。
+"""
+
+import struct
+from collections import namedtuple
+
+from can_protocol_config import (DECODER_REGISTRY, ACCEPTANCE_EXTRA_IDS,
+                                 ACCEPTANCE_MAX_FILTERS_SJA1000, ACCEPTANCE_MAX_FILTERS_SOCKETCAN)
+
+STANDARD_ID_MASK = 0x7FF
+STANDARD_ID_COUNT = STANDARD_ID_MASK + 1
+
+# VCI_INIT_CONFIG.Filter：0为双滤波，1为单滤波
+SJA1000_DUAL_FILTER = 0
+SJA1000_SINGLE_FILTER = 1
+# 不滤波时的初始化参数 (AccCode, AccMask, Filter)
+SJA1000_ACCEPT_ALL = (0x80000008, 0xFFFFFFFF, SJA1000_DUAL_FILTER)
+
+# struct can_filter中的扩展帧标志
+CAN_EFF_FLAG = 0x80000000
+
+AcceptanceFilter = namedtuple('AcceptanceFilter', ['code', 'mask'])
+
+
+def acceptance_ids(extra_ids=None):
+    """需要接收的ID：解码器支持的全部ID + 额外ID"""
+    extra_ids = ACCEPTANCE_EXTRA_IDS if extra_ids is None else extra_ids
+    return set(DECODER_REGISTRY) | set(extra_ids)
+
+
+def parse_can_id_list(text):
+    """解析逗号或空格分隔的十六进制ID列表，如 "0x305, 307" """
+    return [int(item, 16) for item in text.replace(',', ' ').split()]
+
+
+def filter_size(acceptance_filter):
+    """一个过滤器接收的标准ID个数"""
+    return 1 << bin(acceptance_filter.mask & STANDARD_ID_MASK).count('1')
+
+
+def merge_filters(a, b):
+    """能同时接收a和b的最小过滤器"""
+    mask = (a.mask | b.mask | (a.code ^ b.code)) & STANDARD_ID_MASK
+    return AcceptanceFilter(a.code & ~mask & STANDARD_ID_MASK, mask)
+
+
+def build_acceptance_filters(can_ids, max_filters=ACCEPTANCE_MAX_FILTERS_SJA1000):
+    """
+    计算覆盖can_ids的不超过max_filters个过滤器
+    Returns:
+        [AcceptanceFilter]；ID为空或包含扩展帧ID时返回None（不滤波）
+    """
+    can_ids = set(can_ids)
+    if not can_ids or max(can_ids) > STANDARD_ID_MASK or max_filters < 1:
+        return None
+    groups = {}
+    for can_id in sorted(can_ids):
+        single = AcceptanceFilter(can_id, 0)
+        group = groups.get(can_id >> 4)
+        groups[can_id >> 4] = single if group is None else merge_filters(group, single)
+    filters = [groups[key] for key in sorted(groups)]
+
+    while len(filters) > max_filters:
+        best = None
+        for i in range(len(filters)):
+            for j in range(i + 1, len(filters)):
+                merged = merge_filters(filters[i], filters[j])
+                cost = filter_size(merged) - filter_size(filters[i]) - filter_size(filters[j])
+                if best is None or cost < best[0]:
+                    best = (cost, i, j, merged)
+        _cost, i, j, merged = best
+        filters[i] = merged
+        del filters[j]
+    return filters
+
+
+def acceptance_table(filters):
+    """按标准ID索引的接收表（bytearray，1为接收），filters为None时返回None"""
+    if filters is None:
+        return None
+    table = bytearray(STANDARD_ID_COUNT)
+    for can_id in range(STANDARD_ID_COUNT):
+        for f in filters:
+            if not (can_id ^ f.code) & ~f.mask & STANDARD_ID_MASK:
+                table[can_id] = 1
+                break
+    return table
+
+
+def accepted_count(filters):
+    """过滤器实际接收的标准ID个数"""
+    if filters is None:
+        return STANDARD_ID_COUNT
+    return sum(acceptance_table(filters))
+
+
+def sja1000_acceptance(filters):
+    """
+    过滤器 -> VCI_INIT_CONFIG的(AccCode, AccMask, Filter)
+    单滤波: ACR0..ACR1高3位为ID，其余位（RTR和数据字节）不比较
+    双滤波: 滤波器1在ACR0/ACR1（低4位与ACR3低4位为数据字节1，不比较），滤波器2在ACR2/ACR3高3位
+    """
+    if not filters:
+        return SJA1000_ACCEPT_ALL
+    if len(filters) > 2:
+        raise ValueError("SJA1000最多支持两组验收滤波")
+    if len(filters) == 1:
+        f = filters[0]
+        return f.code << 21, (f.mask << 21) | 0x001FFFFF, SJA1000_SINGLE_FILTER
+    first, second = filters
+    acc_code = (first.code << 21) | (second.code << 5)
+    acc_mask = (first.mask << 21) | (0x1F << 16) | (second.mask << 5) | 0x1F
+    return acc_code, acc_mask, SJA1000_DUAL_FILTER
+
+
+def socketcan_filters(filters):
+    """
+    过滤器 -> CAN_RAW_FILTER套接字选项（struct can_filter数组）
+    SocketCAN的can_mask位为1表示比较，扩展帧标志也参与比较，只接收标准帧
+    """
+    if not filters:
+        return struct.pack('=II', 0, 0)
+    return b''.join(struct.pack('=II', f.code, (~f.mask & STANDARD_ID_MASK) | CAN_EFF_FLAG)
+                    for f in filters)
+
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+多设备/多通道并发采集
+
+每个(设备, 通道)一个接收线程，收到的批次打上通道号和主机接收时间后放入共享队列，
+由一个解码线程取出：
+- on_batch(channel, batch, host_time): 按批处理（录制、统计），保持各通道内的顺序
+- on_frames(frames): 把一次取出的全部批次按帧时间归并成一条时间线，
+  frames为按时间排序的TaggedFrame列表
+帧时间由各通道的DeviceTimebase把设备时间戳（处理回绕）换算到主机单调时钟，
+各通道因此可以直接比较，Unix时间用can_timebase.monotonic_to_wall换算。
+"""
+
+import heapq
+import queue
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from can_backends import create_can_bus, VCI_USBCAN2
+from can_frames import FRAME_STRUCT
+from can_timebase import DeviceTimebase
+
+# 接收线程到解码线程的队列长度（批次数），队列满时丢弃新批次并计数
+ACQ_QUEUE_SIZE = 1024
+# 解码线程单次最多取出的批次数
+ACQ_DRAIN_LIMIT = 64
+
+TaggedFrame = namedtuple('TaggedFrame', ['time', 'channel', 'id', 'data', 'dlc'])
+
+
+def parse_channel_specs(backend, text):
+    """
+    解析通道列表，返回各通道的总线参数
+    - canalyst: "设备索引:通道, ..."，如 "0:0,0:1,1:0"
+    - socketcan: 接口名，如 "can0,can1"
+    - virtual: 虚拟通道名，如 "virtual0,virtual1"
+    """
+    specs = []
+    for item in text.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if backend == 'canalyst':
+            device_index, _, can_index = item.partition(':')
+            specs.append({'device_type': VCI_USBCAN2, 'device_index': int(device_index),
+                          'can_index': int(can_index or 0)})
+        else:
+            specs.append({'channel': item})
+    if not specs:
+        raise ValueError(f"通道列表为空: {text!r}")
+    return specs
+
+
+def create_channel_buses(backend, text, **kwargs):
+    """按通道列表创建总线，返回 {通道号: 总线}，通道号按列表顺序从0编号"""
+    return {channel: create_can_bus(backend, **dict(kwargs, **spec))
+            for channel, spec in enumerate(parse_channel_specs(backend, text))}
+
+
+def batch_frames(channel, batch, host_time, timebase=None):
+    """
+    把一个批次展开为TaggedFrame列表
+    timebase为该通道的DeviceTimebase，未给出时只按本批次换算（以最后一帧为基准回推）
+    """
+    fields = list(FRAME_STRUCT.iter_unpack(batch.raw))
+    if timebase is None:
+        timebase = DeviceTimebase()
+    times = timebase.convert_ticks([f[1] for f in fields], host_time)
+    return [TaggedFrame(t, channel, can_id, data[:dlc], dlc)
+            for (can_id, _ticks, _tf, _st, _rf, _ef, dlc, data, _r), t in zip(fields, times)]
+
+
+def merge_tagged_batches(items, timebases=None):
+    """多个(通道, 批次, 接收时间)归并为按时间排序的TaggedFrame列表，timebases为{通道号: DeviceTimebase}"""
+    timebases = {} if timebases is None else timebases
+    frames = [batch_frames(channel, batch, host_time, timebases.get(channel))
+              for channel, batch, host_time in items]
+    if len(frames) == 1:
+        return frames[0]
+    return list(heapq.merge(*frames))
+
+
+class MultiChannelAcquisition:
+    """
+    多通道并发采集
+    buses: {通道号: 总线}，通道号会写入录制文件的channel字段（0~255）
+    回调都在解码线程中执行
+    log: 接收/解码错误的输出函数log(文本)，默认写到标准错误（标准输出可能是数据流）
+    """
+
+    def __init__(self, buses, on_frames=None, on_batch=None, receive_timeout=100,
+                 queue_size=ACQ_QUEUE_SIZE, log=None):
+        self.buses = dict(buses)
+        self.log = log or (lambda message: print(message, file=sys.stderr))
+        self.on_frames = on_frames
+        self.on_batch = on_batch
+        self.receive_timeout = receive_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._decode_thread = None
+        self._running = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.frames = {channel: 0 for channel in self.buses}
+        self.timebases = {channel: DeviceTimebase() for channel in self.buses}
+        self.batches = {channel: 0 for channel in self.buses}
+        self.dropped = {channel: 0 for channel in self.buses}
+        self.decode_time = 0.0
+        self.start_time = time.monotonic()
+        self._last_stats = (self.start_time, 0)
+
+    def connect(self, baudrate=500000):
+        """连接全部通道，任一通道失败时断开已连接的通道并抛出异常"""
+        connected = []
+        try:
+            for channel, bus in self.buses.items():
+                bus.connect(baudrate)
+                connected.append(bus)
+        except Exception as e:
+            for bus in connected:
+                bus.disconnect()
+            raise Exception(f"通道{channel}连接失败: {str(e)}")
+        return True
+
+    def disconnect(self):
+        self.stop()
+        for bus in self.buses.values():
+            bus.disconnect()
+
+    @property
+    def is_running(self):
+        return self._running
+
+    def start(self):
+        """启动各通道的接收线程和解码线程"""
+        if self._running:
+            return
+        self._running = True
+        self.reset_stats()
+        self._decode_thread = threading.Thread(target=self._decode_loop, name='can-decode', daemon=True)
+        self._decode_thread.start()
+        for channel, bus in self.buses.items():
+            thread = threading.Thread(target=self._receive_loop, args=(channel, bus),
+                                      name=f'can-rx-{channel}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """停止接收，等待解码线程处理完队列中剩余的批次"""
+        if not self._running:
+            return
+        self._running = False
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+        self._queue.put(None)
+        self._decode_thread.join(timeout=5)
+        self._decode_thread = None
+
+    def _receive_loop(self, channel, bus):
+        put = self._queue.put_nowait
+        while self._running:
+            try:
+                batch = bus.receive(self.receive_timeout)
+            except Exception as e:
+                self.log(f"通道{channel}接收错误: {str(e)}")
+                time.sleep(0.1)
+                continue
+            if not batch:
+                if getattr(bus, 'finished', False):
+                    break
+                continue
+            host_time = batch.host_time if batch.host_time is not None else time.monotonic()
+            self.frames[channel] += len(batch)
+            self.batches[channel] += 1
+            try:
+                put((channel, batch, host_time))
+            except queue.Full:
+                self.dropped[channel] += len(batch)
+
+    def _decode_loop(self):
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+        stopping = False
+        while not stopping:
+            item = get()
+            if item is None:
+                break
+            items = [item]
+            while len(items) < ACQ_DRAIN_LIMIT:
+                try:
+                    item = get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                items.append(item)
+            started = time.perf_counter()
+            try:
+                self.process_items(items)
+            except Exception as e:
+                self.log(f"多通道解码错误: {str(e)}")
+            self.decode_time += time.perf_counter() - started
+
+    def process_items(self, items):
+        """处理一组(通道, 批次, 接收时间)"""
+        if self.on_batch is not None:
+            for channel, batch, host_time in items:
+                self.on_batch(channel, batch, host_time)
+        if self.on_frames is not None:
+            self.on_frames(merge_tagged_batches(items, self.timebases))
+
+    def stats(self):
+        """
+        采集吞吐
+        Returns:
+            {'channels': {通道号: {'frames', 'dropped', 'fps'}}, 'frames', 'dropped',
+             'elapsed', 'fps', 'recent_fps'}，recent_fps为距上次调用stats()的帧率
+        """
+        now = time.monotonic()
+        elapsed = max(now - self.start_time, 1e-9)
+        total = sum(self.frames.values())
+        last_time, last_total = self._last_stats
+        recent = (total - last_total) / (now - last_time) if now > last_time else 0.0
+        self._last_stats = (now, total)
+        return {
+            'channels': {channel: {'frames': self.frames[channel], 'dropped': self.dropped[channel],
+                                   'fps': self.frames[channel] / elapsed}
+                         for channel in self.buses},
+            'frames': total,
+            'dropped': sum(self.dropped.values()),
+            'elapsed': elapsed,
+            'fps': total / elapsed,
+            'recent_fps': recent,
+        }
@@ -0,0 +1,659 @@
+# -*- coding: utf-8 -*-
+"""
+CAN总线后端
+
+所有后端提供相同的接口：connect(baudrate) / disconnect() / send(can_id, data) /
+send_many(frames) / receive(timeout) -> CANFrameBatch / set_acceptance_ids(can_ids)，
+由CANHostComputer按名称选择：
+- canalyst:  创芯科技CANalyst-II（ControlCAN.dll，仅Windows）
+- socketcan: Linux SocketCAN（含vcan虚拟接口）
+- virtual:   进程内虚拟总线，支持按固定帧率注入模拟BMS报文
+- replay:    回放.cancap录制文件，按原始帧间隔（可加速）或尽可能快地送出
+"""
+
+import ctypes
+from ctypes import *
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+from can_acceptance import (build_acceptance_filters, acceptance_table, sja1000_acceptance,
+                             socketcan_filters, ACCEPTANCE_MAX_FILTERS_SJA1000,
+                             ACCEPTANCE_MAX_FILTERS_SOCKETCAN)
+from can_capture import CaptureReader, FLAG_EXTENDED, FLAG_REMOTE
+from can_frames import CANFrameBatch, FRAME_STRUCT, FRAME_SIZE, TIMESTAMP_TICK, TIMESTAMP_TICK_US
+
+# 创芯科技CAN API常量
+VCI_USBCAN2 = 4
+STATUS_OK = 1
+
+# 接收缓冲区帧数（每个连接只分配一次）
+RX_BUFFER_SIZE = 2500
+# 发送缓冲区帧数（单次VCI_Transmit最多提交的帧数）
+TX_BUFFER_SIZE = 64
+# 发送帧的SendType：1表示单次发送，不自动重发
+TX_SEND_TYPE = 1
+
+class VCI_INIT_CONFIG(Structure):  
+    _fields_ = [("AccCode", c_uint),
+                ("AccMask", c_uint),
+                ("Reserved", c_uint),
+                ("Filter", c_ubyte),
+                ("Timing0", c_ubyte),
+                ("Timing1", c_ubyte),
+                ("Mode", c_ubyte)
+                ]  
+
+class VCI_CAN_OBJ(Structure):  
+    _fields_ = [("ID", c_uint),
+                ("TimeStamp", c_uint),
+                ("TimeFlag", c_ubyte),
+                ("SendType", c_ubyte),
+                ("RemoteFlag", c_ubyte),
+                ("ExternFlag", c_ubyte),
+                ("DataLen", c_ubyte),
+                ("Data", c_ubyte*8),
+                ("Reserved", c_ubyte*3)
+                ] 
+
+class VCI_CAN_OBJ_ARRAY(Structure):
+    _fields_ = [('SIZE', ctypes.c_uint16), ('STRUCT_ARRAY', ctypes.POINTER(VCI_CAN_OBJ))]
+
+    def __init__(self, num_of_structs):
+        self.STRUCT_ARRAY = ctypes.cast((VCI_CAN_OBJ * num_of_structs)(), ctypes.POINTER(VCI_CAN_OBJ))
+        self.SIZE = num_of_structs
+        self.ADDR = self.STRUCT_ARRAY[0]
+
+assert sizeof(VCI_CAN_OBJ) == FRAME_SIZE
+
+# 已打开设备的引用计数 (设备类型, 设备索引) -> 已连接通道数
+_device_refs = {}
+_device_lock = threading.Lock()
+
+class CANalystCANBus:
+    """创芯科技CAN总线类"""
+    def __init__(self, device_type=VCI_USBCAN2, device_index=0, can_index=0):
+        self.device_type = device_type
+        self.device_index = device_index
+        self.can_index = can_index
+        self.can_dll = None
+        self.is_connected = False
+        self._device_open = False
+        self._rx_buffer = None
+        self._tx_bytes = None
+        self._tx_buffer = None
+        self.filters = None  # 验收滤波，None表示全部接收
+        
+    def set_acceptance_ids(self, can_ids):
+        """设置需要接收的ID（None为全部接收），在connect时写入VCI_InitCAN"""
+        self.filters = None if can_ids is None else build_acceptance_filters(
+            can_ids, ACCEPTANCE_MAX_FILTERS_SJA1000)
+        
+    def connect(self, baudrate=500000):
+        """连接CAN设备"""
+        try:
+            # 加载DLL（仅Windows）
+            if not hasattr(ctypes, 'windll'):
+                raise Exception("ControlCAN.dll仅支持Windows，请选择socketcan或virtual后端")
+            self.can_dll = ctypes.windll.LoadLibrary('./ControlCAN.dll')
+            
+            # 打开设备（同一设备的两个通道共用一次打开）
+            self._open_device()
+                
+            # 设置波特率
+            timing0, timing1 = self.get_timing(baudrate)
+            
+            # 初始化CAN（验收码/屏蔽码由set_acceptance_ids计算）
+            acc_code, acc_mask, filter_mode = sja1000_acceptance(self.filters)
+            vci_initconfig = VCI_INIT_CONFIG(acc_code, acc_mask, 0,
+                                           filter_mode, timing0, timing1, 0)
+            ret = self.can_dll.VCI_InitCAN(self.device_type, self.device_index, 
+                                          self.can_index, byref(vci_initconfig))
+            if ret != STATUS_OK:
+                raise Exception("初始化CAN失败")
+                
+            # 启动CAN
+            ret = self.can_dll.VCI_StartCAN(self.device_type, self.device_index, self.can_index)
+            if ret != STATUS_OK:
+                raise Exception("启动CAN失败")
+            
+            # 分配接收缓冲区，整个连接期间复用
+            self._rx_buffer = (VCI_CAN_OBJ * RX_BUFFER_SIZE)()
+            # 发送缓冲区与bytearray共享内存，按帧直接pack_into
+            self._tx_bytes = bytearray(TX_BUFFER_SIZE * FRAME_SIZE)
+            self._tx_buffer = (VCI_CAN_OBJ * TX_BUFFER_SIZE).from_buffer(self._tx_bytes)
+                
+            self.is_connected = True
+            return True
+            
+        except Exception as e:
+            self._close_device()
+            raise Exception(f"连接CAN设备失败: {str(e)}")
+    
+    def _open_device(self):
+        """按(设备类型, 设备索引)引用计数打开设备"""
+        key = (self.device_type, self.device_index)
+        with _device_lock:
+            if not _device_refs.get(key):
+                ret = self.can_dll.VCI_OpenDevice(self.device_type, self.device_index, 0)
+                if ret != STATUS_OK:
+                    raise Exception("打开设备失败")
+            _device_refs[key] = _device_refs.get(key, 0) + 1
+        self._device_open = True
+    
+    def _close_device(self):
+        """释放设备引用，最后一个通道断开时关闭设备，否则只复位本通道"""
+        if not self._device_open:
+            return
+        self._device_open = False
+        key = (self.device_type, self.device_index)
+        with _device_lock:
+            refs = _device_refs.get(key, 1) - 1
+            if refs > 0:
+                _device_refs[key] = refs
+                self.can_dll.VCI_ResetCAN(self.device_type, self.device_index, self.can_index)
+            else:
+                _device_refs.pop(key, None)
+                self.can_dll.VCI_CloseDevice(self.device_type, self.device_index)
+            
+    def get_timing(self, baudrate):
+        """根据波特率获取定时参数"""
+        timing_map = {
+            250000: (0x03, 0x1C),  # 250kbps
+            500000: (0x00, 0x1C),  # 500kbps
+        }
+        return timing_map.get(baudrate, (0x00, 0x1C))
+        
+    def send(self, can_id, data):
+        """发送CAN报文"""
+        if self.send_many(((can_id, data),)) != 1:
+            raise Exception("发送CAN报文失败")
+    
+    def send_many(self, frames):
+        """
+        批量发送CAN报文，多帧打包进预分配缓冲区后一次VCI_Transmit提交
+        Args:
+            frames: (can_id, data)序列
+        Returns:
+            实际发送成功的帧数
+        """
+        if not self.is_connected:
+            raise Exception("CAN设备未连接")
+        
+        buf = self._tx_bytes
+        sent = 0
+        count = 0
+        for can_id, data in frames:
+            data = bytes(data[:8])
+            FRAME_STRUCT.pack_into(buf, count * FRAME_SIZE, can_id, 0, 0, TX_SEND_TYPE, 0, 0,
+                                   len(data), data, b'\x00\x00\x00')
+            count += 1
+            if count == TX_BUFFER_SIZE:
+                sent += self._transmit(count)
+                count = 0
+        if count:
+            sent += self._transmit(count)
+        return sent
+    
+    def _transmit(self, count):
+        """提交发送缓冲区中的前count帧"""
+        ret = self.can_dll.VCI_Transmit(self.device_type, self.device_index, 
+                                       self.can_index, byref(self._tx_buffer), count)
+        return max(ret, 0)
+            
+    def receive(self, timeout=100):
+        """接收CAN报文，返回CANFrameBatch（只读视图）"""
+        if not self.is_connected:
+            return None
+            
+        try:
+            # 接收数据到预分配缓冲区
+            ret = self.can_dll.VCI_Receive(self.device_type, self.device_index, 
+                                          self.can_index, byref(self._rx_buffer), RX_BUFFER_SIZE, timeout)
+            host_time = time.monotonic()
+            
+            if ret > 0:
+                # 整批拷贝一次，之后的解包都基于这份只读数据
+                return CANFrameBatch(string_at(self._rx_buffer, ret * FRAME_SIZE), ret, host_time)
+            elif ret == 0:
+                # 超时，没有接收到数据
+                return None
+            else:
+                # 接收错误
+                print(f"VCI_Receive返回错误: {ret}", file=sys.stderr)
+                return None
+                
+        except Exception as e:
+            print(f"接收CAN报文错误: {str(e)}", file=sys.stderr)
+            return None
+        
+    def disconnect(self):
+        """断开连接"""
+        if self.can_dll and self.is_connected:
+            self._close_device()
+            self.is_connected = False
+            self._rx_buffer = None
+            self._tx_buffer = None
+            self._tx_bytes = None
+
+
+def _ticks(seconds):
+    """把秒数换算为VCI_CAN_OBJ.TimeStamp单位（32位回绕）"""
+    return int(seconds / TIMESTAMP_TICK) & 0xFFFFFFFF
+
+
+class SocketCANBus:
+    """Linux SocketCAN总线类（含vcan虚拟接口）"""
+    # struct can_frame: can_id(u32), can_dlc(u8), 3字节填充, data[8]
+    CAN_FRAME_STRUCT = struct.Struct('=IB3x8s')
+
+    def __init__(self, channel='can0'):
+        self.channel = channel
+        self.is_connected = False
+        self._sock = None
+        self._t0 = 0.0
+        self._frame_buf = bytearray(self.CAN_FRAME_STRUCT.size)
+        self._rx_bytes = bytearray(RX_BUFFER_SIZE * FRAME_SIZE)
+        self.filters = None
+
+    def set_acceptance_ids(self, can_ids):
+        """设置需要接收的ID（None为全部接收），已连接时立即生效"""
+        self.filters = None if can_ids is None else build_acceptance_filters(
+            can_ids, ACCEPTANCE_MAX_FILTERS_SOCKETCAN)
+        if self._sock is not None:
+            self._apply_filters()
+
+    def _apply_filters(self):
+        self._sock.setsockopt(socket.SOL_CAN_RAW, socket.CAN_RAW_FILTER, socketcan_filters(self.filters))
+
+    def connect(self, baudrate=500000):
+        """连接SocketCAN接口（波特率由系统配置，如 ip link set can0 type can bitrate 500000）"""
+        if not hasattr(socket, 'AF_CAN'):
+            raise Exception("当前系统不支持SocketCAN")
+        try:
+            self._sock = socket.socket(socket.AF_CAN, socket.SOCK_RAW, socket.CAN_RAW)
+            self._sock.bind((self.channel,))
+            self._sock.setblocking(False)
+            if self.filters is not None:
+                self._apply_filters()
+        except OSError as e:
+            if self._sock:
+                self._sock.close()
+                self._sock = None
+            raise Exception(f"连接SocketCAN接口 {self.channel} 失败: {str(e)}")
+        self._t0 = time.monotonic()
+        self.is_connected = True
+        return True
+
+    def send(self, can_id, data):
+        """发送CAN报文"""
+        if self.send_many(((can_id, data),)) != 1:
+            raise Exception("发送CAN报文失败")
+
+    def send_many(self, frames):
+        """批量发送CAN报文，返回实际发送成功的帧数"""
+        if not self.is_connected:
+            raise Exception("CAN设备未连接")
+        sent = 0
+        for can_id, data in frames:
+            data = bytes(data[:8])
+            if can_id > 0x7FF:
+                can_id |= socket.CAN_EFF_FLAG
+            try:
+                self._sock.send(self.CAN_FRAME_STRUCT.pack(can_id, len(data), data))
+            except (BlockingIOError, OSError):
+                break
+            sent += 1
+        return sent
+
+    def receive(self, timeout=100):
+        """接收CAN报文，返回CANFrameBatch"""
+        if not self.is_connected:
+            return None
+        readable, _, _ = select.select([self._sock], [], [], timeout / 1000.0)
+        if not readable:
+            return None
+
+        count = 0
+        while count < RX_BUFFER_SIZE:
+            try:
+                self._sock.recv_into(self._frame_buf)
+            except (BlockingIOError, InterruptedError):
+                break
+            raw_id, dlc, data = self.CAN_FRAME_STRUCT.unpack_from(self._frame_buf)
+            extern = 1 if raw_id & socket.CAN_EFF_FLAG else 0
+            remote = 1 if raw_id & socket.CAN_RTR_FLAG else 0
+            can_id = raw_id & (socket.CAN_EFF_MASK if extern else socket.CAN_SFF_MASK)
+            FRAME_STRUCT.pack_into(self._rx_bytes, count * FRAME_SIZE, can_id,
+                                   _ticks(time.monotonic() - self._t0), 1, 0, remote, extern,
+                                   dlc, data, b'\x00\x00\x00')
+            count += 1
+        if not count:
+            return None
+        return CANFrameBatch(bytes(memoryview(self._rx_bytes)[:count * FRAME_SIZE]), count,
+                             time.monotonic())
+
+    def disconnect(self):
+        """断开连接"""
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+        self.is_connected = False
+
+
+def build_virtual_bms_frames(battery_count=16):
+    """生成一轮模拟BMS报文（0x35x + 各电池地址的0x2nn/0x4nn），用于虚拟总线注入"""
+    pack = struct.pack
+    frames = [
+        (0x351, pack('<HHHH', 560, 123, 187, 440)),
+        (0x355, pack('<HHH2x', 80, 95, 8000)),
+        (0x356, pack('<hhh2x', 5125, -12, 250)),
+        (0x35A, bytes(8)),
+    ]
+    for addr in range(battery_count):
+        cells = [3300 + addr + i for i in range(16)]
+        frames += [
+            (0x200 + addr, pack('<BBHI', 2, 160, 0x0001, 0)),
+            (0x210 + addr, pack('<hHHh', -12, 51250, 51000, 255)),
+            (0x220 + addr, pack('<4H', *cells[0:4])),
+            (0x230 + addr, pack('<4H', *cells[4:8])),
+            (0x240 + addr, pack('<4H', *cells[8:12])),
+            (0x250 + addr, pack('<4H', *cells[12:16])),
+            (0x260 + addr, pack('<4h', 251, 252, 253, 254)),
+            (0x270 + addr, bytes(8)),
+            (0x400 + addr, pack('<3h2x', 301, 302, 303)),
+            (0x410 + addr, pack('<3h2x', 281, 282, 283)),
+            (0x420 + addr, pack('<BH', 190, 200) + (1234).to_bytes(3, 'little') + pack('<H', 0)),
+            (0x430 + addr, pack('<Ihh', 3600, 355, 345)),
+            (0x440 + addr, pack('<I', 3600) + (120000).to_bytes(3, 'little') + pack('<b', 40)),
+            (0x450 + addr, b'CTRL_FW_'),
+            (0x460 + addr, b'1.23\x00\x00\x00\x00'),
+            (0x470 + addr, b'BMS_FW_0'),
+            (0x480 + addr, b'.90\x00\x00\x00\x00\x00'),
+            (0x490 + addr, pack('<3h2x', 1, -2, 1000)),
+            (0x4A0 + addr, bytes([0x24, 0x0A, 0xC4, 0x00, 0x00, addr, addr, 0])),
+        ]
+    return frames
+
+
+class VirtualCANBus:
+    """
+    进程内虚拟CAN总线
+    - 同一channel上的多个实例互相收发（send的帧由其它节点receive）
+    - frame_rate > 0 时按固定帧率循环注入frames（默认模拟16个电池地址的BMS报文），
+      帧时间戳取计划注入时刻，便于测量下游管线的吞吐和延迟
+    """
+    _hubs = {}
+    _hubs_lock = threading.Lock()
+
+    def __init__(self, channel='virtual0', frame_rate=0, frames=None):
+        self.channel = channel
+        self.frame_rate = frame_rate
+        self.frames = frames
+        self.is_connected = False
+        self._rx_queue = deque()
+        self._rx_event = threading.Event()
+        self._rx_bytes = bytearray(RX_BUFFER_SIZE * FRAME_SIZE)
+        self._t0 = 0.0
+        self._inject_start = 0.0
+        self._injected = 0
+        self._accept = None  # 模拟硬件验收滤波的接收表
+
+    def set_acceptance_ids(self, can_ids):
+        """设置需要接收的ID（None为全部接收），模拟CANalyst-II的两组验收滤波"""
+        self._accept = None if can_ids is None else acceptance_table(
+            build_acceptance_filters(can_ids, ACCEPTANCE_MAX_FILTERS_SJA1000))
+
+    def _accepts(self, can_id):
+        accept = self._accept
+        return accept is None or (can_id < len(accept) and accept[can_id])
+
+    def connect(self, baudrate=500000):
+        """接入虚拟总线"""
+        with VirtualCANBus._hubs_lock:
+            VirtualCANBus._hubs.setdefault(self.channel, []).append(self)
+        if self.frames is None:
+            self.frames = build_virtual_bms_frames()
+        self._t0 = time.perf_counter()
+        self.set_frame_rate(self.frame_rate)
+        self.is_connected = True
+        return True
+
+    def set_frame_rate(self, frame_rate):
+        """修改注入帧率（帧/秒），0表示停止注入"""
+        self.frame_rate = frame_rate
+        self._inject_start = time.perf_counter()
+        self._injected = 0
+        self._rx_event.set()
+
+    def inject(self, can_id, data):
+        """直接向本节点注入一帧"""
+        self._rx_queue.append((can_id, bytes(data[:8]), time.perf_counter()))
+        self._rx_event.set()
+
+    def send(self, can_id, data):
+        """发送CAN报文"""
+        if self.send_many(((can_id, data),)) != 1:
+            raise Exception("发送CAN报文失败")
+
+    def send_many(self, frames):
+        """批量发送到同一通道上的其它节点，返回发送帧数"""
+        if not self.is_connected:
+            raise Exception("CAN设备未连接")
+        now = time.perf_counter()
+        frames = [(can_id, bytes(data[:8]), now) for can_id, data in frames]
+        with VirtualCANBus._hubs_lock:
+            peers = [bus for bus in VirtualCANBus._hubs.get(self.channel, ()) if bus is not self]
+        for bus in peers:
+            bus._rx_queue.extend(frames)
+            bus._rx_event.set()
+        return len(frames)
+
+    def _fill(self):
+        """把队列中和到期的注入帧写入接收缓冲区，返回帧数"""
+        buf = self._rx_bytes
+        t0 = self._t0
+        count = 0
+        queue = self._rx_queue
+        while queue and count < RX_BUFFER_SIZE:
+            can_id, data, t = queue.popleft()
+            if not self._accepts(can_id):
+                continue
+            FRAME_STRUCT.pack_into(buf, count * FRAME_SIZE, can_id, _ticks(t - t0), 1, 0, 0,
+                                   1 if can_id > 0x7FF else 0, len(data), data, b'\x00\x00\x00')
+            count += 1
+
+        rate = self.frame_rate
+        if rate > 0 and count < RX_BUFFER_SIZE:
+            due = int((time.perf_counter() - self._inject_start) * rate) - self._injected
+            due = min(due, RX_BUFFER_SIZE - count)
+            if due > 0:
+                frames = self.frames
+                n = len(frames)
+                start = self._inject_start - t0
+                k = self._injected
+                accept = self._accept
+                for _ in range(due):
+                    can_id, data = frames[k % n]
+                    k += 1
+                    if accept is not None and not self._accepts(can_id):
+                        continue
+                    FRAME_STRUCT.pack_into(buf, count * FRAME_SIZE, can_id, _ticks(start + (k - 1) / rate),
+                                           1, 0, 0, 1 if can_id > 0x7FF else 0, len(data), data,
+                                           b'\x00\x00\x00')
+                    count += 1
+                self._injected = k
+        return count
+
+    def receive(self, timeout=100):
+        """接收CAN报文，返回CANFrameBatch"""
+        if not self.is_connected:
+            return None
+        deadline = time.perf_counter() + timeout / 1000.0
+        while True:
+            self._rx_event.clear()
+            count = self._fill()
+            if count:
+                return CANFrameBatch(bytes(memoryview(self._rx_bytes)[:count * FRAME_SIZE]), count,
+                             time.monotonic())
+            now = time.perf_counter()
+            if now >= deadline or not self.is_connected:
+                return None
+            wait = deadline - now
+            if self.frame_rate > 0:
+                next_due = self._inject_start + (self._injected + 1) / self.frame_rate
+                wait = min(wait, max(next_due - now, 0))
+            self._rx_event.wait(wait)
+
+    def disconnect(self):
+        """断开连接"""
+        with VirtualCANBus._hubs_lock:
+            nodes = VirtualCANBus._hubs.get(self.channel, [])
+            if self in nodes:
+                nodes.remove(self)
+            if not nodes:
+                VirtualCANBus._hubs.pop(self.channel, None)
+        self.is_connected = False
+        self._rx_event.set()
+
+
+class ReplayCANBus:
+    """
+    录制文件回放总线
+    - speed=1按原始帧间隔回放，speed=N为N倍速，speed<=0尽可能快地送出
+    - 帧时间戳由录制时间（0.1ms单位，取低32位）生成，帧间隔与原始现场一致
+    - 回放结束后finished为True，stats()给出回放帧数、耗时和帧/秒
+    """
+
+    def __init__(self, filename, speed=1.0, channel=None):
+        self.filename = filename
+        self.speed = speed
+        self.channel = channel  # 只回放该通道，None表示全部
+        self.is_connected = False
+        self.finished = False
+        self.frames_replayed = 0
+        self._reader = None
+        self._records = None
+        self._next = None
+        self._first_us = 0
+        self._start = 0.0
+        self._end = None
+        self._rx_bytes = bytearray(RX_BUFFER_SIZE * FRAME_SIZE)
+        self._accept = None
+
+    def set_acceptance_ids(self, can_ids):
+        """设置需要接收的ID（None为全部回放），模拟CANalyst-II的两组验收滤波"""
+        self._accept = None if can_ids is None else acceptance_table(
+            build_acceptance_filters(can_ids, ACCEPTANCE_MAX_FILTERS_SJA1000))
+
+    def connect(self, baudrate=500000):
+        """打开录制文件，从第一帧开始回放"""
+        self._reader = CaptureReader(self.filename)
+        self._records = iter(self._reader)
+        self._next = self._next_record()
+        self._first_us = self._next.timestamp_us if self._next else 0
+        self._start = time.perf_counter()
+        self._end = None
+        self.frames_replayed = 0
+        self.finished = self._next is None
+        self.is_connected = True
+        return True
+
+    def _next_record(self):
+        accept = self._accept
+        for record in self._records:
+            if self.channel is not None and record.channel != self.channel:
+                continue
+            if accept is not None and (record.can_id >= len(accept) or not accept[record.can_id]):
+                continue
+            return record
+        return None
+
+    def _due(self, record):
+        """该帧按回放速度应送出的时刻（perf_counter）"""
+        return self._start + (record.timestamp_us - self._first_us) / 1e6 / self.speed
+
+    def send(self, can_id, data):
+        """回放总线不发送，直接丢弃"""
+        return True
+
+    def send_many(self, frames):
+        """回放总线不发送，直接丢弃，返回帧数"""
+        return len(frames)
+
+    def _fill(self, now):
+        """把到期的录制帧写入接收缓冲区，返回帧数"""
+        buf = self._rx_bytes
+        fast = self.speed <= 0
+        count = 0
+        record = self._next
+        while record is not None and count < RX_BUFFER_SIZE and (fast or self._due(record) <= now):
+            FRAME_STRUCT.pack_into(buf, count * FRAME_SIZE, record.can_id,
+                                   (record.timestamp_us // TIMESTAMP_TICK_US) & 0xFFFFFFFF, 1, 0,
+                                   1 if record.flags & FLAG_REMOTE else 0,
+                                   1 if record.flags & FLAG_EXTENDED else 0,
+                                   record.dlc, record.data, b'\x00\x00\x00')
+            count += 1
+            record = self._next_record()
+        self._next = record
+        self.frames_replayed += count
+        if record is None and not self.finished:
+            self.finished = True
+            self._end = time.perf_counter()
+        return count
+
+    def receive(self, timeout=100):
+        """接收CAN报文，返回CANFrameBatch"""
+        if not self.is_connected:
+            return None
+        deadline = time.perf_counter() + timeout / 1000.0
+        while True:
+            now = time.perf_counter()
+            count = self._fill(now)
+            if count:
+                return CANFrameBatch(bytes(memoryview(self._rx_bytes)[:count * FRAME_SIZE]), count,
+                             time.monotonic())
+            wake = deadline if self._next is None else min(deadline, self._due(self._next))
+            if now >= deadline:
+                return None
+            time.sleep(max(wake - now, 0))
+
+    def stats(self):
+        """回放统计：帧数、耗时（秒）、帧/秒、录制时长（秒）"""
+        end = self._end if self._end is not None else time.perf_counter()
+        elapsed = max(end - self._start, 1e-9)
+        return {
+            'frames': self.frames_replayed,
+            'elapsed': elapsed,
+            'fps': self.frames_replayed / elapsed,
+            'finished': self.finished,
+        }
+
+    def disconnect(self):
+        """断开连接，关闭录制文件"""
+        self.is_connected = False
+        self._records = None
+        self._next = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+
+# 后端名称 -> 总线类
+CAN_BACKENDS = {
+    'canalyst': CANalystCANBus,
+    'socketcan': SocketCANBus,
+    'virtual': VirtualCANBus,
+    'replay': ReplayCANBus,
+}
+
+
+def create_can_bus(backend, **kwargs):
+    """按名称创建CAN总线后端"""
+    if backend not in CAN_BACKENDS:
+        raise Exception(f"未知的CAN后端: {backend}")
+    return CAN_BACKENDS[backend](**kwargs)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+CAN报文批量解码（需要numpy）
+
+把一次接收得到的整批报文按报文系列分组，每组的每个信号用一次向量化运算解出，
+输出列式数组：{报文系列基础ID: {'can_id', 'timestamp', 'battery_address', 信号名...}}。
+只处理MESSAGE_CODECS中已编译的数值型报文（0x21n电流电压、0x22n~0x25n电芯电压、
+0x26n电芯温度等）；位标志和字符串报文仍需逐帧调用parse_can_message。
+"""
+
+from can_frames import CANFrameBatch
+from can_protocol_config import ADDRESSED_PARSERS, DECODER_REGISTRY, MESSAGE_CODECS
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# 11位标准帧ID数量
+STANDARD_ID_COUNT = 0x800
+
+# data_type -> numpy类型（小端），uint24单独处理
+FIELD_DTYPES = {
+    'uint8': 'u1', 'int8': 'i1',
+    'uint16': '<u2', 'int16': '<i2', 'un16': '<u2', 'sn16': '<i2',
+    'uint32': '<u4', 'int32': '<i4',
+}
+
+
+def build_family_table():
+    """CAN ID -> 报文系列基础ID（MESSAGE_CODECS的键），不可批量解码的ID为-1"""
+    table = np.full(STANDARD_ID_COUNT, -1, dtype=np.int32)
+    for can_id, (_parser, battery_address) in DECODER_REGISTRY.items():
+        base_id = can_id & 0xFF0 if battery_address is not None else can_id
+        if base_id in MESSAGE_CODECS and can_id < STANDARD_ID_COUNT:
+            table[can_id] = base_id
+    return table
+
+
+FAMILY_TABLE = build_family_table() if NUMPY_AVAILABLE else None
+
+
+def decode_field(data, offset, data_type, scale=1):
+    """从(n, 8)的数据字节矩阵中解出一列信号"""
+    if data_type == 'uint24':
+        column = (data[:, offset].astype(np.uint32)
+                  | data[:, offset + 1].astype(np.uint32) << 8
+                  | data[:, offset + 2].astype(np.uint32) << 16)
+    else:
+        dtype = np.dtype(FIELD_DTYPES[data_type])
+        column = np.ascontiguousarray(data[:, offset:offset + dtype.itemsize]).view(dtype)[:, 0]
+    if scale != 1:
+        column = column * scale
+    return column
+
+
+def decode_batch(frames):
+    """
+    批量解码
+    Args:
+        frames: CANFrameBatch，或VCI_CAN_OBJ_DTYPE结构化数组
+    Returns:
+        {报文系列基础ID: {列名: numpy数组}}，DLC不足的帧被丢弃
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("批量解码需要numpy")
+    records = frames.to_numpy() if isinstance(frames, CANFrameBatch) else frames
+    if not len(records):
+        return {}
+
+    ids = records['ID']
+    family = np.full(len(ids), -1, dtype=np.int32)
+    standard = (ids < STANDARD_ID_COUNT) & (records['ExternFlag'] == 0)
+    family[standard] = FAMILY_TABLE[ids[standard]]
+
+    # 按系列稳定排序后切分，组内保持接收顺序
+    order = np.argsort(family, kind='stable')
+    sorted_family = family[order]
+    bounds = np.flatnonzero(np.diff(sorted_family)) + 1
+
+    result = {}
+    for group in np.split(order, bounds):
+        base_id = int(family[group[0]])
+        if base_id < 0:
+            continue
+        codec = MESSAGE_CODECS[base_id]
+        subset = records[group]
+        complete = subset['DataLen'] >= codec.struct.size
+        if not complete.all():
+            subset = subset[complete]
+            if not len(subset):
+                continue
+
+        data = subset['Data']
+        columns = {'can_id': subset['ID'], 'timestamp': subset['TimeStamp']}
+        if base_id in ADDRESSED_PARSERS:
+            columns['battery_address'] = subset['ID'] & 0x0F
+        for name, offset, data_type, scale in codec.fields:
+            columns[name] = decode_field(data, offset, data_type, scale)
+        result[base_id] = columns
+    return result
+
+
+def merge_decoded(results):
+    """把多次decode_batch的结果按系列拼接成一份列式数据"""
+    merged = {}
+    for result in results:
+        for base_id, columns in result.items():
+            merged.setdefault(base_id, []).append(columns)
+    return {base_id: {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+            for base_id, parts in merged.items()}
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+CAN报文二进制录制格式（.cancap）
+
+文件布局（小端）:
+    文件头 64字节: magic 'CANCAP01', 版本, 记录长度, 标志, 开始时间(Unix秒),
+                   记录数, 索引偏移（未正常关闭时后两项为0）
+    记录区: 每帧24字节定长记录
+        timestamp_us(u8)  can_id(u4)  dlc(u1)  channel(u1)  flags(u1)  保留(u1)  data(8字节)
+        write_batch写入的timestamp_us为Unix微秒（设备时间戳经DeviceTimebase展开回绕、
+        对齐主机时钟后换算），按录制顺序不递减
+    索引区: ID数(u4) + 每个ID一项(can_id, 帧数, 位置数组偏移) + 各ID的记录序号数组(u4)
+
+CaptureWriter由接收线程按批追加写入；CaptureReader用mmap打开，配合numpy
+按ID直接取出记录，不需要扫描整个文件。
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+from can_frames import FRAME_STRUCT
+from can_timebase import DeviceTimebase, monotonic_to_wall
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+CAPTURE_MAGIC = b'CANCAP01'
+CAPTURE_VERSION = 1
+CAPTURE_SUFFIX = '.cancap'
+
+HEADER_STRUCT = struct.Struct('<8sHHIdQQ24x')
+HEADER_SIZE = HEADER_STRUCT.size
+RECORD_STRUCT = struct.Struct('<QIBBBx8s')
+RECORD_SIZE = RECORD_STRUCT.size
+INDEX_COUNT_STRUCT = struct.Struct('<I4x')
+INDEX_ENTRY_STRUCT = struct.Struct('<I4xQQ')
+
+# flags位定义
+FLAG_EXTENDED = 0x01
+FLAG_REMOTE = 0x02
+
+# 写文件缓冲大小、索引每累计多少帧转存到临时文件（限制录制时的内存占用）
+CAPTURE_BUFFER_SIZE = 1024 * 1024
+INDEX_SPILL_RECORDS = 1 << 20
+
+CaptureRecord = namedtuple('CaptureRecord', ['timestamp_us', 'can_id', 'dlc', 'channel', 'flags', 'data'])
+
+if NUMPY_AVAILABLE:
+    CAPTURE_DTYPE = np.dtype([
+        ('timestamp_us', '<u8'),
+        ('can_id', '<u4'),
+        ('dlc', 'u1'),
+        ('channel', 'u1'),
+        ('flags', 'u1'),
+        ('reserved', 'u1'),
+        ('data', 'u1', (8,)),
+    ])
+    assert CAPTURE_DTYPE.itemsize == RECORD_SIZE
+else:
+    CAPTURE_DTYPE = None
+
+
+class CaptureWriter:
+    """录制文件写入，write_batch可在接收线程中调用"""
+
+    def __init__(self, filename, start_time=None):
+        self.filename = filename
+        self.start_time = time.time() if start_time is None else start_time
+        self.record_count = 0
+        self._lock = threading.Lock()
+        self._file = open(filename, 'wb', buffering=CAPTURE_BUFFER_SIZE)
+        self._file.write(HEADER_STRUCT.pack(CAPTURE_MAGIC, CAPTURE_VERSION, RECORD_SIZE, 0,
+                                            self.start_time, 0, 0))
+        self._block = bytearray()
+        self._timebases = {}  # 通道号 -> DeviceTimebase（调用方未给出帧时间时使用）
+        self._last_us = 0
+        # 每个ID的记录序号：内存中累计一段，超过INDEX_SPILL_RECORDS转存到临时文件
+        self._positions = {}
+        self._pending_positions = 0
+        self._spill_file = tempfile.TemporaryFile()
+        self._spilled = {}  # can_id -> [(临时文件偏移, 数量)]
+
+    @property
+    def closed(self):
+        return self._file is None
+
+    def write_batch(self, batch, channel=0, times=None):
+        """
+        追加一批CANFrameBatch报文
+        times: 各帧的主机单调时钟时间（DeviceTimebase.convert的结果）；未给出时按该通道
+               自己的DeviceTimebase换算。设备计数约4.97天回绕、重新连接后从0开始，
+               因此不直接写设备计数；跨批次的微小回退按上一帧时间记录，保证time_range可用
+        """
+        fields = list(FRAME_STRUCT.iter_unpack(batch.raw))
+        if times is None:
+            timebase = self._timebases.get(channel)
+            if timebase is None:
+                timebase = self._timebases[channel] = DeviceTimebase()
+            times = timebase.convert_ticks([f[1] for f in fields], batch.host_time
+                                           if batch.host_time is not None else time.monotonic())
+        block = self._block
+        block.clear()
+        ids = []
+        last_us = self._last_us
+        for (can_id, _ticks, _tf, _st, remote, extern, dlc, data, _r), t in zip(fields, times):
+            timestamp_us = int(round(monotonic_to_wall(t) * 1e6))
+            if timestamp_us < last_us:
+                timestamp_us = last_us
+            last_us = timestamp_us
+            block += RECORD_STRUCT.pack(timestamp_us, can_id, dlc, channel,
+                                        (extern and FLAG_EXTENDED) | (remote and FLAG_REMOTE), data)
+            ids.append(can_id)
+        self._last_us = last_us
+        self._append(block, ids)
+
+    def write_frame(self, can_id, data, timestamp_us, channel=0, flags=0):
+        """追加单帧"""
+        data = bytes(data)
+        record = RECORD_STRUCT.pack(timestamp_us, can_id, len(data), channel, flags, data[:8])
+        self._append(record, (can_id,))
+
+    def _append(self, block, ids):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(block)
+            positions = self._positions
+            for pos, can_id in enumerate(ids, self.record_count):
+                id_positions = positions.get(can_id)
+                if id_positions is None:
+                    id_positions = positions[can_id] = array('I')
+                id_positions.append(pos)
+            self.record_count += len(ids)
+            self._pending_positions += len(ids)
+            if self._pending_positions >= INDEX_SPILL_RECORDS:
+                self._spill_positions()
+
+    def _spill_positions(self):
+        """把内存中的记录序号转存到临时文件"""
+        for can_id, id_positions in self._positions.items():
+            offset = self._spill_file.tell()
+            id_positions.tofile(self._spill_file)
+            self._spilled.setdefault(can_id, []).append((offset, len(id_positions)))
+        self._positions = {}
+        self._pending_positions = 0
+
+    def close(self):
+        """写入索引并回填文件头"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._spill_positions()
+            index_offset = HEADER_SIZE + self.record_count * RECORD_SIZE
+            ids = sorted(self._spilled)
+            self._file.write(INDEX_COUNT_STRUCT.pack(len(ids)))
+            data_offset = index_offset + INDEX_COUNT_STRUCT.size + len(ids) * INDEX_ENTRY_STRUCT.size
+            for can_id in ids:
+                count = sum(n for _, n in self._spilled[can_id])
+                self._file.write(INDEX_ENTRY_STRUCT.pack(can_id, count, data_offset))
+                data_offset += count * 4
+            for can_id in ids:
+                for offset, count in self._spilled[can_id]:
+                    self._spill_file.seek(offset)
+                    self._file.write(self._spill_file.read(count * 4))
+
+            self._file.seek(0)
+            self._file.write(HEADER_STRUCT.pack(CAPTURE_MAGIC, CAPTURE_VERSION, RECORD_SIZE, 0,
+                                                self.start_time, self.record_count, index_offset))
+            self._file.close()
+            self._file = None
+            self._spill_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CaptureReader:
+    """
+    用mmap打开录制文件
+    未正常关闭（没有索引）的文件按文件长度计算记录数，按ID筛选时临时建立索引
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._fd = open(filename, 'rb')
+        size = os.fstat(self._fd.fileno()).st_size
+        if size < HEADER_SIZE:
+            self._fd.close()
+            raise ValueError(f"不是CAN录制文件: {filename}")
+        self._mm = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, record_size, _flags, self.start_time,
+         record_count, index_offset) = HEADER_STRUCT.unpack_from(self._mm, 0)
+        if magic != CAPTURE_MAGIC or record_size != RECORD_SIZE:
+            self.close()
+            raise ValueError(f"不是CAN录制文件: {filename}")
+        self.version = version
+        if index_offset:
+            self.record_count = record_count
+        else:
+            self.record_count = (size - HEADER_SIZE) // RECORD_SIZE
+        self.index_offset = index_offset
+        self._index = None
+        self._records = None
+
+    def __len__(self):
+        return self.record_count
+
+    def close(self):
+        self._records = None
+        self._index = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # 仍有numpy视图引用，随视图释放
+            self._mm = None
+        self._fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        """逐条读取记录（不需要numpy）"""
+        return self.iter_range(0, self.record_count)
+
+    def iter_range(self, start, end):
+        """逐条读取序号在[start, end)内的记录"""
+        end = min(end, self.record_count)
+        if start >= end:
+            return
+        view = memoryview(self._mm)[HEADER_SIZE + start * RECORD_SIZE:HEADER_SIZE + end * RECORD_SIZE]
+        for fields in RECORD_STRUCT.iter_unpack(view):
+            yield CaptureRecord(*fields[:5], fields[5][:fields[2]])
+
+    @property
+    def records(self):
+        """全部记录的numpy结构化数组（mmap只读视图，不复制）"""
+        if self._records is None:
+            if not NUMPY_AVAILABLE:
+                raise RuntimeError("读取录制文件需要numpy")
+            self._records = np.frombuffer(self._mm, dtype=CAPTURE_DTYPE,
+                                          count=self.record_count, offset=HEADER_SIZE)
+        return self._records
+
+    def _load_index(self):
+        if self._index is not None:
+            return self._index
+        index = {}
+        if self.index_offset:
+            (id_count,) = INDEX_COUNT_STRUCT.unpack_from(self._mm, self.index_offset)
+            offset = self.index_offset + INDEX_COUNT_STRUCT.size
+            for _ in range(id_count):
+                can_id, count, data_offset = INDEX_ENTRY_STRUCT.unpack_from(self._mm, offset)
+                index[can_id] = np.frombuffer(self._mm, dtype='<u4', count=count, offset=data_offset)
+                offset += INDEX_ENTRY_STRUCT.size
+        else:
+            ids = self.records['can_id']
+            order = np.argsort(ids, kind='stable')
+            sorted_ids = ids[order]
+            bounds = np.flatnonzero(np.diff(sorted_ids)) + 1
+            for positions in np.split(order, bounds):
+                if len(positions):
+                    index[int(ids[positions[0]])] = positions
+        self._index = index
+        return index
+
+    def ids(self):
+        """文件中出现过的CAN ID -> 帧数"""
+        return {can_id: len(positions) for can_id, positions in self._load_index().items()}
+
+    def select(self, can_ids):
+        """按ID取出记录（单个ID或ID序列），按录制顺序排列"""
+        if isinstance(can_ids, int):
+            can_ids = (can_ids,)
+        index = self._load_index()
+        parts = [index[can_id] for can_id in can_ids if can_id in index]
+        if not parts:
+            return self.records[:0]
+        positions = parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+        return self.records[positions]
+
+    def time_range(self, start_us, end_us):
+        """取出时间戳在[start_us, end_us)内的记录（要求时间戳递增）"""
+        timestamps = self.records['timestamp_us']
+        lo, hi = np.searchsorted(timestamps, (start_us, end_us))
+        return self.records[lo:hi]
@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+电芯一致性统计
+
+按电池地址和整组（全部电池）增量维护电芯电压/温度的最小值、最大值、平均值、极差及其所在位置。
+每个电池的电芯值存放在定长数组中，收到一个电芯值时:
+- 总和与计数按差值更新
+- 新值越过当前最小/最大值时直接替换位置；原最小/最大位置的值向内移动时才重扫该电池的定长数组
+整组统计以各电池的最小/最大值为元素用同样的方法维护，因此每次更新的开销是常数，
+与已收到的报文数无关。极差超过CELL_IMBALANCE_THRESHOLDS时产生不均衡事件，
+回落到阈值*CELL_IMBALANCE_HYSTERESIS以下时产生恢复事件。
+"""
+
+import math
+from collections import namedtuple
+
+from can_protocol_config import (BATTERY_ADDRESS_COUNT, CELL_VOLTAGE_COUNT, CELL_TEMPERATURE_COUNT,
+                                 CELL_IMBALANCE_THRESHOLDS, CELL_IMBALANCE_HYSTERESIS)
+
+CELL_KINDS = {
+    'cell_voltage': CELL_VOLTAGE_COUNT,
+    'cell_temperature': CELL_TEMPERATURE_COUNT,
+}
+
+# 携带电芯值的报文系列（0x22n~0x25n电芯电压，0x26n电芯温度），用于按ID+屏蔽码订阅
+CELL_MESSAGE_BASES = (0x220, 0x230, 0x240, 0x250, 0x260)
+
+# 信号名 -> (种类, 电芯序号从0开始)
+CELL_SIGNALS = {f"{kind}_{i + 1}": (kind, i) for kind, count in CELL_KINDS.items() for i in range(count)}
+
+# 统计结果；位置为电芯序号（从1开始），整组统计的位置为(电池地址, 电芯序号)
+CellSummary = namedtuple('CellSummary', [
+    'battery_address', 'count', 'min', 'min_at', 'max', 'max_at', 'mean', 'spread',
+])
+# 不均衡事件；battery_address为None表示整组
+CellEvent = namedtuple('CellEvent', [
+    'timestamp', 'kind', 'battery_address', 'active', 'spread', 'threshold', 'min_at', 'max_at',
+])
+
+
+class CellGroup:
+    """
+    定长数组上的增量最小/最大/总和，None表示该位置尚无数据
+    set()先更新最小/最大位置再更新计数，其它线程读到count>0时位置已有效；
+    读取方仍应先取出min_index/max_index再取值（见CellStatistics的summary方法）
+    """
+
+    __slots__ = ('values', 'count', 'total', 'min_index', 'max_index')
+
+    def __init__(self, size):
+        self.values = [None] * size
+        self.count = 0
+        self.total = 0.0
+        self.min_index = None
+        self.max_index = None
+
+    def set(self, index, value):
+        values = self.values
+        old = values[index]
+        values[index] = value
+        min_index = self.min_index
+        if min_index is None or value < values[min_index]:
+            self.min_index = index
+        elif index == min_index and value > old:
+            self.min_index = self._scan(min)
+        max_index = self.max_index
+        if max_index is None or value > values[max_index]:
+            self.max_index = index
+        elif index == max_index and value < old:
+            self.max_index = self._scan(max)
+        if old is None:
+            self.total += value
+            self.count += 1
+        else:
+            self.total += value - old
+
+    def clear(self, index):
+        """删除一个位置的值（电池离线时）"""
+        old = self.values[index]
+        if old is None:
+            return
+        self.values[index] = None
+        self.count -= 1
+        self.total = self.total - old if self.count else 0.0
+        if index == self.min_index:
+            self.min_index = self._scan(min)
+        if index == self.max_index:
+            self.max_index = self._scan(max)
+
+    def _scan(self, pick):
+        values = self.values
+        known = [i for i, value in enumerate(values) if value is not None]
+        return pick(known, key=values.__getitem__) if known else None
+
+    @property
+    def min(self):
+        return None if self.min_index is None else self.values[self.min_index]
+
+    @property
+    def max(self):
+        return None if self.max_index is None else self.values[self.max_index]
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def spread(self):
+        return None if self.min_index is None else self.values[self.max_index] - self.values[self.min_index]
+
+
+class CellStatistics:
+    """一种电芯量（电压或温度）的各电池统计和整组统计"""
+
+    def __init__(self, kind, cell_count, battery_count=BATTERY_ADDRESS_COUNT, thresholds=None):
+        self.kind = kind
+        self.batteries = [CellGroup(cell_count) for _ in range(battery_count)]
+        self.battery_mins = CellGroup(battery_count)  # 各电池的最小值，整组最小值取其min
+        self.battery_maxs = CellGroup(battery_count)  # 各电池的最大值，整组最大值取其max
+        self.count = 0
+        self.total = 0.0
+        thresholds = thresholds or {}
+        self.battery_threshold = thresholds.get('battery')
+        self.stack_threshold = thresholds.get('stack')
+        self.battery_alarms = [False] * battery_count
+        self.stack_alarm = False
+
+    def update(self, battery_address, cell_index, value):
+        """更新一个电芯值，返回该电池"""
+        group = self.batteries[battery_address]
+        count, total = group.count, group.total
+        group.set(cell_index, value)
+        self.count += group.count - count
+        self.total += group.total - total
+        self.battery_mins.set(battery_address, group.min)
+        self.battery_maxs.set(battery_address, group.max)
+        return group
+
+    def clear_battery(self, battery_address):
+        group = self.batteries[battery_address]
+        self.count -= group.count
+        self.total = self.total - group.total if self.count else 0.0
+        self.batteries[battery_address] = CellGroup(len(group.values))
+        self.battery_mins.clear(battery_address)
+        self.battery_maxs.clear(battery_address)
+        self.battery_alarms[battery_address] = False
+
+    def battery_summary(self, battery_address):
+        """该电池的CellSummary，没有数据时为None；可在其它线程调用，先取位置再取值"""
+        group = self.batteries[battery_address]
+        count, total = group.count, group.total
+        min_index, max_index = group.min_index, group.max_index
+        if not count or min_index is None or max_index is None:
+            return None
+        low, high = group.values[min_index], group.values[max_index]
+        if low is None or high is None:
+            return None  # 正在删除
+        return CellSummary(battery_address, count, low, min_index + 1, high, max_index + 1,
+                           total / count, high - low)
+
+    def stack_summary(self):
+        """整组的CellSummary，没有数据时为None；可在其它线程调用"""
+        count = self.count
+        low_battery = self.battery_mins.min_index
+        high_battery = self.battery_maxs.max_index
+        if not count or low_battery is None or high_battery is None:
+            return None
+        low_group = self.batteries[low_battery]
+        high_group = self.batteries[high_battery]
+        low_index, high_index = low_group.min_index, high_group.max_index
+        if low_index is None or high_index is None:
+            return None
+        low, high = low_group.values[low_index], high_group.values[high_index]
+        if low is None or high is None:
+            return None
+        return CellSummary(None, count, low, (low_battery, low_index + 1),
+                           high, (high_battery, high_index + 1), self.total / count, high - low)
+
+    def check(self, battery_address, timestamp):
+        """检查该电池和整组的极差，返回状态变化产生的CellEvent列表"""
+        events = []
+        threshold = self.battery_threshold
+        if threshold is not None:
+            group = self.batteries[battery_address]
+            alarm = _hysteresis(self.battery_alarms[battery_address], group.spread, threshold)
+            if alarm != self.battery_alarms[battery_address]:
+                self.battery_alarms[battery_address] = alarm
+                events.append(CellEvent(timestamp, self.kind, battery_address, alarm, group.spread,
+                                        threshold, group.min_index + 1, group.max_index + 1))
+        threshold = self.stack_threshold
+        if threshold is not None:
+            alarm = _hysteresis(self.stack_alarm, self.battery_maxs.max - self.battery_mins.min, threshold)
+            if alarm != self.stack_alarm:
+                self.stack_alarm = alarm
+                summary = self.stack_summary()
+                events.append(CellEvent(timestamp, self.kind, None, alarm, summary.spread, threshold,
+                                        summary.min_at, summary.max_at))
+        return events
+
+
+def _hysteresis(active, spread, threshold):
+    if active:
+        return spread > threshold * CELL_IMBALANCE_HYSTERESIS
+    return spread > threshold
+
+
+class CellAnalytics:
+    """
+    电芯电压/温度一致性统计
+    - update(can_id, parsed, timestamp)作为CANDispatcher的解析结果订阅者，在接收线程中调用
+    - on_event(CellEvent)在状态变化时调用（同一线程）
+    - summaries()/stack()可在其它线程读取（读到的是某一时刻的近似快照）
+    """
+
+    def __init__(self, battery_count=BATTERY_ADDRESS_COUNT, thresholds=None, on_event=None):
+        thresholds = CELL_IMBALANCE_THRESHOLDS if thresholds is None else thresholds
+        self.statistics = {kind: CellStatistics(kind, count, battery_count, thresholds.get(kind))
+                           for kind, count in CELL_KINDS.items()}
+        self.on_event = on_event
+        self.updates = 0
+
+    def subscribe(self, dispatcher):
+        """向分发器订阅全部电芯报文，返回订阅号列表"""
+        return [dispatcher.subscribe(self.update, can_id=base_id, id_mask=0x7F0)
+                for base_id in CELL_MESSAGE_BASES]
+
+    def update(self, can_id, parsed, timestamp=None):
+        """处理一条解析结果（带battery_address的电芯电压/温度报文）"""
+        battery_address = parsed.get('battery_address')
+        if battery_address is None:
+            return []
+        touched = None
+        for name, value in parsed.items():
+            slot = CELL_SIGNALS.get(name)
+            if slot is None or value is None or isinstance(value, float) and math.isnan(value):
+                continue
+            kind, index = slot
+            statistics = self.statistics[kind]
+            statistics.update(battery_address, index, value)
+            touched = statistics
+        if touched is None:
+            return []
+        self.updates += 1
+        events = touched.check(battery_address, timestamp)
+        if events and self.on_event is not None:
+            for event in events:
+                self.on_event(event)
+        return events
+
+    def clear_battery(self, battery_address):
+        """删除一个电池的数据（如该电池报文超时）"""
+        for statistics in self.statistics.values():
+            statistics.clear_battery(battery_address)
+
+    def summaries(self, kind):
+        """各电池的CellSummary列表（只含已有数据的电池）"""
+        statistics = self.statistics[kind]
+        return [summary for summary in (statistics.battery_summary(address)
+                                        for address in range(len(statistics.batteries)))
+                if summary is not None]
+
+    def stack(self, kind):
+        """整组的CellSummary，没有数据时为None"""
+        return self.statistics[kind].stack_summary()
+
+    def alarms(self):
+        """当前处于不均衡状态的(种类, 电池地址或None)"""
+        active = []
+        for kind, statistics in self.statistics.items():
+            active += [(kind, address) for address, alarm in enumerate(statistics.battery_alarms) if alarm]
+            if statistics.stack_alarm:
+                active.append((kind, None))
+        return active
+
+
+def describe_event(event):
+    """事件的日志文本"""
+    unit = 'V' if event.kind == 'cell_voltage' else '°C'
+    name = '电芯压差' if event.kind == 'cell_voltage' else '电芯温差'
+    if event.battery_address is None:
+        scope = "整组"
+        where = (f"最低 电池{event.min_at[0]}#{event.min_at[1]}, "
+                 f"最高 电池{event.max_at[0]}#{event.max_at[1]}")
+    else:
+        scope = f"电池{event.battery_address}"
+        where = f"最低 #{event.min_at}, 最高 #{event.max_at}"
+    if event.active:
+        return f"警告: {scope}{name} {event.spread:.3f} {unit} 超过 {event.threshold:g} {unit}（{where}）"
+    return f"{scope}{name}恢复: {event.spread:.3f} {unit}"
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+解析结果的变化输出
+
+按(通道, CAN ID)保存每个信号上次输出的值，新的解析结果只输出有变化的信号:
+- 浮点信号按SIGNAL_DEADBANDS（信号名前缀匹配）的死区比较，与上次输出值之差超过死区才输出，
+  缓慢漂移累计超过死区后也会输出
+- 整数、布尔、字符串和位标志字典按值比较
+- 每个ID至少每refresh_interval秒完整输出一次，便于界面刷新时间和后加入的消费者取得全部信号
+告警位、版本号、MAC地址等长时间不变的报文因此几乎不再产生表格更新、日志和存储。
+"""
+
+import math
+
+from can_protocol_config import SIGNAL_DEADBANDS, DELTA_REFRESH_INTERVAL
+
+
+class DeltaFilter:
+    """
+    变化检测（在接收线程中调用，不加锁）
+    deadbands: {信号名前缀: 死区}，默认SIGNAL_DEADBANDS
+    refresh_interval: 秒，None为不强制完整输出
+    """
+
+    def __init__(self, deadbands=None, refresh_interval=DELTA_REFRESH_INTERVAL):
+        self.deadbands = SIGNAL_DEADBANDS if deadbands is None else deadbands
+        self.refresh_interval = refresh_interval
+        self._deadband_cache = {}
+        self._last = {}  # (通道, can_id) -> [{信号: 上次输出值}, 上次完整输出时间]
+        self.frames = 0
+        self.emitted_frames = 0
+        self.signals = 0
+        self.emitted_signals = 0
+
+    def deadband(self, signal):
+        """信号的死区（最长前缀匹配），没有配置时为0"""
+        value = self._deadband_cache.get(signal)
+        if value is None:
+            matches = [prefix for prefix in self.deadbands if signal.startswith(prefix)]
+            value = self.deadbands[max(matches, key=len)] if matches else 0.0
+            self._deadband_cache[signal] = value
+        return value
+
+    def reset(self, can_id=None, channel=None):
+        """清除保存的值（下一帧完整输出），can_id为None时清除全部"""
+        if can_id is None:
+            self._last.clear()
+        else:
+            self._last.pop((channel, can_id), None)
+
+    def changes(self, can_id, parsed, timestamp=None, channel=None):
+        """
+        按(通道, can_id)分别比较，多个通道上的同一ID（如两组电池包）互不影响
+        Returns:
+            有变化的信号{信号: 值}（带battery_address），没有变化时为空字典；
+            第一次出现或到了完整输出时间时返回全部信号
+        """
+        # 信号数不含battery_address（只是随变化一起输出的标识），输入和输出按同一口径统计
+        signals = len(parsed) - ('battery_address' in parsed)
+        self.frames += 1
+        self.signals += signals
+        key = (channel, can_id)
+        state = self._last.get(key)
+        if state is None or (self.refresh_interval is not None and timestamp is not None
+                             and timestamp - state[1] >= self.refresh_interval):
+            self._last[key] = [dict(parsed), timestamp if timestamp is not None else 0.0]
+            self.emitted_frames += 1
+            self.emitted_signals += signals
+            return dict(parsed)
+
+        last = state[0]
+        changed = {}
+        for signal, value in parsed.items():
+            if signal == 'battery_address':
+                continue
+            previous = last.get(signal)
+            if type(value) is float and type(previous) is float:
+                if abs(value - previous) <= self.deadband(signal) or (math.isnan(value) and math.isnan(previous)):
+                    continue
+            elif value == previous and signal in last:
+                continue
+            changed[signal] = value
+            last[signal] = value
+        if not changed:
+            return changed
+        self.emitted_frames += 1
+        self.emitted_signals += len(changed)
+        if 'battery_address' in parsed:
+            changed['battery_address'] = parsed['battery_address']
+        return changed
+
+    def ratio(self):
+        """输出信号数 / 输入信号数（都不含battery_address）"""
+        return self.emitted_signals / self.signals if self.signals else 0.0
+
+
+def delta_subscriber(callback, delta_filter=None):
+    """
+    包装分发器回调，只把变化的信号交给callback(can_id, 变化的信号, 时间戳)
+    分发器回调不带通道号，只适用于单通道；多通道时在回调中调用changes(..., channel=通道)
+    用法: dispatcher.subscribe(delta_subscriber(on_change), battery_address=1)
+    """
+    delta_filter = DeltaFilter() if delta_filter is None else delta_filter
+    changes = delta_filter.changes
+
+    def on_parsed(can_id, parsed, timestamp):
+        changed = changes(can_id, parsed, timestamp)
+        if changed:
+            callback(can_id, changed, timestamp)
+    on_parsed.delta_filter = delta_filter
+    return on_parsed
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+接收报文分发
+
+消费者（界面、日志、统计、绘图、外部输出）按精确ID、ID+屏蔽码或电池地址订阅，
+回调或队列均可。订阅变化时重建按标准ID索引的分发表（2048项，每项为订阅者元组），
+分发时一次查表即得到该ID的全部订阅者，同一帧只解析一次，
+每帧开销与订阅者总数无关，只与实际匹配的订阅者数有关。
+扩展帧ID按需匹配后缓存。
+"""
+
+import itertools
+import queue
+import sys
+import threading
+
+from can_protocol_config import DECODER_REGISTRY, parse_can_message
+
+STANDARD_ID_COUNT = 0x800
+# 扩展帧ID的订阅者缓存上限：共享总线上未做硬件滤波时扩展ID可能很多，超过上限时清空重建
+EXTENDED_CACHE_SIZE = 4096
+
+
+class Subscription:
+    """一个订阅：匹配条件 + 回调"""
+
+    __slots__ = ('token', 'can_id', 'id_mask', 'battery_address', 'callback', 'decoded',
+                 'errors', 'dropped')
+
+    def __init__(self, token, callback, can_id, id_mask, battery_address, decoded):
+        self.token = token
+        self.callback = callback
+        self.can_id = can_id
+        self.id_mask = id_mask
+        self.battery_address = battery_address
+        self.decoded = decoded
+        self.errors = 0
+        self.dropped = 0
+
+    def matches(self, can_id):
+        if self.decoded and can_id not in DECODER_REGISTRY:
+            return False  # 没有解析函数的ID不会有解析结果
+        if self.can_id is not None and (can_id ^ self.can_id) & self.id_mask:
+            return False
+        if self.battery_address is not None:
+            entry = DECODER_REGISTRY.get(can_id)
+            if entry is None or entry[1] != self.battery_address:
+                return False
+        return True
+
+
+class CANDispatcher:
+    """
+    订阅与分发
+    - subscribe()/unsubscribe()可在任意线程调用
+    - dispatch()在接收线程中调用，回调也在接收线程中执行，应尽快返回
+      （耗时的消费者请订阅队列）
+    - log(文本)输出回调错误，默认写到标准错误
+    """
+
+    def __init__(self, log=None):
+        self.log = log or (lambda message: print(message, file=sys.stderr))
+        self._lock = threading.Lock()
+        self._tokens = itertools.count(1)
+        self._subscriptions = {}
+        self._table = [()] * STANDARD_ID_COUNT
+        self._extended = {}
+
+    def subscribe(self, target, can_id=None, id_mask=0x1FFFFFFF, battery_address=None, decoded=True):
+        """
+        订阅报文
+        Args:
+            target: 回调 target(can_id, 数据, 时间戳)，或queue.Queue（放入(can_id, 数据, 时间戳)，满时丢弃）
+            can_id: 要匹配的ID，None表示不按ID匹配
+            id_mask: 与can_id比较的位（位为1表示比较），默认精确匹配，如0x7F0匹配一个系列的16个地址
+            battery_address: 只接收该电池地址的报文（按DECODER_REGISTRY）
+            decoded: True时数据为parse_can_message的结果（解析失败不回调），False时为原始字节
+        Returns:
+            订阅号，用于unsubscribe
+        """
+        callback = target
+        with self._lock:
+            token = next(self._tokens)
+            subscription = Subscription(token, None, can_id, id_mask, battery_address, decoded)
+            if hasattr(target, 'put_nowait'):
+                callback = self._queue_callback(target, subscription)
+            subscription.callback = callback
+            self._subscriptions[token] = subscription
+            self._rebuild()
+        return token
+
+    @staticmethod
+    def _queue_callback(target, subscription):
+        put = target.put_nowait
+
+        def enqueue(can_id, payload, timestamp):
+            try:
+                put((can_id, payload, timestamp))
+            except queue.Full:
+                subscription.dropped += 1
+        return enqueue
+
+    def unsubscribe(self, token):
+        with self._lock:
+            if self._subscriptions.pop(token, None) is not None:
+                self._rebuild()
+
+    def subscriptions(self):
+        return list(self._subscriptions.values())
+
+    def _rebuild(self):
+        """重建分发表（需持有锁），整表替换，分发线程读到的总是完整的表"""
+        subscriptions = list(self._subscriptions.values())
+        self._table = [tuple(s for s in subscriptions if s.matches(can_id))
+                       for can_id in range(STANDARD_ID_COUNT)]
+        self._extended = {}
+
+    def lookup(self, can_id):
+        """该ID的订阅者元组"""
+        if can_id < STANDARD_ID_COUNT:
+            return self._table[can_id]
+        extended = self._extended
+        subscribers = extended.get(can_id)
+        if subscribers is None:
+            with self._lock:
+                subscribers = tuple(s for s in self._subscriptions.values() if s.matches(can_id))
+                if len(extended) >= EXTENDED_CACHE_SIZE:
+                    extended.clear()
+                extended[can_id] = subscribers
+        return subscribers
+
+    def dispatch(self, can_id, data, timestamp=None):
+        """
+        把一帧交给匹配的订阅者
+        Returns:
+            有订阅解析结果的订阅者时返回解析结果（解析失败为None），否则返回None
+        """
+        subscribers = self.lookup(can_id)
+        if not subscribers:
+            return None
+        parsed = None
+        decoded = False
+        for subscription in subscribers:
+            if subscription.decoded:
+                if not decoded:
+                    decoded = True
+                    parsed = parse_can_message(can_id, data)
+                if not parsed:
+                    continue
+                payload = parsed
+            else:
+                payload = data
+            try:
+                subscription.callback(can_id, payload, timestamp)
+            except Exception as e:
+                subscription.errors += 1
+                if subscription.errors == 1:
+                    self.log(f"CAN订阅{subscription.token}回调错误: {e}")
+        return parsed
+
+    def dispatch_batch(self, batch, times=None):
+        """分发一个CANFrameBatch，times为各帧时间戳（默认不带时间）"""
+        dispatch = self.dispatch
+        if times is None:
+            for frame in batch:
+                dispatch(frame.id, frame.data)
+        else:
+            for frame, t in zip(batch, times):
+                dispatch(frame.id, frame.data, t)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+CAN报文帧表示
+
+接收缓冲区按VCI_CAN_OBJ的内存布局（24字节/帧）整体拷贝一次，
+之后通过只读memoryview按需解包，避免每帧构造dict和list。
+"""
+
+import struct
+from collections import namedtuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# 与VCI_CAN_OBJ完全一致的布局：ID, TimeStamp, TimeFlag, SendType, RemoteFlag,
+# ExternFlag, DataLen, Data[8], Reserved[3]
+FRAME_STRUCT = struct.Struct('=IIBBBBB8s3s')
+FRAME_SIZE = FRAME_STRUCT.size  # 24
+
+# VCI_CAN_OBJ.TimeStamp的单位（0.1ms），时间基准、统计、录制和各后端都使用这一定义
+TIMESTAMP_TICK_US = 100
+TIMESTAMP_TICK = TIMESTAMP_TICK_US / 1e6  # 秒
+
+if NUMPY_AVAILABLE:
+    VCI_CAN_OBJ_DTYPE = np.dtype([
+        ('ID', '=u4'),
+        ('TimeStamp', '=u4'),
+        ('TimeFlag', 'u1'),
+        ('SendType', 'u1'),
+        ('RemoteFlag', 'u1'),
+        ('ExternFlag', 'u1'),
+        ('DataLen', 'u1'),
+        ('Data', 'u1', (8,)),
+        ('Reserved', 'u1', (3,)),
+    ])
+else:
+    VCI_CAN_OBJ_DTYPE = None
+
+# 单帧的轻量表示，只在遍历批次时按需创建
+CANFrame = namedtuple('CANFrame', ['id', 'data', 'length', 'timestamp'])
+
+
+class CANFrameBatch:
+    """一次接收得到的报文批次（只读视图）"""
+    __slots__ = ('_view', 'count', 'host_time')
+
+    def __init__(self, raw, count=None, host_time=None):
+        """
+        Args:
+            raw: VCI_CAN_OBJ布局的字节数据（bytes/bytearray/memoryview）
+            count: 帧数，默认按字节长度计算
+            host_time: 接收函数返回时的time.monotonic()，用于换算设备时间戳
+        """
+        view = memoryview(raw)
+        if not view.readonly:
+            view = view.toreadonly()
+        if count is None:
+            count = len(view) // FRAME_SIZE
+        self._view = view[:count * FRAME_SIZE]
+        self.count = count
+        self.host_time = host_time
+
+    @classmethod
+    def from_frames(cls, frames):
+        """由(id, data[, timestamp])序列打包成批次，用于虚拟总线和测试"""
+        buf = bytearray()
+        count = 0
+        for frame in frames:
+            can_id, data = frame[0], bytes(frame[1])
+            timestamp = frame[2] if len(frame) > 2 else 0
+            buf += FRAME_STRUCT.pack(can_id, int(timestamp) & 0xFFFFFFFF, 0, 0, 0, 0,
+                                     len(data), data[:8], b'\x00\x00\x00')
+            count += 1
+        return cls(bytes(buf), count)
+
+    @property
+    def raw(self):
+        """底层只读memoryview"""
+        return self._view
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def __iter__(self):
+        for (can_id, timestamp, _tf, _st, _rf, _ef, dlc, data, _r) in FRAME_STRUCT.iter_unpack(self._view):
+            yield CANFrame(can_id, data[:dlc], dlc, timestamp)
+
+    def ids(self):
+        """只取出所有帧的ID"""
+        return [fields[0] for fields in FRAME_STRUCT.iter_unpack(self._view)]
+
+    def to_numpy(self):
+        """零拷贝转换为numpy结构化数组（需要numpy）"""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy不可用")
+        return np.frombuffer(self._view, dtype=VCI_CAN_OBJ_DTYPE, count=self.count)
+
+    def to_dicts(self):
+        """兼容旧接口：转换为dict列表"""
+        return [{'id': f.id, 'data': list(f.data), 'length': f.length, 'timestamp': f.timestamp}
+                for f in self]
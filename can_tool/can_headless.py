@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+无界面CAN采集（不导入tkinter）
+
+复用界面版的总线后端、分发器（解析）、超时监控和周期发送调度，
+把解析后的信号以JSON行输出到标准输出、文件或本地套接字，或把原始报文写入.cancap录制文件。
+适合在机架工控机上长期运行，以及在CI中对虚拟总线做端到端测试。
+
+输出（-o，可重复）:
+    -                   标准输出，每条解析结果一行JSON
+    文件.jsonl          JSON行文件
+    文件.cancap         原始报文录制文件（不解析）
+    tcp:端口            在127.0.0.1:端口监听，向每个连接的客户端发送JSON行
+    unix:路径           在Unix域套接字上监听，同上
+JSON行格式: {"time": Unix秒, "channel": 通道, "id": "0x211", "signals": {...}}
+--changes-only时signals只含与上次输出相比有变化的信号（见can_delta）
+超时/恢复事件（按通道分别监控）:
+    {"time": Unix秒, "event": "timeout"|"recovery", "channel": 通道, "id": "0x351", "seconds": 秒}
+
+用法: python can_headless.py --backend virtual --frame-rate 2000 --duration 5 -o -
+      python can_headless.py --backend canalyst --channels 0:0,0:1 --send-period 1000 -o soak.cancap -o tcp:9500
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from can_protocol_config import (DECODER_REGISTRY, INVERTER_KEEPALIVE_DATA, INVERTER_IDENTIFICATION_DATA,
+                                 TX_EXTRA_MESSAGES, SEND_INTERVAL)
+from can_backends import CAN_BACKENDS, create_can_bus
+from can_acquisition import MultiChannelAcquisition, create_channel_buses
+from can_acceptance import acceptance_ids, parse_can_id_list
+from can_capture import CaptureWriter, CAPTURE_SUFFIX
+from can_delta import DeltaFilter
+from can_dispatcher import CANDispatcher
+from can_timebase import monotonic_to_wall
+from can_tx_scheduler import TxScheduler
+from can_watchdog import DeadlineWatchdog, build_watch_timeouts
+
+# 各后端默认的通道列表
+DEFAULT_CHANNELS = {
+    'canalyst': '0:0',
+    'socketcan': 'can0',
+    'virtual': 'virtual0',
+}
+
+# 套接字客户端发送超时（秒），超时的客户端被断开，不拖慢解码线程
+SOCKET_SEND_TIMEOUT = 0.5
+
+
+class SignalSink:
+    """输出的基类，各方法在HeadlessRunner的输出锁内调用（解码线程或监控线程）"""
+
+    def write_signals(self, timestamp, channel, can_id, parsed):
+        pass
+
+    def write_event(self, timestamp, event, channel, can_id, seconds):
+        pass
+
+    def write_batch(self, channel, batch):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink(SignalSink):
+    """JSON行输出到文本流，每批报文处理完后flush一次"""
+
+    def __init__(self, stream, owns_stream=False):
+        self.stream = stream
+        self.owns_stream = owns_stream
+        self._lines = []
+        self._lock = threading.Lock()
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._lines.append(line)
+
+    def write_signals(self, timestamp, channel, can_id, parsed):
+        self._append({'time': round(timestamp, 6), 'channel': channel,
+                      'id': f"0x{can_id:03X}", 'signals': parsed})
+
+    def write_event(self, timestamp, event, channel, can_id, seconds):
+        self._append({'time': round(timestamp, 6), 'event': event, 'channel': channel,
+                      'id': f"0x{can_id:03X}", 'seconds': round(seconds, 3)})
+
+    def flush(self):
+        with self._lock:
+            lines, self._lines = self._lines, []
+        if lines:
+            self.send('\n'.join(lines) + '\n')
+
+    def send(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+        if self.owns_stream:
+            self.stream.close()
+
+
+class CaptureSink(SignalSink):
+    """原始报文写入.cancap录制文件"""
+
+    def __init__(self, filename):
+        self.writer = CaptureWriter(filename)
+
+    def write_batch(self, channel, batch):
+        self.writer.write_batch(batch, channel)
+
+    def close(self):
+        self.writer.close()
+
+
+class SocketSink(JsonLinesSink):
+    """在本地TCP端口或Unix域套接字上监听，把JSON行广播给所有已连接的客户端"""
+
+    def __init__(self, address):
+        super().__init__(None)
+        if isinstance(address, int):
+            self.server = socket.create_server(('127.0.0.1', address))
+        else:
+            if os.path.exists(address):
+                os.unlink(address)
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server.bind(address)
+            self.server.listen()
+        self.address = self.server.getsockname()
+        self._clients = []
+        self._clients_lock = threading.Lock()
+        self._accept_thread = threading.Thread(target=self._accept_loop, name='can-sink-accept', daemon=True)
+        self._accept_thread.start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                client, _addr = self.server.accept()
+            except OSError:
+                break  # 监听套接字已关闭
+            client.settimeout(SOCKET_SEND_TIMEOUT)
+            with self._clients_lock:
+                self._clients.append(client)
+
+    def client_count(self):
+        return len(self._clients)
+
+    def send(self, text):
+        data = text.encode('utf-8')
+        with self._clients_lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.sendall(data)
+            except OSError:
+                with self._clients_lock:
+                    self._clients.remove(client)
+                client.close()
+
+    def close(self):
+        self.flush()
+        self.server.close()
+        with self._clients_lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+        if self.server.family == getattr(socket, 'AF_UNIX', None) and isinstance(self.address, str):
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+
+def open_sink(target):
+    """按-o参数创建输出"""
+    if target == '-':
+        return JsonLinesSink(sys.stdout)
+    if target.startswith('tcp:'):
+        return SocketSink(int(target[4:]))
+    if target.startswith('unix:'):
+        return SocketSink(target[5:])
+    if target.lower().endswith(CAPTURE_SUFFIX):
+        return CaptureSink(target)
+    return JsonLinesSink(open(target, 'w', encoding='utf-8'), owns_stream=True)
+
+
+class HeadlessRunner:
+    """
+    无界面采集
+    buses: {通道号: 总线}（未连接）
+    sinks: SignalSink列表
+    can_ids/battery_address: 只输出这些ID/该电池地址的解析结果，None为全部
+    send_period: 周期发送0x305/0x307的周期（秒），None为不发送
+    changes_only: 只输出有变化的信号（见can_delta）
+    """
+
+    def __init__(self, buses, sinks, can_ids=None, battery_address=None, send_period=None,
+                 hw_filter=True, extra_ids=(), log=None, changes_only=False):
+        self.buses = buses
+        self.sinks = list(sinks)
+        self.send_period = send_period
+        self.hw_filter = hw_filter
+        self.extra_ids = extra_ids
+        self.log = log or (lambda message: print(message, file=sys.stderr))
+        self.dispatcher = CANDispatcher(log=self.log)
+        # 变化检测按(通道, ID)保存状态，通道号在分发时才知道，因此在回调中调用而不包装订阅
+        self.delta_filter = DeltaFilter() if changes_only else None
+        callback = self.on_parsed_message
+        if can_ids:
+            for can_id in can_ids:
+                self.dispatcher.subscribe(callback, can_id=can_id, battery_address=battery_address)
+        else:
+            self.dispatcher.subscribe(callback, battery_address=battery_address)
+        # 超时监控按(通道, ID)：多个通道上的同一ID（如两组电池包）分别监控
+        timeouts = build_watch_timeouts()
+        self.watchdog = DeadlineWatchdog({(channel, can_id): timeout for channel in buses
+                                          for can_id, timeout in timeouts.items()},
+                                         self.on_watchdog_timeout, self.on_watchdog_recovery)
+        # 输出锁：解码线程和监控线程都写输出，写入、flush和移除输出都在锁内进行
+        self._sinks_lock = threading.RLock()
+        self.acquisition = MultiChannelAcquisition(buses, on_frames=self.on_frames, on_batch=self.on_batch,
+                                                   log=self.log)
+        self.tx_schedulers = []
+        self.timeouts = 0
+        self.decoded = 0
+        self._channel = 0  # 正在分发的帧的通道号（分发在解码线程中同步执行）
+        self.stop_event = threading.Event()
+
+    def connect(self, baudrate=500000):
+        if self.hw_filter:
+            can_ids = acceptance_ids(self.extra_ids)
+            for bus in self.buses.values():
+                bus.set_acceptance_ids(can_ids)
+            self.log(f"硬件滤波: 接收 {len(can_ids)} 个ID")
+        self.acquisition.connect(baudrate)
+
+    def start(self):
+        self.watchdog.start()
+        self.acquisition.start()
+        if self.send_period is not None:
+            for bus in self.buses.values():
+                scheduler = TxScheduler(bus.send_many, on_error=self.on_send_error)
+                scheduler.add(0x305, self.send_period, INVERTER_KEEPALIVE_DATA)
+                scheduler.add(0x307, self.send_period, INVERTER_IDENTIFICATION_DATA)
+                for can_id, period, data in TX_EXTRA_MESSAGES:
+                    scheduler.add(can_id, period, data)
+                scheduler.start()
+                self.tx_schedulers.append(scheduler)
+
+    def stop(self):
+        for scheduler in self.tx_schedulers:
+            scheduler.stop()
+        self.tx_schedulers = []
+        self.acquisition.stop()
+        self.watchdog.stop()
+        self._flush_sinks()
+
+    def close(self):
+        self.stop()
+        self.acquisition.disconnect()
+        with self._sinks_lock:
+            for sink in list(self.sinks):
+                try:
+                    sink.close()
+                except (OSError, ValueError) as e:
+                    self.log(f"关闭输出失败: {str(e)}")
+
+    def _flush_sinks(self):
+        with self._sinks_lock:
+            for sink in list(self.sinks):
+                try:
+                    sink.flush()
+                except (OSError, ValueError) as e:
+                    self.remove_sink(sink, e)
+
+    def remove_sink(self, sink, error):
+        """输出出错（磁盘满、管道被关闭）时移除该输出，全部输出都失效时结束运行"""
+        with self._sinks_lock:
+            if sink not in self.sinks:
+                return
+            self.sinks.remove(sink)
+        if getattr(sink, 'stream', None) is sys.stdout:
+            # 下游（如 | head）已关闭，后续写标准输出都丢弃
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        self.log(f"输出失败，已停止该输出: {str(error)}")
+        if not self.sinks:
+            self.stop_event.set()
+
+    @property
+    def finished(self):
+        """全部总线都是已回放完的录制文件"""
+        return all(getattr(bus, 'finished', False) for bus in self.buses.values())
+
+    def on_batch(self, channel, batch, host_time):
+        with self._sinks_lock:
+            for sink in list(self.sinks):
+                try:
+                    sink.write_batch(channel, batch)
+                except (OSError, ValueError) as e:
+                    self.remove_sink(sink, e)
+
+    def on_frames(self, frames):
+        feed = self.watchdog.feed
+        dispatch = self.dispatcher.dispatch
+        # 整批在输出锁内分发（恢复事件也在本线程产生），监控线程的超时事件在批次之间写入
+        with self._sinks_lock:
+            for frame in frames:
+                feed((frame.channel, frame.id), frame.time)
+                self._channel = frame.channel
+                dispatch(frame.id, frame.data, frame.time)
+            self._flush_sinks()
+
+    def on_parsed_message(self, can_id, parsed, timestamp):
+        channel = self._channel
+        if self.delta_filter is not None:
+            parsed = self.delta_filter.changes(can_id, parsed, timestamp, channel)
+            if not parsed:
+                return
+        self.decoded += 1
+        wall = monotonic_to_wall(timestamp)
+        for sink in list(self.sinks):
+            sink.write_signals(wall, channel, can_id, parsed)
+
+    def _write_event(self, event, channel, can_id, seconds):
+        with self._sinks_lock:
+            for sink in list(self.sinks):
+                sink.write_event(time.time(), event, channel, can_id, seconds)
+            self._flush_sinks()
+
+    def on_watchdog_timeout(self, key, silence):
+        channel, can_id = key
+        self.timeouts += 1
+        battery_address = DECODER_REGISTRY.get(can_id, (None, None))[1]
+        suffix = f"(电池{battery_address})" if battery_address is not None else ""
+        self.log(f"警告: 通道{channel} 0x{can_id:03X}{suffix} 已 {silence:.1f} 秒未收到")
+        self._write_event('timeout', channel, can_id, silence)
+
+    def on_watchdog_recovery(self, key, downtime):
+        channel, can_id = key
+        self.log(f"通道{channel} 0x{can_id:03X} 恢复，中断 {downtime:.1f} 秒")
+        self._write_event('recovery', channel, can_id, downtime)
+
+    def on_send_error(self, error):
+        self.log(f"发送CAN报文失败: {str(error)}")
+
+    def run(self, duration=None, stats_interval=0):
+        """运行到duration秒、录制文件回放完或stop_event被设置（信号处理、输出全部失效）"""
+        stop_event = self.stop_event
+        deadline = None if duration is None else time.monotonic() + duration
+        next_stats = time.monotonic() + stats_interval if stats_interval else None
+        while not stop_event.is_set():
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                break
+            if self.finished:
+                break
+            if next_stats is not None and now >= next_stats:
+                self.report_stats()
+                next_stats = now + stats_interval
+            stop_event.wait(0.1)
+
+    def report_stats(self):
+        stats = self.acquisition.stats()
+        message = (f"接收 {stats['frames']} 帧（{stats['recent_fps']:,.0f} 帧/秒），"
+                   f"输出 {self.decoded} 条，丢弃 {stats['dropped']} 帧，超时 {self.timeouts} 次")
+        if self.delta_filter is not None:
+            message += f"，变化信号占 {self.delta_filter.ratio():.1%}"
+        self.log(message)
+
+
+def create_buses(args):
+    if args.backend == 'replay':
+        if not args.replay:
+            raise ValueError("replay后端需要 --replay 录制文件")
+        return {0: create_can_bus('replay', filename=args.replay, speed=args.speed)}
+    kwargs = {'frame_rate': args.frame_rate} if args.backend == 'virtual' else {}
+    return create_channel_buses(args.backend, args.channels or DEFAULT_CHANNELS[args.backend], **kwargs)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="无界面CAN采集：解析BMS报文并输出到标准输出/文件/本地套接字")
+    parser.add_argument('--backend', choices=sorted(CAN_BACKENDS), default='canalyst')
+    parser.add_argument('--channels', help="通道列表，如 0:0,0:1（canalyst）或 can0,can1（socketcan）")
+    parser.add_argument('--baudrate', type=int, default=500000)
+    parser.add_argument('--frame-rate', type=float, default=1000, help="virtual后端注入的帧率")
+    parser.add_argument('--replay', help="replay后端回放的录制文件")
+    parser.add_argument('--speed', type=float, default=0, help="回放倍速，0为尽可能快")
+    parser.add_argument('-o', '--output', action='append', help="输出，可重复，默认为标准输出")
+    parser.add_argument('--ids', help="只输出这些ID（十六进制，逗号分隔）")
+    parser.add_argument('--battery', type=int, help="只输出该电池地址的报文")
+    parser.add_argument('--send-period', type=float, help="周期发送0x305/0x307，周期毫秒")
+    parser.add_argument('--send', action='store_true', help=f"按默认周期（{SEND_INTERVAL} s）发送0x305/0x307")
+    parser.add_argument('--no-hw-filter', action='store_true', help="不设置硬件验收滤波")
+    parser.add_argument('--extra-ids', default='', help="硬件滤波额外接收的ID（十六进制）")
+    parser.add_argument('--duration', type=float, help="运行秒数，默认一直运行到Ctrl+C/SIGTERM")
+    parser.add_argument('--stats-interval', type=float, default=0, help="每隔多少秒在标准错误输出吞吐统计")
+    parser.add_argument('--changes-only', action='store_true',
+                        help="只输出有变化的信号（模拟量带死区，每个ID每秒完整输出一次）")
+    parser.add_argument('--fail-on-timeout', action='store_true', help="出现周期报文超时时以返回码2退出")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    send_period = args.send_period / 1000.0 if args.send_period else (SEND_INTERVAL if args.send else None)
+    sinks = []
+    try:
+        sinks = [open_sink(target) for target in (args.output or ['-'])]
+        runner = HeadlessRunner(create_buses(args), sinks,
+                                can_ids=parse_can_id_list(args.ids) if args.ids else None,
+                                battery_address=args.battery, send_period=send_period,
+                                hw_filter=not args.no_hw_filter, extra_ids=parse_can_id_list(args.extra_ids),
+                                changes_only=args.changes_only)
+        runner.connect(args.baudrate)
+    except Exception as e:
+        for sink in sinks:
+            sink.close()
+        print(f"启动失败: {str(e)}", file=sys.stderr)
+        return 1
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: runner.stop_event.set())
+    runner.start()
+    try:
+        runner.run(args.duration, args.stats_interval)
+    finally:
+        runner.close()
+    runner.report_stats()
+    if args.fail_on_timeout and runner.timeouts:
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
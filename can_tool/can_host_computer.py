@@ -4,18 +4,27 @@ import threading
 import time
 from datetime import datetime
 import json
-import struct
-import ctypes
-from ctypes import *
 from can_protocol_config import *  # 导入配置文件
 from lang_config import LANGUAGES
+from can_backends import (VCI_USBCAN2, STATUS_OK, VCI_INIT_CONFIG, VCI_CAN_OBJ, VCI_CAN_OBJ_ARRAY,
+                          CANalystCANBus, CAN_BACKENDS, create_can_bus)
+from can_ui_queue import (UIEventQueue, coalesce_events, UI_LOG, UI_PARSED, UI_HEARTBEAT,
+                          UI_HEARTBEAT_TIMEOUT, UI_SENT)
+from can_capture import CaptureWriter, CAPTURE_SUFFIX
+from can_acceptance import acceptance_ids, parse_can_id_list, sja1000_acceptance
+from can_dispatcher import CANDispatcher
+from can_tx_scheduler import TxScheduler
+from can_watchdog import DeadlineWatchdog, build_watch_timeouts
+from can_timeseries import TimeSeriesStore
+from can_timebase import DeviceTimebase, monotonic_to_wall
+from can_plot import SignalPlotPanel
+from can_cell_analytics import CellAnalytics, describe_event
+from can_delta import DeltaFilter
+from can_statistics import CANStatistics, STAT_FIELDS
+from can_log_buffer import LogRingBuffer, LogFileWriter, LOG_LEVELS, LOG_DEBUG, LOG_INFO, LOG_WARNING
 import sys
 import os
 
-# 创芯科技CAN API常量
-VCI_USBCAN2 = 4
-STATUS_OK = 1
-
 def get_resource_path(filename):
     """
     获取资源文件路径，兼容开发环境和PyInstaller打包后的环境
@@ -29,149 +38,6 @@ def get_resource_path(filename):
     return os.path.join(base_path, filename)
 
 
-class VCI_INIT_CONFIG(Structure):  
-    _fields_ = [("AccCode", c_uint),
-                ("AccMask", c_uint),
-                ("Reserved", c_uint),
-                ("Filter", c_ubyte),
-                ("Timing0", c_ubyte),
-                ("Timing1", c_ubyte),
-                ("Mode", c_ubyte)
-                ]  
-
-class VCI_CAN_OBJ(Structure):  
-    _fields_ = [("ID", c_uint),
-                ("TimeStamp", c_uint),
-                ("TimeFlag", c_ubyte),
-                ("SendType", c_ubyte),
-                ("RemoteFlag", c_ubyte),
-                ("ExternFlag", c_ubyte),
-                ("DataLen", c_ubyte),
-                ("Data", c_ubyte*8),
-                ("Reserved", c_ubyte*3)
-                ] 
-
-class VCI_CAN_OBJ_ARRAY(Structure):
-    _fields_ = [('SIZE', ctypes.c_uint16), ('STRUCT_ARRAY', ctypes.POINTER(VCI_CAN_OBJ))]
-
-    def __init__(self, num_of_structs):
-        self.STRUCT_ARRAY = ctypes.cast((VCI_CAN_OBJ * num_of_structs)(), ctypes.POINTER(VCI_CAN_OBJ))
-        self.SIZE = num_of_structs
-        self.ADDR = self.STRUCT_ARRAY[0]
-
-class CANalystCANBus:
-    """创芯科技CAN总线类"""
-    def __init__(self, device_type=VCI_USBCAN2, device_index=0, can_index=0):
-        self.device_type = device_type
-        self.device_index = device_index
-        self.can_index = can_index
-        self.can_dll = None
-        self.is_connected = False
-        
-    def connect(self, baudrate=500000):
-        """连接CAN设备"""
-        try:
-            # 加载DLL
-            self.can_dll = windll.LoadLibrary('./ControlCAN.dll')
-            
-            # 打开设备
-            ret = self.can_dll.VCI_OpenDevice(self.device_type, self.device_index, 0)
-            if ret != STATUS_OK:
-                raise Exception("打开设备失败")
-                
-            # 设置波特率
-            timing0, timing1 = self.get_timing(baudrate)
-            
-            # 初始化CAN
-            vci_initconfig = VCI_INIT_CONFIG(0x80000008, 0xFFFFFFFF, 0,
-                                           0, timing0, timing1, 0)
-            ret = self.can_dll.VCI_InitCAN(self.device_type, self.device_index, 
-                                          self.can_index, byref(vci_initconfig))
-            if ret != STATUS_OK:
-                raise Exception("初始化CAN失败")
-                
-            # 启动CAN
-            ret = self.can_dll.VCI_StartCAN(self.device_type, self.device_index, self.can_index)
-            if ret != STATUS_OK:
-                raise Exception("启动CAN失败")
-                
-            self.is_connected = True
-            return True
-            
-        except Exception as e:
-            raise Exception(f"连接CAN设备失败: {str(e)}")
-            
-    def get_timing(self, baudrate):
-        """根据波特率获取定时参数"""
-        timing_map = {
-            250000: (0x03, 0x1C),  # 250kbps
-            500000: (0x00, 0x1C),  # 500kbps
-        }
-        return timing_map.get(baudrate, (0x00, 0x1C))
-        
-    def send(self, can_id, data):
-        """发送CAN报文"""
-        if not self.is_connected:
-            raise Exception("CAN设备未连接")
-            
-        # 创建数据数组
-        ubyte_array = c_ubyte * 8
-        can_data = ubyte_array(*data[:8])
-        
-        # 创建CAN对象
-        ubyte_3array = c_ubyte * 3
-        reserved = ubyte_3array(0, 0, 0)
-        vci_can_obj = VCI_CAN_OBJ(can_id, 0, 0, 1, 0, 0, len(data), can_data, reserved)
-        
-        # 发送数据
-        ret = self.can_dll.VCI_Transmit(self.device_type, self.device_index, 
-                                       self.can_index, byref(vci_can_obj), 1)
-        if ret != STATUS_OK:
-            raise Exception("发送CAN报文失败")
-            
-    def receive(self, timeout=100):
-        """接收CAN报文"""
-        if not self.is_connected:
-            return None
-            
-        try:
-            # 创建接收缓冲区
-            rx_vci_can_obj = VCI_CAN_OBJ_ARRAY(2500)
-            
-            # 接收数据
-            ret = self.can_dll.VCI_Receive(self.device_type, self.device_index, 
-                                          self.can_index, byref(rx_vci_can_obj.ADDR), 2500, timeout)
-            
-            if ret > 0:
-                messages = []
-                for i in range(ret):
-                    msg = rx_vci_can_obj.STRUCT_ARRAY[i]
-                    data = list(msg.Data[:msg.DataLen])
-                    messages.append({
-                        'id': msg.ID,
-                        'data': data,
-                        'length': msg.DataLen,
-                        'timestamp': msg.TimeStamp
-                    })
-                return messages
-            elif ret == 0:
-                # 超时，没有接收到数据
-                return None
-            else:
-                # 接收错误
-                print(f"VCI_Receive返回错误: {ret}")
-                return None
-                
-        except Exception as e:
-            print(f"接收CAN报文错误: {str(e)}")
-            return None
-        
-    def disconnect(self):
-        """断开连接"""
-        if self.can_dll and self.is_connected:
-            self.can_dll.VCI_CloseDevice(self.device_type, self.device_index)
-            self.is_connected = False
-
 class CANHostComputer:
     def __init__(self, parent_frame=None):
         """
@@ -210,11 +76,32 @@ class CANHostComputer:
         
         # CAN相关变量
         self.can_bus = None
+        self.capture_writer = None
+        self.capture_channel = 0
         self.is_connected = False
         self.is_running = False
+        self.tx_scheduler = None  # 周期发送调度器
         self.is_receiving = False  # 新增接收状态
         self.last_heartbeat_time = None
         self.heartbeat_monitor_thread = None
+        self.decode_time = 0.0  # 接收线程处理报文的累计耗时（秒）
+        self.timebase = DeviceTimebase()  # 设备时间戳 -> 主机单调时钟
+        self.statistics = CANStatistics()  # 按ID的流量统计
+        self.timeseries = TimeSeriesStore()  # 解码信号的时间序列，供绘图和导出
+        # 接收报文分发：界面自身也是一个订阅者，其它消费者用self.dispatcher.subscribe()接入
+        self.dispatcher = CANDispatcher()
+        self.dispatcher.subscribe(self.on_parsed_message)
+        # 电芯一致性统计（各电池和整组的最低/最高/压差），压差超过阈值时记日志
+        self.cell_analytics = CellAnalytics(on_event=self.on_cell_event)
+        self.cell_analytics.subscribe(self.dispatcher)
+        # 表格和日志只处理有变化的报文（模拟量带死区），每个ID每秒至少完整刷新一次
+        self.delta_filter = DeltaFilter()
+        self.stats_window = None
+        self.plot_window = None
+        self.cell_window = None
+        # 周期报文超时监控（独立线程），0x351超时即心跳终止
+        self.watchdog = DeadlineWatchdog(build_watch_timeouts(), self.on_watchdog_timeout,
+                                         self.on_watchdog_recovery)
         
         # 统计变量
         self.sent_count = 0
@@ -229,8 +116,23 @@ class CANHostComputer:
         self.lang = 'zh' # 默认中文
         self.lang_var = tk.StringVar(value=self.lang)
         
+        # 工作线程 -> 主线程的更新队列，Tk控件只在ui_thread中访问
+        self.ui_thread = threading.current_thread()
+        self.ui_queue = UIEventQueue(UI_QUEUE_CAPACITY)
+        self.ui_refresh_ms = int(1000 / UI_REFRESH_HZ)
+        
+        # 数据表格行索引 (can_id, parameter) -> iid，以及待刷新的行（只保留最新值）
+        self.table_index = {}
+        self.table_values = {}
+        self.table_dirty = {}
+        
+        # 日志：界面只保留最近LOG_VIEW_CAPACITY行，低于log_level的日志直接丢弃
+        self.log_level = LOG_INFO
+        self.log_buffer = LogRingBuffer(LOG_VIEW_CAPACITY)
+        
         # 创建界面
         self.create_widgets()
+        self.main_frame.after(self.ui_refresh_ms, self.process_ui_queue)
     def set_window_icon(self):
         """设置窗口图标"""
         try:
@@ -272,6 +174,12 @@ class CANHostComputer:
         row1 = ttk.Frame(connection_frame)
         row1.pack(fill="x", pady=2)
         
+        ttk.Label(row1, text="后端:").pack(side="left", padx=5)
+        self.backend_var = tk.StringVar(value="canalyst")
+        backend_combo = ttk.Combobox(row1, textvariable=self.backend_var,
+                                     values=list(CAN_BACKENDS), width=10, state="readonly")
+        backend_combo.pack(side="left", padx=5)
+        
         ttk.Label(row1, text="设备类型:").pack(side="left", padx=5)
         self.device_type_var = tk.StringVar(value="VCI_USBCAN2")
         device_type_combo = ttk.Combobox(row1, textvariable=self.device_type_var, 
@@ -290,6 +198,18 @@ class CANHostComputer:
                                       values=["0", "1"], width=5)
         can_index_combo.pack(side="left", padx=5)
         
+        # SocketCAN接口名 / 虚拟总线通道名
+        ttk.Label(row1, text="接口:").pack(side="left", padx=5)
+        self.interface_var = tk.StringVar(value="vcan0")
+        interface_combo = ttk.Combobox(row1, textvariable=self.interface_var,
+                                       values=["can0", "can1", "vcan0"], width=8)
+        interface_combo.pack(side="left", padx=5)
+        
+        # 虚拟总线注入帧率
+        ttk.Label(row1, text="注入速率(帧/秒):").pack(side="left", padx=5)
+        self.frame_rate_var = tk.StringVar(value="1000")
+        ttk.Entry(row1, textvariable=self.frame_rate_var, width=8).pack(side="left", padx=5)
+        
         # 第二行：波特率设置
         row2 = ttk.Frame(connection_frame)
         row2.pack(fill="x", pady=2)
@@ -300,6 +220,19 @@ class CANHostComputer:
                                      values=["250000", "500000"], width=10)
         baudrate_combo.pack(side="left", padx=5)
         
+        # 录制文件回放倍速，0表示尽可能快
+        ttk.Label(row2, text="回放倍速:").pack(side="left", padx=5)
+        self.replay_speed_var = tk.StringVar(value="1")
+        ttk.Entry(row2, textvariable=self.replay_speed_var, width=6).pack(side="left", padx=5)
+        
+        # 硬件验收滤波：只接收解码器支持的ID和额外ID（十六进制，逗号分隔）
+        self.hw_filter_var = tk.BooleanVar(value=True)
+        self.hw_filter_check = ttk.Checkbutton(row2, text="硬件滤波", variable=self.hw_filter_var)
+        self.hw_filter_check.pack(side="left", padx=5)
+        ttk.Label(row2, text="额外ID:").pack(side="left", padx=5)
+        self.extra_ids_var = tk.StringVar(value=" ".join(f"0x{can_id:03X}" for can_id in ACCEPTANCE_EXTRA_IDS))
+        ttk.Entry(row2, textvariable=self.extra_ids_var, width=16).pack(side="left", padx=5)
+        
         # 连接按钮
         self.connect_btn = ttk.Button(row2, text="连接", command=self.connect_can)
         self.connect_btn.pack(side="left", padx=10)
@@ -327,6 +260,11 @@ class CANHostComputer:
         self.stop_btn = ttk.Button(send_frame, text="停止发送", command=self.stop_sending, state="disabled")
         self.stop_btn.pack(side="left", padx=5)
         
+        # 0x305/0x307的发送周期
+        ttk.Label(send_frame, text="周期(ms):").pack(side="left", padx=5)
+        self.send_period_var = tk.StringVar(value=f"{SEND_INTERVAL * 1000:g}")
+        ttk.Entry(send_frame, textvariable=self.send_period_var, width=6).pack(side="left", padx=5)
+        
         # 接收控制
         receive_frame = ttk.Frame(btn_frame)
         receive_frame.pack(side="left", padx=10)
@@ -339,6 +277,22 @@ class CANHostComputer:
                                            state="disabled")
         self.receive_check.pack(side="left", padx=5)
         
+        # 二进制录制：接收线程把收到的报文按批追加到.cancap文件
+        self.capture_var = tk.BooleanVar(value=False)
+        self.capture_check = ttk.Checkbutton(receive_frame, text="录制报文",
+                                           variable=self.capture_var,
+                                           command=self.toggle_capture)
+        self.capture_check.pack(side="left", padx=5)
+        
+        self.stats_btn = ttk.Button(receive_frame, text="报文统计", command=self.open_statistics_window)
+        self.stats_btn.pack(side="left", padx=5)
+        
+        self.plot_btn = ttk.Button(receive_frame, text="信号曲线", command=self.open_plot_window)
+        self.plot_btn.pack(side="left", padx=5)
+        
+        self.cell_btn = ttk.Button(receive_frame, text="电芯概况", command=self.open_cell_window)
+        self.cell_btn.pack(side="left", padx=5)
+        
         # 状态显示
         lang = LANGUAGES[self.lang]
         self.status_var = tk.StringVar(value=lang['disconnected'])
@@ -417,6 +371,14 @@ class CANHostComputer:
                                              command=self.toggle_auto_save)
         self.auto_save_check.pack(side="left", padx=5)
         
+        # 日志级别：DEBUG会记录每一帧的收发和解析
+        ttk.Label(log_btn_frame, text="日志级别:").pack(side="left", padx=(10, 2))
+        self.log_level_var = tk.StringVar(value='INFO')
+        log_level_combo = ttk.Combobox(log_btn_frame, textvariable=self.log_level_var,
+                                       values=list(LOG_LEVELS), width=9, state="readonly")
+        log_level_combo.pack(side="left")
+        log_level_combo.bind("<<ComboboxSelected>>", self.on_log_level_change)
+        
         # 日志文本框
         self.log_text = scrolledtext.ScrolledText(log_frame, height=15)
         self.log_text.pack(fill="both", expand=True)
@@ -456,7 +418,8 @@ class CANHostComputer:
                 return
 
             self.log_filename = filename
-            self.log_file = open(self.log_filename, 'w', encoding='utf-8')
+            # 后台线程块缓冲写入，每LOG_FLUSH_INTERVAL秒刷新一次
+            self.log_file = LogFileWriter(self.log_filename, LOG_FLUSH_INTERVAL, LOG_FILE_BUFFER_SIZE)
 
             # 写入日志文件头部信息
             header = f"CAN协议上位机日志文件\n"
@@ -464,7 +427,6 @@ class CANHostComputer:
             header += f"设备类型: 创芯科技CANalyst-II\n"
             header += "=" * 50 + "\n\n"
             self.log_file.write(header)
-            self.log_file.flush()
 
             self.log_message(f"自动保存日志已开启，日志文件: {self.log_filename}")
 
@@ -481,8 +443,7 @@ class CANHostComputer:
                 footer += f"日志结束时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
                 footer += f"总日志条数: {self.get_log_line_count()}\n"
                 
-                self.log_file.write(footer)
-                self.log_file.close()
+                self.log_file.close(footer)
                 
                 self.log_message(f"自动保存日志已停止，日志文件: {self.log_filename}")
                 
@@ -493,65 +454,80 @@ class CANHostComputer:
             self.log_filename = None
     
     def get_log_line_count(self):
-        """获取日志行数"""
-        try:
-            content = self.log_text.get(1.0, tk.END)
-            return len(content.split('\n')) - 1  # 减去最后一行空行
-        except:
-            return 0
+        """获取日志行数（自上次清空以来）"""
+        return self.log_buffer.total
+    
+    def log_enabled(self, level):
+        """高频路径先判断级别，被过滤时省去格式化字符串"""
+        return level >= self.log_level
     
-    def log_message(self, message, color="black"):
-        """添加日志消息"""
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+    def on_log_level_change(self, event=None):
+        self.log_level = LOG_LEVELS.get(self.log_level_var.get(), LOG_INFO)
+    
+    def log_message(self, message, color="black", level=LOG_INFO, at=None):
+        """添加日志消息，工作线程调用时经队列交给主线程显示；at为事件发生时刻（Unix秒），默认当前时间"""
+        if level < self.log_level:
+            return
+        moment = datetime.now() if at is None else datetime.fromtimestamp(at)
+        timestamp = moment.strftime("%H:%M:%S.%f")[:-3]
         
         # 构建完整的日志消息
         log_entry = f"[{timestamp}] {message}\n"
         
-        # 插入到界面文本框
-        self.log_text.insert(tk.END, log_entry)
-        
-        # 检查是否包含"心跳状态"并设置颜色
-        if "心跳状态" in message:
-            # 获取刚插入的行的起始和结束位置
-            last_line_start = self.log_text.index("end-2l linestart")
-            last_line_end = self.log_text.index("end-1c")
-            
-            # 为整行设置红色标签
-            self.log_text.tag_add("heartbeat_red", last_line_start, last_line_end)
-        
-        self.log_text.see(tk.END)
+        if threading.current_thread() is not self.ui_thread:
+            self.ui_queue.put(UI_LOG, log_entry)
+            return
+        self.write_log_entries([log_entry])
+    
+    def write_log_entries(self, entries):
+        """记录一批日志行（主线程）：进入环形缓冲区等待显示，并交给后台线程写文件"""
+        self.log_buffer.extend(entries)
         
         # 如果开启了自动保存，同时写入文件
         if self.auto_save_var.get() and self.log_file:
-            try:
-                self.log_file.write(log_entry)
-                self.log_file.flush()  # 立即写入文件，确保数据不丢失
-            except Exception as e:
-                # 如果写入文件失败，在界面上显示错误
-                error_msg = f"[{timestamp}] 写入日志文件失败: {str(e)}\n"
-                self.log_text.insert(tk.END, error_msg)
-                self.log_text.see(tk.END)
+            self.log_file.write("".join(entries))
+    
+    def render_log_view(self):
+        """把缓冲区中新增的日志行批量插入文本框，并裁剪到LOG_VIEW_CAPACITY行"""
+        # 写文件失败时在界面上显示错误
+        if self.log_file:
+            error = self.log_file.take_error()
+            if error:
+                timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+                self.log_buffer.extend([f"[{timestamp}] 写入日志文件失败: {str(error)}\n"])
+        
+        entries = self.log_buffer.take_pending()
+        if not entries:
+            return
+        # 一次insert调用插入多段文本，包含"心跳状态"的行加红色标签
+        args = []
+        for log_entry in entries:
+            args.append(log_entry)
+            args.append(("heartbeat_red",) if "心跳状态" in log_entry else ())
+        self.log_text.insert(tk.END, *args)
+        
+        line_count = int(self.log_text.index("end-1c").split(".")[0]) - 1
+        excess = line_count - self.log_buffer.capacity
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+        self.log_text.see(tk.END)
     
     def clear_log(self):
         """清空日志"""
         self.log_text.delete(1.0, tk.END)
+        self.log_buffer.clear()
         
         # 如果开启了自动保存，在日志文件中记录清空操作
         if self.auto_save_var.get() and self.log_file:
-            try:
-                timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                clear_msg = f"[{timestamp}] 用户手动清空日志\n"
-                self.log_file.write(clear_msg)
-                self.log_file.flush()
-            except Exception as e:
-                pass  # 忽略清空时的文件写入错误
+            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+            self.log_file.write(f"[{timestamp}] 用户手动清空日志\n")
     
     def save_log(self):
         """手动保存日志到文件（保留原有功能作为备用）"""
         try:
             filename = f"can_log_manual_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
             with open(filename, 'w', encoding='utf-8') as f:
-                f.write(self.log_text.get(1.0, tk.END))
+                f.write("".join(self.log_buffer.lines()))
             messagebox.showinfo("保存成功", f"日志已保存到: {filename}")
         except Exception as e:
             messagebox.showerror("保存失败", f"无法保存日志: {str(e)}")
@@ -567,16 +543,37 @@ class CANHostComputer:
     def connect_can(self):
         """连接CAN总线"""
         try:
+            backend = self.backend_var.get()
             device_type = VCI_USBCAN2
             device_index = int(self.device_index_var.get())
             can_index = int(self.can_index_var.get())
             baudrate = int(self.baudrate_var.get())
             
             self.log_message(f"正在连接CAN设备...")
-            self.log_message(f"设备类型: VCI_USBCAN2, 设备索引: {device_index}, CAN通道: {can_index}, 波特率: {baudrate}")
+            if backend == 'canalyst':
+                self.log_message(f"设备类型: VCI_USBCAN2, 设备索引: {device_index}, CAN通道: {can_index}, 波特率: {baudrate}")
+                bus_kwargs = {'device_type': device_type, 'device_index': device_index, 'can_index': can_index}
+            elif backend == 'socketcan':
+                self.log_message(f"SocketCAN接口: {self.interface_var.get()}")
+                bus_kwargs = {'channel': self.interface_var.get()}
+            elif backend == 'replay':
+                filename = filedialog.askopenfilename(
+                    title="选择回放的录制文件",
+                    filetypes=[("CAN录制文件", f"*{CAPTURE_SUFFIX}"), ("所有文件", "*.*")])
+                if not filename:
+                    return
+                speed = float(self.replay_speed_var.get() or 0)
+                self.log_message(f"回放录制文件: {filename}, 倍速: {speed:g}" + ("（最快）" if speed <= 0 else ""))
+                bus_kwargs = {'filename': filename, 'speed': speed}
+            else:
+                frame_rate = float(self.frame_rate_var.get() or 0)
+                self.log_message(f"虚拟总线: {self.interface_var.get()}, 注入速率: {frame_rate:g} 帧/秒")
+                bus_kwargs = {'channel': self.interface_var.get(), 'frame_rate': frame_rate}
             
-            # 创建CAN总线对象
-            self.can_bus = CANalystCANBus(device_type, device_index, can_index)
+            # 按名称创建CAN总线后端
+            self.can_bus = create_can_bus(backend, **bus_kwargs)
+            if self.hw_filter_var.get():
+                self.apply_acceptance_filter(backend)
             self.can_bus.connect(baudrate)
             
             self.is_connected = True
@@ -608,6 +605,20 @@ class CANHostComputer:
             messagebox.showerror("连接错误", f"无法连接CAN设备: {str(e)}")
             self.log_message(f"连接失败: {str(e)}")
     
+    def apply_acceptance_filter(self, backend):
+        """按解码器注册表和额外ID设置验收滤波，无关报文在控制器/内核中丢弃"""
+        try:
+            extra_ids = parse_can_id_list(self.extra_ids_var.get())
+        except ValueError:
+            raise Exception(f"额外ID格式错误: {self.extra_ids_var.get()}")
+        can_ids = acceptance_ids(extra_ids)
+        self.can_bus.set_acceptance_ids(can_ids)
+        message = f"硬件滤波: 接收 {len(can_ids)} 个ID"
+        if backend == 'canalyst':
+            acc_code, acc_mask, filter_mode = sja1000_acceptance(self.can_bus.filters)
+            message += f", AccCode=0x{acc_code:08X}, AccMask=0x{acc_mask:08X}, Filter={filter_mode}"
+        self.log_message(message)
+    
     def _initial_receive_test(self):
         """连接后立即测试接收"""
         try:
@@ -620,7 +631,7 @@ class CANHostComputer:
                 if messages:
                     received_count += len(messages)
                     for msg in messages:
-                        self.log_message(f"初始测试接收: ID=0x{msg['id']:03X}, 数据: {bytes(msg['data']).hex()}")
+                        self.log_message(f"初始测试接收: ID=0x{msg.id:03X}, 数据: {msg.data.hex()}")
                 time.sleep(0.1)
             
             if received_count > 0:
@@ -636,6 +647,7 @@ class CANHostComputer:
         if self.can_bus:
             self.stop_sending()
             self.stop_receiving()
+            self.stop_capture()
             self.can_bus.disconnect()
             self.can_bus = None
             
@@ -668,6 +680,13 @@ class CANHostComputer:
         """开始发送CAN报文"""
         if not self.is_connected:
             return
+        try:
+            period = float(self.send_period_var.get()) / 1000.0
+            if period <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("参数错误", f"发送周期无效: {self.send_period_var.get()}")
+            return
             
         self.is_running = True
         self.start_btn.config(state="disabled")
@@ -683,15 +702,25 @@ class CANHostComputer:
         self.update_send_data_table(0x305, lang['start_send_status'], 0, current_time)
         self.update_send_data_table(0x307, lang['start_send_status'], 0, current_time)
         
-        # 启动发送线程
-        self.send_thread = threading.Thread(target=self.send_messages, daemon=True)
-        self.send_thread.start()
-        
-        self.log_message("开始发送CAN报文")
+        # 按绝对截止时间周期发送，同时到期的报文合并为一次驱动调用
+        scheduler = TxScheduler(self.can_bus.send_many, on_sent=self.on_frames_sent,
+                                on_error=self.on_send_error)
+        scheduler.add(0x305, period, self.create_305_message())
+        scheduler.add(0x307, period, self.create_307_message())
+        for can_id, extra_period, data in TX_EXTRA_MESSAGES:
+            scheduler.add(can_id, extra_period, data)
+        self.tx_scheduler = scheduler
+        scheduler.start()
+        
+        self.log_message(f"开始发送CAN报文，周期 {period * 1000:g} ms")
     
     def stop_sending(self):
         """停止发送CAN报文"""
         self.is_running = False
+        if self.tx_scheduler is not None:
+            self.tx_scheduler.stop()
+            self.report_tx_statistics()
+            self.tx_scheduler = None
         self.start_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
         
@@ -703,84 +732,69 @@ class CANHostComputer:
         
         self.log_message("停止发送CAN报文")
         
-    def send_messages(self):
-        """发送CAN报文的线程函数"""
-        while self.is_running and self.is_connected:
-            try:
-                # 发送ID为0x305的报文
-                msg_305_data = self.create_305_message()
-                self.can_bus.send(0x305, msg_305_data)
-                self.sent_count += 1
+    def on_frames_sent(self, frames, sent_time):
+        """发送调度线程回调：更新计数，界面由主线程刷新"""
+        self.sent_count += len(frames)
+        for can_id, data in frames:
+            if can_id == 0x305:
                 self.sent_305_count += 1
-                self.sent_count_var.set(str(self.sent_count))
-                
-                # 更新发送数据表格 - 保持"正在发送"状态
-                current_time = datetime.now().strftime("%H:%M:%S")
-                lang = LANGUAGES[self.lang]
-                self.update_send_data_table(0x305, lang['start_send_status'], self.sent_305_count, current_time)
-                
-                self.log_message(f"发送: ID=0x305, 数据: {msg_305_data.hex()}")
-                
-                # 发送ID为0x307的报文
-                msg_307_data = self.create_307_message()
-                self.can_bus.send(0x307, msg_307_data)
-                self.sent_count += 1
+            elif can_id == 0x307:
                 self.sent_307_count += 1
-                self.sent_count_var.set(str(self.sent_count))
-                
-                # 更新发送数据表格 - 保持"正在发送"状态
-                current_time = datetime.now().strftime("%H:%M:%S")
-                lang = LANGUAGES[self.lang]
-                self.update_send_data_table(0x307, lang['start_send_status'], self.sent_307_count, current_time)
-                
-                self.log_message(f"发送: ID=0x307, 数据: {msg_307_data.hex()}")
-                
-                time.sleep(1)  # 每秒发送一次
-                
-            except Exception as e:
-                self.log_message(f"发送错误: {str(e)}")
-                break
-                
+            if self.log_enabled(LOG_DEBUG):
+                self.log_message(f"发送: ID=0x{can_id:03X}, 数据: {data.hex()}", level=LOG_DEBUG)
+        self.ui_queue.put(UI_SENT)
+    
+    def on_send_error(self, error):
+        """发送调度线程回调：发送失败，调度线程随后退出"""
+        self.log_message(f"发送错误: {str(error)}")
+    
+    def report_tx_statistics(self):
+        """记录各周期报文的实际发送周期和抖动"""
+        for stats in self.tx_scheduler.statistics():
+            if not stats.count:
+                continue
+            self.log_message(f"发送统计 0x{stats.can_id:03X}: {stats.count} 帧, "
+                             f"周期 {stats.period * 1000:g} ms, 实际平均 {stats.mean_period * 1000:.3f} ms, "
+                             f"抖动 {stats.jitter * 1000:.3f} ms, 最大偏差 {stats.max_deviation * 1000:.3f} ms, "
+                             f"最大延迟 {stats.max_lateness * 1000:.3f} ms, 跳过 {stats.missed} 次")
+    
     def create_305_message(self):
-        """创建0x305报文数据 - Keepalive from inverter to BMS"""
-        # 根据协议文档：8个字节都是0
-        data = bytearray(8)
-        # 所有字节都是0，不需要额外设置，bytearray默认就是0
-        return data
+        """创建0x305报文数据 - Keepalive from inverter to BMS（8个字节都是0）"""
+        return bytearray(INVERTER_KEEPALIVE_DATA)
         
     def create_307_message(self):
-        """创建0x307报文数据 - Inverter identification from inverter to BMS"""
-        # 根据协议文档：0x12 0x34 0x56 0x78 V I C 0x00
-        data = bytearray(8)
-        data[0] = 0x12  # Byte 0
-        data[1] = 0x34  # Byte 1
-        data[2] = 0x56  # Byte 2
-        data[3] = 0x78  # Byte 3
-        data[4] = ord('V')  # Byte 4: ASCII 'V'
-        data[5] = ord('I')  # Byte 5: ASCII 'I'
-        data[6] = ord('C')  # Byte 6: ASCII 'C'
-        data[7] = 0x00  # Byte 7: reserved for future use
-        return data               
-    def parse_can_message(self, msg):
-        """解析CAN报文"""
-        msg_id = msg['id']
-        data = msg['data']
+        """创建0x307报文数据 - Inverter identification from inverter to BMS（0x12 0x34 0x56 0x78 V I C 0x00）"""
+        return bytearray(INVERTER_IDENTIFICATION_DATA)
+    
+    def parse_can_message(self, msg, timestamp=None):
+        """解析CAN报文并交给分发器的订阅者，timestamp为接收时刻（Unix秒）"""
+        msg_id = msg.id
         
         try:
-            # 使用通用解析函数
-            parsed_data = parse_can_message(msg_id, data)
-            if parsed_data:
-                # 统一使用现有的update_table_data方法
-                self.update_table_data(msg_id, parsed_data)
-                self.log_message(f"成功解析 0x{msg_id:03X}: {parsed_data}")
-            else:
-                self.log_message(f"无法解析报文: ID=0x{msg_id:03X}")
+            # 同一帧只解析一次，结果分发给全部匹配的订阅者
+            parsed_data = self.dispatcher.dispatch(msg_id, msg.data, timestamp)
+            if not parsed_data and is_supported_can_id(msg_id) and self.log_enabled(LOG_WARNING):
+                self.log_message(f"无法解析报文: ID=0x{msg_id:03X}", level=LOG_WARNING)
         except Exception as e:
             self.log_message(f"解析报文 0x{msg_id:03X} 出错: {str(e)}")
+    
+    def on_parsed_message(self, msg_id, parsed_data, timestamp):
+        """分发器回调（接收线程）：解析结果交给信号时间序列，有变化时交给界面表格"""
+        if timestamp is None:
+            timestamp = time.time()
+        self.timeseries.add_parsed(parsed_data, timestamp)
+        changed = self.delta_filter.changes(msg_id, parsed_data, timestamp)
+        if not changed:
+            return
+        # 表格由主线程刷新，同一ID只保留最新值；表格按报文整体显示，传入完整的解析结果
+        self.ui_queue.put(UI_PARSED, (msg_id, (parsed_data, timestamp)))
+        if self.log_enabled(LOG_DEBUG):
+            self.log_message(f"解析 0x{msg_id:03X} 变化: {changed}", level=LOG_DEBUG, at=timestamp)
     def monitor_heartbeat(self):
         """监控心跳的线程函数"""
         self.log_message("心跳监控线程已启动")
-        heartbeat_timeout_reported = False  # 添加标志，避免重复报告超时
+        replay_reported = False
+        self.decode_time = 0.0
         
         while self.is_receiving and self.is_connected:
             try:
@@ -788,34 +802,44 @@ class CANHostComputer:
                 messages = self.can_bus.receive(timeout=10)
                 
                 if messages:
-                    self.log_message(f"接收到 {len(messages)} 个报文")
-                    for msg in messages:
+                    batch_start = time.perf_counter()
+                    # 各帧时间：设备时间戳换算到主机单调时钟，不含排队和界面延迟
+                    frame_times = self.timebase.convert(messages)
+                    capture_writer = self.capture_writer
+                    if capture_writer is not None:
+                        capture_writer.write_batch(messages, self.capture_channel, frame_times)
+                    self.statistics.update_batch(messages, frame_times)
+                    feed_watchdog = self.watchdog.feed
+                    if self.log_enabled(LOG_DEBUG):
+                        self.log_message(f"接收到 {len(messages)} 个报文", level=LOG_DEBUG)
+                    for msg, frame_time in zip(messages, frame_times):
                         # 在处理每个消息前检查停止标志
                         if not self.is_receiving:
                             break
                             
                         self.received_count += 1
-                        self.received_count_var.set(str(self.received_count))
-                        self.process_received_message(msg)
+                        feed_watchdog(msg.id, frame_time)
+                        receive_time = monotonic_to_wall(frame_time)
+                        self.process_received_message(msg, receive_time)
                         
                         # 检查心跳报文（0x351作为心跳标志）
-                        if msg['id'] == 0x351:
-                            self.last_heartbeat_time = time.time()
+                        if msg.id == 0x351:
+                            self.last_heartbeat_time = receive_time
                             self.heartbeat_count += 1  # 增加心跳计数
-                            lang = LANGUAGES[self.lang]
-                            self.heartbeat_status_var.set(lang['normal'])
-                            self.heartbeat_status_label.config(foreground="black") # 恢复黑色
-                            
-                            # 重置超时报告标志
-                            heartbeat_timeout_reported = False
                             
-                            # 更新表格中的心跳状态
-                            current_time = datetime.now().strftime("%H:%M:%S")
-                            lang = LANGUAGES[self.lang]
-                            self.update_table_item('0x351', lang['table_351'][0][0], str(self.heartbeat_count), '', lang['normal'], current_time)
-                            self.set_table_item_color('0x351', lang['table_351'][0][0], 'black')
+                            # 心跳状态由主线程刷新
+                            self.ui_queue.put(UI_HEARTBEAT)
                             
-                            self.log_message(f"收到心跳标志: ID=0x351, 数据: {bytes(msg['data']).hex()}")
+                            if self.log_enabled(LOG_DEBUG):
+                                self.log_message(f"收到心跳标志: ID=0x351, 数据: {msg.data.hex()}",
+                                                 level=LOG_DEBUG, at=receive_time)
+                    
+                    self.decode_time += time.perf_counter() - batch_start
+                
+                elif getattr(self.can_bus, 'finished', False) and not replay_reported:
+                    # 回放总线已送完全部录制帧
+                    self.report_replay_stats()
+                    replay_reported = True
                             
             except Exception as e:
                 if self.is_receiving:  # 只在仍在运行时报告错误
@@ -825,37 +849,228 @@ class CANHostComputer:
             # 在每次循环结束时检查停止标志
             if not self.is_receiving:
                 break
-                
-            # 检查心跳超时（3秒未收到0x351）
-            if self.last_heartbeat_time and (time.time() - self.last_heartbeat_time) > 3:
-                if not heartbeat_timeout_reported:  # 只在第一次超时时报告
-                    if not self.is_embedded and self.root:
-                        self.root.after(0, self.handle_heartbeat_timeout)
-                    heartbeat_timeout_reported = True
         
         self.log_message("心跳监控线程已退出")
     
-    def process_received_message(self, msg):
-        """处理接收到的CAN报文"""
-        msg_id = msg['id']
+    def describe_can_id(self, can_id):
+        """日志中显示的报文名称，按电池地址编址的报文带上电池地址"""
+        battery_address = DECODER_REGISTRY.get(can_id, (None, None))[1]
+        if battery_address is None:
+            return f"0x{can_id:03X}"
+        return f"0x{can_id:03X}(电池{battery_address})"
+    
+    def on_watchdog_timeout(self, can_id, silence):
+        """超时监控线程回调：周期报文超时"""
+        if can_id == 0x351:
+            self.ui_queue.put(UI_HEARTBEAT_TIMEOUT)
+        else:
+            self.log_message(f"警告: {self.describe_can_id(can_id)} 已 {silence:.1f} 秒未收到",
+                             level=LOG_WARNING)
+    
+    def on_watchdog_recovery(self, can_id, downtime):
+        """接收线程回调：超时的周期报文恢复"""
+        self.log_message(f"{self.describe_can_id(can_id)} 恢复，中断 {downtime:.1f} 秒", level=LOG_WARNING)
+    
+    def report_replay_stats(self):
+        """回放结束后报告回放速率和解码吞吐（解码帧数/接收线程处理耗时）"""
+        stats = self.can_bus.stats()
+        decode_fps = stats['frames'] / self.decode_time if self.decode_time > 0 else 0
+        self.log_message(f"回放完成: {stats['frames']} 帧, 耗时 {stats['elapsed']:.2f} s, "
+                         f"回放 {stats['fps']:,.0f} 帧/秒, 解码 {decode_fps:,.0f} 帧/秒")
+    
+    def open_statistics_window(self):
+        """打开按CAN ID的流量统计窗口，点击列标题排序，每秒刷新"""
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
+        lang = LANGUAGES[self.lang]
+        window = tk.Toplevel(self.main_frame)
+        window.title(lang['id_statistics'])
+        window.geometry("900x500")
+        self.stats_window = window
+        
+        headings = lang['id_statistics_columns']
+        tree = ttk.Treeview(window, columns=STAT_FIELDS, show='headings')
+        self.stats_sort = ['can_id', False]
+        
+        def sort_by(field):
+            # 再次点击同一列时反向排序
+            if self.stats_sort[0] == field:
+                self.stats_sort[1] = not self.stats_sort[1]
+            else:
+                self.stats_sort[:] = [field, field != 'can_id']
+            refresh(reschedule=False)
+        
+        for field in STAT_FIELDS:
+            tree.heading(field, text=headings[field], command=lambda f=field: sort_by(f))
+            tree.column(field, width=80, anchor='center')
+        scrollbar = ttk.Scrollbar(window, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        
+        def refresh(reschedule=True):
+            if not window.winfo_exists():
+                return
+            rows = self.statistics.rows(*self.stats_sort)
+            tree.delete(*tree.get_children())
+            for row in rows:
+                tree.insert('', 'end', values=(
+                    f"0x{row.can_id:03X}", row.count, f"{row.rate:.1f}",
+                    f"{row.mean_gap * 1000:.1f}", f"{row.jitter * 1000:.1f}",
+                    f"{row.p99_gap * 1000:.1f}", f"{row.max_gap * 1000:.1f}",
+                    row.dlc_errors, f"{row.last_seen:.3f}", f"{row.age:.1f}"))
+            if reschedule:
+                window.after(1000, refresh)
+        
+        refresh()
+    
+    def open_plot_window(self):
+        """打开解码信号曲线窗口（数据取自时间序列存储，按像素列降采样，限频重绘）"""
+        if self.plot_window is not None and self.plot_window.winfo_exists():
+            self.plot_window.lift()
+            return
+        lang = LANGUAGES[self.lang]
+        window = tk.Toplevel(self.main_frame)
+        window.title(lang['signal_plot'])
+        window.geometry("900x450")
+        self.plot_window = window
+        SignalPlotPanel(window, self.timeseries, lang).pack(fill="both", expand=True)
+    
+    def on_cell_event(self, event):
+        """接收线程回调：电芯压差/温差超过阈值或恢复"""
+        self.log_message(describe_event(event), level=LOG_WARNING, at=event.timestamp)
+    
+    def open_cell_window(self):
+        """打开电芯概况窗口：整组和各电池的电芯电压/温度最低、最高、平均和压差，每秒刷新"""
+        if self.cell_window is not None and self.cell_window.winfo_exists():
+            self.cell_window.lift()
+            return
+        lang = LANGUAGES[self.lang]
+        window = tk.Toplevel(self.main_frame)
+        window.title(lang['cell_overview'])
+        window.geometry("1000x450")
+        self.cell_window = window
+        
+        headings = lang['cell_overview_columns']
+        fields = list(headings)
+        tree = ttk.Treeview(window, columns=fields, show='headings')
+        for field in fields:
+            tree.heading(field, text=headings[field])
+            tree.column(field, width=80, anchor='center')
+        tree.tag_configure('alarm', foreground='red')
+        scrollbar = ttk.Scrollbar(window, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+        
+        def location(at):
+            return f"{at[0]}#{at[1]}" if isinstance(at, tuple) else f"#{at}"
         
-        # 扩展支持的CAN ID列表
-        supported_ids = [0x351, 0x355, 0x356, 0x35A, 0x35E, 0x35F]
+        def cells(summary, digits):
+            if summary is None:
+                return ("", "", "", "", "", "")
+            return (f"{summary.min:.{digits}f}", location(summary.min_at),
+                    f"{summary.max:.{digits}f}", location(summary.max_at),
+                    f"{summary.mean:.{digits}f}", f"{summary.spread:.{digits}f}")
         
-        # 添加新的0x2nn系列ID支持
-        for i in range(16):  # 支持电池地址0-15
-            supported_ids.extend([
-                0x200 + i, 0x210 + i, 0x220 + i, 0x230 + i, 0x240 + i, 0x250 + i, 0x260 + i, 0x270 + i,
-                0x400 + i, 0x410 + i, 0x420 + i, 0x430 + i, 0x440 + i, 0x450 + i, 0x460 + i,
-                0x470 + i, 0x480 + i, 0x490 + i, 0x4A0 + i
-            ])
+        def refresh():
+            if not window.winfo_exists():
+                return
+            try:
+                update_rows()
+            finally:
+                window.after(1000, refresh)  # 某次刷新出错也继续刷新
+        
+        def update_rows():
+            analytics = self.cell_analytics
+            alarms = set(analytics.alarms())
+            voltages = {s.battery_address: s for s in analytics.summaries('cell_voltage')}
+            temperatures = {s.battery_address: s for s in analytics.summaries('cell_temperature')}
+            rows = [(lang['stack'], None, analytics.stack('cell_voltage'), analytics.stack('cell_temperature'))]
+            rows += [(address, address, voltages.get(address), temperatures.get(address))
+                     for address in sorted(set(voltages) | set(temperatures))]
+            tree.delete(*tree.get_children())
+            for name, address, voltage, temperature in rows:
+                alarm = ('cell_voltage', address) in alarms or ('cell_temperature', address) in alarms
+                tree.insert('', 'end', values=(name,) + cells(voltage, 3) + cells(temperature, 1),
+                            tags=('alarm',) if alarm else ())
+        
+        refresh()
+    
+    def process_received_message(self, msg, timestamp=None):
+        """处理接收到的CAN报文"""
+        msg_id = msg.id
         
-        if msg_id in supported_ids:
-            self.log_message(f"解析报文: ID=0x{msg_id:03X}, 数据: {bytes(msg['data']).hex()}")
+        # 查表判断是否支持该ID
+        if is_supported_can_id(msg_id):
+            if self.log_enabled(LOG_DEBUG):
+                self.log_message(f"解析报文: ID=0x{msg_id:03X}, 数据: {msg.data.hex()}",
+                                 level=LOG_DEBUG, at=timestamp)
             
             # 根据协议解析具体内容
-            self.parse_can_message(msg)
+            self.parse_can_message(msg, timestamp)
+        elif self.dispatcher.lookup(msg_id):
+            # 其它ID只交给订阅了原始报文的消费者
+            self.dispatcher.dispatch(msg_id, msg.data, timestamp)
                 
+    def process_ui_queue(self):
+        """主线程定时任务：取出工作线程投递的事件，合并后一次性刷新界面"""
+        try:
+            events = self.ui_queue.drain()
+            if events:
+                self.apply_ui_events(events)
+            if self.table_dirty:
+                self.flush_table_updates()
+            self.render_log_view()
+        except Exception as e:
+            print(f"CAN工具界面刷新错误: {e}")
+        try:
+            self.main_frame.after(self.ui_refresh_ms, self.process_ui_queue)
+        except tk.TclError:
+            pass  # 窗口已关闭
+    
+    def apply_ui_events(self, events):
+        """把一批事件应用到界面（主线程）"""
+        logs, parsed, heartbeat, sent = coalesce_events(events)
+        
+        for can_id, (parsed_data, timestamp) in parsed.items():
+            self.update_table_data(can_id, parsed_data, timestamp)
+        
+        self.received_count_var.set(str(self.received_count))
+        
+        if heartbeat == UI_HEARTBEAT:
+            self.handle_heartbeat()
+        elif heartbeat == UI_HEARTBEAT_TIMEOUT:
+            self.handle_heartbeat_timeout()
+        
+        if sent and self.is_running:
+            self.sent_count_var.set(str(self.sent_count))
+            # 更新发送数据表格 - 保持"正在发送"状态
+            current_time = datetime.now().strftime("%H:%M:%S")
+            lang = LANGUAGES[self.lang]
+            self.update_send_data_table(0x305, lang['start_send_status'], self.sent_305_count, current_time)
+            self.update_send_data_table(0x307, lang['start_send_status'], self.sent_307_count, current_time)
+        
+        dropped = self.ui_queue.take_dropped()
+        if dropped:
+            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+            logs.append(f"[{timestamp}] 界面更新队列已满，丢弃 {dropped} 条更新\n")
+        if logs:
+            self.write_log_entries(logs)
+    
+    def handle_heartbeat(self):
+        """收到心跳后刷新心跳状态"""
+        lang = LANGUAGES[self.lang]
+        self.heartbeat_status_var.set(lang['normal'])
+        self.heartbeat_status_label.config(foreground="black") # 恢复黑色
+        # 更新表格中的心跳状态（取心跳报文的接收时刻）
+        heartbeat_time = self.last_heartbeat_time
+        moment = datetime.now() if heartbeat_time is None else datetime.fromtimestamp(heartbeat_time)
+        current_time = moment.strftime("%H:%M:%S")
+        self.update_table_item('0x351', lang['table_351'][0][0], str(self.heartbeat_count), '', lang['normal'], current_time)
+        self.set_table_item_color('0x351', lang['table_351'][0][0], 'black')
+
     def handle_heartbeat_timeout(self):
         """处理心跳超时"""
         lang = LANGUAGES[self.lang]
@@ -868,7 +1083,7 @@ class CANHostComputer:
         # 设置表格中“停止”为红色
         self.set_table_item_color('0x351', lang['table_351'][0][0], 'red')
         # 日志记录
-        self.log_message("警告: BMS心跳终止，3秒未收到0x351报文", color="red")
+        self.log_message(f"警告: BMS心跳终止，{HEARTBEAT_TIMEOUT}秒未收到0x351报文", color="red", level=LOG_WARNING)
 
     def test_receive(self):
         """手动测试接收功能"""
@@ -891,7 +1106,7 @@ class CANHostComputer:
                 messages = self.can_bus.receive(timeout=100)
                 if messages:
                     for msg in messages:
-                        self.log_message(f"测试接收: ID=0x{msg['id']:03X}, 数据: {bytes(msg['data']).hex()}")
+                        self.log_message(f"测试接收: ID=0x{msg.id:03X}, 数据: {msg.data.hex()}")
                 time.sleep(0.1)
             
             self.log_message("接收测试完成")
@@ -964,7 +1179,7 @@ class CANHostComputer:
                 if messages:
                     total_received += len(messages)
                     for msg in messages:
-                        self.log_message(f"强制测试接收: ID=0x{msg['id']:03X}, 数据: {bytes(msg['data']).hex()}")
+                        self.log_message(f"强制测试接收: ID=0x{msg.id:03X}, 数据: {msg.data.hex()}")
                 time.sleep(0.05)  # 更频繁的检查
             
             self.log_message(f"强制接收测试完成，总共接收: {total_received} 个报文")
@@ -985,6 +1200,44 @@ class CANHostComputer:
         else:
             self.stop_receiving()
 
+    def toggle_capture(self):
+        """切换二进制录制"""
+        if self.capture_var.get():
+            self.start_capture()
+        else:
+            self.stop_capture()
+    
+    def start_capture(self):
+        """开始把接收到的报文录制到.cancap文件"""
+        filename = filedialog.asksaveasfilename(
+            title="选择录制文件保存路径",
+            defaultextension=CAPTURE_SUFFIX,
+            filetypes=[("CAN录制文件", f"*{CAPTURE_SUFFIX}"), ("所有文件", "*.*")],
+            initialfile=f"can_capture_{datetime.now().strftime('%Y%m%d_%H%M%S')}{CAPTURE_SUFFIX}"
+        )
+        if not filename:
+            self.capture_var.set(False)
+            return
+        try:
+            self.capture_channel = int(self.can_index_var.get() or 0)
+            self.capture_writer = CaptureWriter(filename)
+            self.log_message(f"开始录制报文: {filename}")
+        except Exception as e:
+            messagebox.showerror("错误", f"无法创建录制文件: {str(e)}")
+            self.capture_var.set(False)
+    
+    def stop_capture(self):
+        """停止录制，写入索引并关闭文件"""
+        capture_writer, self.capture_writer = self.capture_writer, None
+        self.capture_var.set(False)
+        if capture_writer is None:
+            return
+        try:
+            capture_writer.close()
+            self.log_message(f"录制结束: {capture_writer.filename}, 共 {capture_writer.record_count} 帧")
+        except Exception as e:
+            self.log_message(f"关闭录制文件出错: {str(e)}")
+
     def start_receiving(self):
         """启动接收CAN报文的线程"""
         if not self.is_connected:
@@ -1003,6 +1256,11 @@ class CANHostComputer:
         self.heartbeat_status_var.set(lang['waiting'])
         self.heartbeat_count = 0
         self.last_heartbeat_time = None
+        self.statistics.clear()
+        self.timebase.reset()
+        self.delta_filter.reset()
+        self.watchdog.clear()
+        self.watchdog.start()
         
         # 重置表格中的心跳状态
         current_time = datetime.now().strftime("%H:%M:%S")
@@ -1024,6 +1282,10 @@ class CANHostComputer:
             self.receive_thread.join(timeout=3) # 给线程3秒时间停止
             if self.receive_thread.is_alive():
                 self.log_message("警告：接收线程可能未完全停止", color="orange")
+        self.watchdog.stop()
+        
+        # 先应用线程退出前投递的更新，避免之后覆盖停止状态
+        self.apply_ui_events(self.ui_queue.drain())
         
         # 重置心跳状态
         lang = LANGUAGES[self.lang]
@@ -1082,9 +1344,12 @@ class CANHostComputer:
         lang = LANGUAGES[self.lang]
         for item in self.data_tree.get_children():
             self.data_tree.delete(item)
+        self.table_index.clear()
+        self.table_values.clear()
+        self.table_dirty.clear()
         
         # 0x351 - 心跳状态特殊处理
-        self.data_tree.insert('', 'end', values=('0x351', lang['table_351'][0][0], '0', '', lang['waiting'], '--'))
+        self.insert_table_row(('0x351', lang['table_351'][0][0], '0', '', lang['waiting'], '--'))
         
         # 0x351 - 其他参数
         for label, key in lang['table_351'][1:]:  # 跳过第一个心跳状态
@@ -1093,12 +1358,12 @@ class CANHostComputer:
                 unit = 'V'
             elif 'current' in key or '电流' in label:
                 unit = 'A'
-            self.data_tree.insert('', 'end', values=('0x351', label, '--', unit, lang['waiting'], '--'))
+            self.insert_table_row(('0x351', label, '--', unit, lang['waiting'], '--'))
         
         # 0x355
         for label, key in lang.get('table_355', []):
             unit = '%' if 'soc' in key.lower() or 'soh' in key.lower() else ''
-            self.data_tree.insert('', 'end', values=('0x355', label, '--', unit, lang['waiting'], '--'))
+            self.insert_table_row(('0x355', label, '--', unit, lang['waiting'], '--'))
         
         # 0x356
         for label, key in lang.get('table_356', []):
@@ -1109,28 +1374,29 @@ class CANHostComputer:
                 unit = 'A'
             elif 'temperature' in key or '温度' in label:
                 unit = '°C'
-            self.data_tree.insert('', 'end', values=('0x356', label, '--', unit, lang['waiting'], '--'))
+            self.insert_table_row(('0x356', label, '--', unit, lang['waiting'], '--'))
         
         # 0x35A - Alarm信息
         for label, key in lang['table_35A_alarm']:
-            self.data_tree.insert('', 'end', values=('0x35A', label, '--', '', lang['waiting'], '--'))
+            self.insert_table_row(('0x35A', label, '--', '', lang['waiting'], '--'))
 
         # 0x35A - Warning信息
         for label, key in lang['table_35A_warning']:
-            self.data_tree.insert('', 'end', values=('0x35A', label, '--', '', lang['waiting'], '--'))
+            self.insert_table_row(('0x35A', label, '--', '', lang['waiting'], '--'))
 
         # 0x35E - 厂商名称
         for label, key in lang['table_35E']:
-            self.data_tree.insert('', 'end', values=('0x35E', label, '--', '', lang['waiting'], '--'))
+            self.insert_table_row(('0x35E', label, '--', '', lang['waiting'], '--'))
         
         # 0x35F - 电池模型、固件版本、在线容量
         for label, key in lang['table_35F']:
-            self.data_tree.insert('', 'end', values=('0x35F', label, '--', '', lang['waiting'], '--'))
+            self.insert_table_row(('0x35F', label, '--', '', lang['waiting'], '--'))
     
-    def update_table_data(self, can_id, parsed_data):
-        """更新表格数据"""
+    def update_table_data(self, can_id, parsed_data, timestamp=None):
+        """更新表格数据，timestamp为报文接收时刻（Unix秒）"""
         lang = LANGUAGES[self.lang]
-        current_time = datetime.now().strftime("%H:%M:%S")
+        moment = datetime.now() if timestamp is None else datetime.fromtimestamp(timestamp)
+        current_time = moment.strftime("%H:%M:%S")
 
         # ---------- 小工具：格式化标量 ----------
         def fmt_scalar(key, val):
@@ -1272,16 +1538,26 @@ class CANHostComputer:
                 self.update_table_item(can_id_display, label, val, unit, lang['normal'], current_time)
 
     def update_table_item(self, can_id, parameter, value, unit, status, update_time):
-        """更新表格中的单个项目，如果不存在则创建"""
-        # 先检查是否已存在该项目
-        for item in self.data_tree.get_children():
-            values = self.data_tree.item(item)['values']
-            if values[0] == can_id and values[1] == parameter:
-                self.data_tree.item(item, values=(can_id, parameter, value, unit, status, update_time))
-                return
-        
-        # 如果不存在，创建新条目
-        self.data_tree.insert('', 'end', values=(can_id, parameter, value, unit, status, update_time))
+        """登记表格中单个项目的最新值，由flush_table_updates统一写入，不存在则届时创建"""
+        self.table_dirty[(can_id, parameter)] = (can_id, parameter, value, unit, status, update_time)
+    
+    def insert_table_row(self, values):
+        """在数据表格末尾插入一行并登记到行索引"""
+        iid = self.data_tree.insert('', 'end', values=values)
+        self.table_index[(values[0], values[1])] = iid
+        self.table_values[iid] = values
+        return iid
+    
+    def flush_table_updates(self):
+        """把两次刷新之间变化的行一次写入表格，耗时只与变化的行数有关"""
+        dirty, self.table_dirty = self.table_dirty, {}
+        for key, values in dirty.items():
+            iid = self.table_index.get(key)
+            if iid is None:
+                self.insert_table_row(values)
+            elif self.table_values.get(iid) != values:
+                self.data_tree.item(iid, values=values)
+                self.table_values[iid] = values
 
     def create_send_data_table(self, parent):
         """创建发送数据表格"""
@@ -1394,6 +1670,11 @@ class CANHostComputer:
         self.start_btn.config(text=lang['start_send'])
         self.stop_btn.config(text=lang['stop_send'])
         self.receive_check.config(text=lang['open_receive'])
+        self.capture_check.config(text=lang['record_capture'])
+        self.hw_filter_check.config(text=lang['hw_filter'])
+        self.stats_btn.config(text=lang['id_statistics'])
+        self.plot_btn.config(text=lang['signal_plot'])
+        self.cell_btn.config(text=lang['cell_overview'])
         
         # 更新LabelFrame标题
         self.connection_frame.config(text=lang['connection_settings'])
@@ -1445,6 +1726,18 @@ class CANHostComputer:
                     # 更新特定的标签文本
                     if '语言/Language:' in text or 'Language:' in text:
                         widget.config(text=lang['language'])
+                    elif '后端:' in text or 'Backend:' in text:
+                        widget.config(text=lang['backend'])
+                    elif '接口:' in text or 'Interface:' in text:
+                        widget.config(text=lang['interface'])
+                    elif '注入速率' in text or 'Inject Rate' in text:
+                        widget.config(text=lang['inject_rate'])
+                    elif '回放倍速:' in text or 'Replay Speed:' in text:
+                        widget.config(text=lang['replay_speed'])
+                    elif '额外ID:' in text or 'Extra IDs:' in text:
+                        widget.config(text=lang['extra_ids'])
+                    elif '日志级别:' in text or 'Log Level:' in text:
+                        widget.config(text=lang['log_level'])
                     elif '设备类型:' in text or 'Device Type:' in text:
                         widget.config(text=lang.get('device_type', '设备类型:' if self.lang == 'zh' else 'Device Type:'))
                     elif '设备索引:' in text or 'Device Index:' in text:
@@ -1455,6 +1748,8 @@ class CANHostComputer:
                         widget.config(text=lang.get('baud_rate', '波特率:' if self.lang == 'zh' else 'Baud Rate:'))
                     elif '发送控制:' in text or 'Send Control:' in text:
                         widget.config(text=lang['send_control'])
+                    elif '周期(ms):' in text or 'Period (ms):' in text:
+                        widget.config(text=lang['send_period'])
                     elif '接收控制:' in text or 'Receive Control:' in text:
                         widget.config(text=lang['receive_control'])
                     elif '发送:' in text or 'Send:' in text:
@@ -1507,12 +1802,11 @@ class CANHostComputer:
 
     def set_table_item_color(self, can_id, parameter, color):
         """设置表格中特定行的字体颜色"""
-        for item in self.data_tree.get_children():
-            values = self.data_tree.item(item)['values']
-            if values[0] == can_id and values[1] == parameter:
-                self.data_tree.tag_configure('heartbeat_stop', foreground=color)
-                self.data_tree.item(item, tags=('heartbeat_stop',))
-                break
+        self.flush_table_updates()  # 确保该行已创建
+        item = self.table_index.get((can_id, parameter))
+        if item is not None:
+            self.data_tree.tag_configure('heartbeat_stop', foreground=color)
+            self.data_tree.item(item, tags=('heartbeat_stop',))
     
     def force_refresh_display(self):
         """强制刷新显示，解决标签页切换后控件不显示的问题"""
@@ -1560,6 +1854,7 @@ def main():
     def on_closing():
         if app.auto_save_var.get():
             app.stop_auto_save()
+        app.stop_capture()
         app.root.destroy()
     
     app.root.protocol("WM_DELETE_WINDOW", on_closing)
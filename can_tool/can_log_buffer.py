@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+CAN工具日志缓冲
+
+LogRingBuffer: 固定容量的日志行环形缓冲区，界面每次刷新只取新增的行批量显示，
+    内存不随运行时间增长。
+LogFileWriter: 后台线程写日志文件，块缓冲写入，按固定间隔flush，
+    调用方write()只是入队，不做磁盘IO。
+"""
+
+import threading
+from collections import deque
+
+# 日志级别，高频路径用log_enabled()先判断再格式化字符串
+LOG_DEBUG = 10
+LOG_INFO = 20
+LOG_WARNING = 30
+
+LOG_LEVELS = {
+    'DEBUG': LOG_DEBUG,
+    'INFO': LOG_INFO,
+    'WARNING': LOG_WARNING,
+}
+
+
+class LogRingBuffer:
+    """固定容量的日志行缓冲区（主线程使用）"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0  # 自上次清空以来的总行数
+        self._lines = deque(maxlen=capacity)
+        self._pending = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self._lines)
+
+    def extend(self, lines):
+        """追加多行，超出容量时丢弃最旧的行"""
+        self._lines.extend(lines)
+        self._pending.extend(lines)
+        self.total += len(lines)
+
+    def take_pending(self):
+        """返回自上次调用以来新增、尚未显示的行"""
+        pending = list(self._pending)
+        self._pending.clear()
+        return pending
+
+    def lines(self):
+        """缓冲区中的全部行"""
+        return list(self._lines)
+
+    def clear(self):
+        self._lines.clear()
+        self._pending.clear()
+        self.total = 0
+
+
+class LogFileWriter:
+    """后台线程批量写日志文件"""
+
+    def __init__(self, filename, flush_interval=1.0, buffer_size=64 * 1024, encoding='utf-8'):
+        self.filename = filename
+        self.flush_interval = flush_interval
+        self.error = None
+        self._file = open(filename, 'w', encoding=encoding, buffering=buffer_size)
+        self._pending = deque()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='can-log-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, text):
+        """入队，可在任意线程调用"""
+        self._pending.append(text)
+
+    def flush(self):
+        """请求后台线程立即写盘"""
+        self._wakeup.set()
+
+    def take_error(self):
+        """返回并清除最近一次写文件错误"""
+        error, self.error = self.error, None
+        return error
+
+    def _drain(self):
+        chunks = []
+        pop = self._pending.popleft
+        while True:
+            try:
+                chunks.append(pop())
+            except IndexError:
+                break
+        if chunks:
+            self._file.write("".join(chunks))
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self._drain()
+                self._file.flush()
+            except Exception as e:
+                self.error = e
+
+    def close(self, footer=""):
+        """写入剩余内容（和结尾信息）后关闭文件"""
+        if footer:
+            self.write(footer)
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        try:
+            self._drain()
+        finally:
+            self._file.close()
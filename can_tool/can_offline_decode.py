@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制文件离线并行解码
+
+把.cancap录制文件按记录序号切成若干块，交给ProcessPoolExecutor的各进程解码。
+每个进程自己用mmap打开文件，只传递(文件名, 起始序号, 结束序号)，不在进程间复制报文；
+每块按ID逐帧调用parse_can_message（与在线解析同一个DECODER_REGISTRY），结果整理成列式数据后返回，
+主进程按块的顺序拼接，得到每个ID一组的按信号分列的数据:
+    {can_id: {'timestamp_us': [...], 'channel': [...], 信号名: [...]}}
+装有numpy时各列为numpy数组。
+
+输出:
+    目录            每个ID一个CSV文件（如0x211.csv），列为timestamp, channel, 各信号
+    文件.npz        numpy压缩包，键为 "0x211/信号名"（需要numpy）
+
+用法: python can_offline_decode.py 录制文件.cancap 输出目录|输出.npz [--workers 进程数] [--chunk 每块帧数] [--ids 211,351]
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from can_acceptance import parse_can_id_list
+from can_capture import CaptureReader, FLAG_REMOTE
+from can_protocol_config import parse_can_message
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# 每块最多的帧数（24字节/帧，约6 MB）；块数至少为进程数的OFFLINE_CHUNKS_PER_WORKER倍，便于均衡负载
+OFFLINE_CHUNK_RECORDS = 1 << 18
+OFFLINE_CHUNKS_PER_WORKER = 4
+
+# 列式数据中的时间戳和通道列
+TIME_COLUMNS = ('timestamp_us', 'channel')
+
+
+def plan_chunks(record_count, workers, chunk_records=None):
+    """按记录序号切块，返回[(start, end)]"""
+    if chunk_records is None:
+        chunk_records = -(-record_count // max(1, workers * OFFLINE_CHUNKS_PER_WORKER))
+        chunk_records = max(1, min(chunk_records, OFFLINE_CHUNK_RECORDS))
+    return [(start, min(start + chunk_records, record_count))
+            for start in range(0, record_count, chunk_records)]
+
+
+def _add_row(table, timestamp_us, channel, parsed):
+    """把一条解析结果追加到该ID的列表中，信号缺失的位置补None"""
+    rows = len(table['timestamp_us'])
+    table['timestamp_us'].append(timestamp_us)
+    table['channel'].append(channel)
+    for name, value in parsed.items():
+        column = table.get(name)
+        if column is None:
+            column = table[name] = [None] * rows
+        column.append(value)
+    if len(table) - len(TIME_COLUMNS) > len(parsed):
+        for column in table.values():
+            if len(column) == rows:
+                column.append(None)
+
+
+NUMERIC_TYPES = (int, float, bool)
+
+
+def _to_array(column):
+    """列表 -> numpy数组，数值列为数值数组，其余（字符串、位标志字典、含None）为object数组"""
+    if all(type(value) in NUMERIC_TYPES for value in column):
+        return np.asarray(column)
+    array = np.empty(len(column), dtype=object)
+    array[:] = column
+    return array
+
+
+def decode_chunk(filename, start, end, can_ids=None):
+    """
+    解码录制文件中序号在[start, end)内的记录（在工作进程中执行）
+    Returns:
+        ({can_id: {列名: 列}}, 本块帧数, 解析成功的帧数)
+    """
+    tables = {}
+    decoded = 0
+    with CaptureReader(filename) as reader:
+        for record in reader.iter_range(start, end):
+            if record.flags & FLAG_REMOTE or (can_ids is not None and record.can_id not in can_ids):
+                continue
+            parsed = parse_can_message(record.can_id, record.data)
+            if not parsed:
+                continue
+            decoded += 1
+            table = tables.get(record.can_id)
+            if table is None:
+                table = tables[record.can_id] = {'timestamp_us': [], 'channel': []}
+            _add_row(table, record.timestamp_us, record.channel, parsed)
+    if NUMPY_AVAILABLE:
+        tables = {can_id: {name: _to_array(column) for name, column in table.items()}
+                  for can_id, table in tables.items()}
+    return tables, end - start, decoded
+
+
+def merge_chunks(results):
+    """按块的顺序拼接各块的列式数据，某块中没有的信号补None"""
+    parts = {}
+    for tables in results:
+        for can_id, table in tables.items():
+            parts.setdefault(can_id, []).append(table)
+    merged = {}
+    for can_id, tables in parts.items():
+        names = list(TIME_COLUMNS)
+        for table in tables:
+            names += [name for name in table if name not in names]
+        columns = {}
+        for name in names:
+            pieces = [table[name] if name in table else [None] * len(table['timestamp_us'])
+                      for table in tables]
+            if NUMPY_AVAILABLE:
+                if any(isinstance(piece, list) for piece in pieces):
+                    pieces = [_to_array(piece) if isinstance(piece, list) else piece for piece in pieces]
+                columns[name] = pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+            else:
+                columns[name] = [value for piece in pieces for value in piece]
+        merged[can_id] = columns
+    return merged
+
+
+def decode_capture(filename, workers=None, chunk_records=None, can_ids=None):
+    """
+    并行解码整个录制文件
+    Args:
+        workers: 进程数，默认为CPU核数；1时在本进程中解码
+        can_ids: 只解码这些ID，None为全部
+    Returns:
+        (列式数据, 统计{'frames', 'decoded', 'chunks', 'workers', 'elapsed', 'fps'})
+    """
+    workers = workers or os.cpu_count() or 1
+    can_ids = frozenset(can_ids) if can_ids is not None else None
+    with CaptureReader(filename) as reader:
+        record_count = len(reader)
+    chunks = plan_chunks(record_count, workers, chunk_records)
+    start_time = time.perf_counter()
+    if workers == 1 or len(chunks) <= 1:
+        results = [decode_chunk(filename, start, end, can_ids) for start, end in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(decode_chunk, *zip(*[(filename, start, end, can_ids)
+                                                               for start, end in chunks])))
+    merged = merge_chunks(tables for tables, _frames, _decoded in results)
+    elapsed = time.perf_counter() - start_time
+    frames = sum(result[1] for result in results)
+    stats = {
+        'frames': frames,
+        'decoded': sum(result[2] for result in results),
+        'chunks': len(chunks),
+        'workers': workers,
+        'elapsed': elapsed,
+        'fps': frames / elapsed if elapsed > 0 else 0.0,
+    }
+    return merged, stats
+
+
+def write_csv_columns(columns_by_id, directory):
+    """每个ID一个CSV文件，返回写入的文件数"""
+    os.makedirs(directory, exist_ok=True)
+    for can_id, columns in columns_by_id.items():
+        names = [name for name in columns if name not in TIME_COLUMNS]
+        filename = os.path.join(directory, f"0x{can_id:03X}.csv")
+        with open(filename, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp', 'channel'] + names)
+            timestamps = columns['timestamp_us']
+            writer.writerows(
+                [f"{int(timestamps[row]) / 1e6:.6f}", int(columns['channel'][row])]
+                + ['' if columns[name][row] is None else columns[name][row] for name in names]
+                for row in range(len(timestamps)))
+    return len(columns_by_id)
+
+
+def write_npz_columns(columns_by_id, filename):
+    """写入numpy压缩包，键为 "0x211/信号名" """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("写入.npz需要numpy")
+    np.savez_compressed(filename, **{f"0x{can_id:03X}/{name}": column
+                                     for can_id, columns in columns_by_id.items()
+                                     for name, column in columns.items()})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="录制文件离线并行解码，按信号分列输出")
+    parser.add_argument('capture', help=".cancap录制文件")
+    parser.add_argument('output', help="输出目录（每个ID一个CSV）或.npz文件")
+    parser.add_argument('--workers', type=int, help="进程数，默认为CPU核数")
+    parser.add_argument('--chunk', type=int, help=f"每块帧数，默认按进程数切分（最多{OFFLINE_CHUNK_RECORDS}）")
+    parser.add_argument('--ids', help="只解码这些ID（十六进制，逗号分隔）")
+    args = parser.parse_args(argv)
+    try:
+        columns, stats = decode_capture(args.capture, args.workers, args.chunk,
+                                        parse_can_id_list(args.ids) if args.ids else None)
+        if args.output.lower().endswith('.npz'):
+            write_npz_columns(columns, args.output)
+        else:
+            write_csv_columns(columns, args.output)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"解码失败: {e}", file=sys.stderr)
+        return 1
+    print(f"解码 {stats['frames']} 帧（成功 {stats['decoded']} 帧，{len(columns)} 个ID），"
+          f"{stats['workers']} 进程 {stats['chunks']} 块，耗时 {stats['elapsed']:.2f} s，{stats['fps']:,.0f} 帧/秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+解码信号实时曲线
+
+数据取自TimeSeriesStore：按画布像素列查询（max_points=列数，自动选用降采样层），
+再把每列聚合成一对min/max，画成一条折线（每个序列一个Canvas对象，重绘只更新坐标）。
+每次重绘的开销只与列数和序列数有关，与采样数无关；重绘频率不超过max_fps。
+"""
+
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+
+# 重绘频率上限（次/秒）
+PLOT_MAX_FPS = 4
+# 每个聚合列占的像素宽度
+COLUMN_PX = 2
+# 可选时间窗（秒）
+PLOT_WINDOWS = ("60", "600", "3600")
+# 16个电池地址的曲线颜色
+PLOT_COLORS = (
+    '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f',
+    '#bcbd22', '#17becf', '#393b79', '#637939', '#8c6d31', '#843c39', '#7b4173', '#3182bd',
+)
+# 绘图区边距（左、右、上、下）
+PLOT_MARGINS = (60, 10, 10, 20)
+
+CELL_VOLTAGE_PREFIX = 'cell_voltage_'
+
+
+def decimate_minmax(times, lows, highs, t0, t1, columns):
+    """
+    把[t0, t1)内的数据按列聚合
+    Returns:
+        [(列号, 最小值, 最大值)]，没有数据的列不输出
+    """
+    if columns <= 0 or t1 <= t0:
+        return []
+    scale = columns / (t1 - t0)
+    result = []
+    current = -1
+    lo = hi = 0.0
+    for t, low, high in zip(times, lows, highs):
+        column = int((t - t0) * scale)
+        if column < 0 or column >= columns:
+            continue
+        if column != current:
+            if current >= 0:
+                result.append((current, lo, hi))
+            current, lo, hi = column, low, high
+        else:
+            if low < lo:
+                lo = low
+            if high > hi:
+                hi = high
+    if current >= 0:
+        result.append((current, lo, hi))
+    return result
+
+
+def merge_columns(traces):
+    """多条按列聚合的数据合并成一条包络（每列取全体最小和最大）"""
+    lows = {}
+    highs = {}
+    for trace in traces:
+        for column, lo, hi in trace:
+            if column in lows:
+                if lo < lows[column]:
+                    lows[column] = lo
+                if hi > highs[column]:
+                    highs[column] = hi
+            else:
+                lows[column] = lo
+                highs[column] = hi
+    return [(column, lows[column], highs[column]) for column in sorted(lows)]
+
+
+def cell_spread_columns(store, t0, t1, columns):
+    """全部电池全部电芯电压的逐列包络，以及最新值的最大压差（V）"""
+    traces = []
+    latest = []
+    for battery_address, signal in store.keys():
+        if not signal.startswith(CELL_VOLTAGE_PREFIX):
+            continue
+        series = store.get(battery_address, signal)
+        sample = series.latest()
+        if sample is not None:
+            latest.append(sample[1])
+        result = series.range(t0, t1, max_points=columns)
+        traces.append(decimate_minmax(result.times, result.mins, result.maxs, t0, t1, columns))
+    spread = max(latest) - min(latest) if latest else None
+    return merge_columns(traces), spread
+
+
+class SignalPlotPanel(ttk.Frame):
+    """信号曲线面板：选择信号后按电池地址分色绘制，或绘制全部电芯电压的离散范围"""
+
+    def __init__(self, parent, store, lang, max_fps=PLOT_MAX_FPS):
+        super().__init__(parent)
+        self.store = store
+        self.lang = lang
+        self.interval_ms = int(1000 / max_fps)
+        self.cell_spread_label = lang['plot_cell_spread']
+
+        controls = ttk.Frame(self)
+        controls.pack(fill="x", pady=2)
+        ttk.Label(controls, text=lang['plot_signal']).pack(side="left", padx=5)
+        self.signal_var = tk.StringVar(value=self.cell_spread_label)
+        self.signal_combo = ttk.Combobox(controls, textvariable=self.signal_var, width=36,
+                                         state="readonly", postcommand=self.update_signal_list)
+        self.signal_combo.pack(side="left", padx=5)
+        ttk.Label(controls, text=lang['plot_window']).pack(side="left", padx=5)
+        self.window_var = tk.StringVar(value=PLOT_WINDOWS[0])
+        ttk.Combobox(controls, textvariable=self.window_var, values=PLOT_WINDOWS,
+                     width=6, state="readonly").pack(side="left", padx=5)
+        self.info_var = tk.StringVar(value="")
+        ttk.Label(controls, textvariable=self.info_var).pack(side="right", padx=5)
+
+        self.canvas = tk.Canvas(self, background="white", height=320, highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+        self._lines = {}   # 序列键 -> Canvas折线
+        self._labels = [self.canvas.create_text(0, 0, anchor="e", text="") for _ in range(2)]
+        self._frame_item = self.canvas.create_rectangle(0, 0, 0, 0, outline="#999999")
+        self._after_id = None
+        self.redraw()
+
+    def update_signal_list(self):
+        names = sorted({signal for _, signal in self.store.keys()})
+        self.signal_combo['values'] = [self.cell_spread_label] + names
+
+    def redraw(self):
+        """定时重绘（不可见时跳过）"""
+        try:
+            if self.winfo_ismapped():
+                self.draw()
+        except Exception as e:
+            print(f"CAN工具绘图错误: {e}", file=sys.stderr)
+        self._after_id = self.after(self.interval_ms, self.redraw)
+
+    def destroy(self):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        super().destroy()
+
+    def collect_traces(self, t0, t1, columns):
+        """返回 [(序列键, 颜色, [(列号, 最小值, 最大值)])]"""
+        signal = self.signal_var.get()
+        if signal == self.cell_spread_label:
+            spread_columns, spread = cell_spread_columns(self.store, t0, t1, columns)
+            self.info_var.set("" if spread is None else f"{self.lang['plot_max_spread']} {spread * 1000:.1f} mV")
+            return [('spread', '#d62728', spread_columns)]
+
+        self.info_var.set("")
+        traces = []
+        keys = sorted((key for key in self.store.keys() if key[1] == signal),
+                      key=lambda key: -1 if key[0] is None else key[0])
+        for battery_address, name in keys:
+            result = self.store.query(battery_address, name, t0, t1, max_points=columns)
+            color = PLOT_COLORS[(battery_address or 0) % len(PLOT_COLORS)]
+            traces.append(((battery_address, name), color,
+                           decimate_minmax(result.times, result.mins, result.maxs, t0, t1, columns)))
+        return traces
+
+    def draw(self):
+        canvas = self.canvas
+        width = canvas.winfo_width()
+        height = canvas.winfo_height()
+        left, right, top, bottom = PLOT_MARGINS
+        plot_width = width - left - right
+        plot_height = height - top - bottom
+        if plot_width < 20 or plot_height < 20:
+            return
+        columns = max(plot_width // COLUMN_PX, 1)
+        window = float(self.window_var.get() or PLOT_WINDOWS[0])
+        t1 = time.time()
+        t0 = t1 - window
+        traces = [trace for trace in self.collect_traces(t0, t1, columns) if trace[2]]
+
+        canvas.coords(self._frame_item, left, top, left + plot_width, top + plot_height)
+        if not traces:
+            for key in list(self._lines):
+                canvas.delete(self._lines.pop(key))
+            for label in self._labels:
+                canvas.itemconfigure(label, text="")
+            return
+
+        y_min = min(lo for _, _, trace in traces for _, lo, _ in trace)
+        y_max = max(hi for _, _, trace in traces for _, _, hi in trace)
+        if y_max - y_min < 1e-9:
+            y_min -= 0.5
+            y_max += 0.5
+        y_scale = plot_height / (y_max - y_min)
+        bottom_y = top + plot_height
+
+        used = set()
+        for key, color, trace in traces:
+            coords = []
+            for column, lo, hi in trace:
+                x = left + column * COLUMN_PX
+                coords += (x, bottom_y - (lo - y_min) * y_scale, x, bottom_y - (hi - y_min) * y_scale)
+            line = self._lines.get(key)
+            if line is None:
+                line = self._lines[key] = canvas.create_line(*coords, fill=color)
+            else:
+                canvas.coords(line, *coords)
+                canvas.itemconfigure(line, fill=color)
+            used.add(key)
+        for key in list(self._lines):
+            if key not in used:
+                canvas.delete(self._lines.pop(key))
+
+        canvas.coords(self._labels[0], left - 4, top)
+        canvas.itemconfigure(self._labels[0], text=f"{y_max:.3f}")
+        canvas.coords(self._labels[1], left - 4, bottom_y)
+        canvas.itemconfigure(self._labels[1], text=f"{y_min:.3f}")
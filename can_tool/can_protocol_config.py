@@ -1,5 +1,7 @@
  # CAN协议配置文件
 
+import struct
+
 # 波特率设置
 BAUDRATE_250K = 250000
 BAUDRATE_500K = 500000
@@ -146,7 +148,7 @@ MESSAGE_STRUCTURES = {
         'name': '配置信息',
         'length': 8,
         'fields': [
-            {'name': 'Arm_Antitheft_mode', 'offset': 0, 'length': 1, 'data_type': 'uint8', 'scaling': 1, 'description': 'ARM防盗模式'},
+            {'name': 'Arm_Antitheft_mode', 'offset': 0, 'length': 1, 'data_type': 'bit_flags', 'description': 'ARM防盗模式'},
             {'name': 'external_output', 'offset': 1, 'length': 1, 'data_type': 'uint8', 'scaling': 1, 'description': '外部输出'},
         ]
     },
@@ -192,7 +194,7 @@ MESSAGE_STRUCTURES = {
         'length': 8,
         'fields': [
             {'name': 'esp32_uptime_seconds', 'offset': 0, 'length': 4, 'data_type': 'uint32', 'scaling': 1, 'unit': 's','description': 'ESP32 uptime in seconds'},
-            {'name': ' esp32_free_heap_size_byte', 'offset': 4, 'length': 3, 'data_type': 'Uint24', 'scaling': 1, 'unit': 'B','description': 'Available memory in ESP32'},
+            {'name': 'esp32_free_heap_size_byte', 'offset': 4, 'length': 3, 'data_type': 'uint24', 'scaling': 1, 'unit': 'B','description': 'Available memory in ESP32'},
             {'name': 'esp32_temperature_celsius', 'offset': 7, 'length': 1, 'data_type': 'int8', 'scaling': 1, 'unit': '°C','description': 'ESP32 temperature in Celcius'},
         ]
     },
@@ -237,7 +239,7 @@ MESSAGE_STRUCTURES = {
         'name': 'MAC地址',
         'length': 8,
         'fields': [
-            {'name': ' esp32_mac_address', 'offset': 0, 'length': 6, 'data_type': 'int16','description': 'The MAC address of the ESP32'},
+            {'name': 'esp32_mac_address', 'offset': 0, 'length': 6, 'data_type': 'int16','description': 'The MAC address of the ESP32'},
             {'name': 'module_id', 'offset': 6, 'length': 2, 'data_type': 'uint8', 'description': 'Physical position of the battery in bank/stack counting from top.'},
         ]
     }
@@ -249,6 +251,65 @@ HEARTBEAT_TIMEOUT = 3
 # 发送间隔设置（秒）
 SEND_INTERVAL = 1
 
+# 逆变器发给BMS的周期报文：0x305心跳（8字节0），0x307逆变器标识（0x12 0x34 0x56 0x78 'V' 'I' 'C' 0x00）
+INVERTER_KEEPALIVE_DATA = bytes(8)
+INVERTER_IDENTIFICATION_DATA = bytes([0x12, 0x34, 0x56, 0x78, ord('V'), ord('I'), ord('C'), 0x00])
+
+# 0x305/0x307之外的周期发送报文: (CAN ID, 周期秒, 8字节数据)
+TX_EXTRA_MESSAGES = ()
+
+# 周期报文超时监控（秒）：固定ID直接监控；按电池地址编址的系列写基础ID，
+# 每个电池地址在首次收到报文后单独监控
+WATCHDOG_TIMEOUTS = {
+    0x351: HEARTBEAT_TIMEOUT,
+    0x355: HEARTBEAT_TIMEOUT,
+    0x356: HEARTBEAT_TIMEOUT,
+    0x200: HEARTBEAT_TIMEOUT,
+    0x210: HEARTBEAT_TIMEOUT,
+    0x220: HEARTBEAT_TIMEOUT,
+    0x230: HEARTBEAT_TIMEOUT,
+    0x240: HEARTBEAT_TIMEOUT,
+    0x250: HEARTBEAT_TIMEOUT,
+    0x260: HEARTBEAT_TIMEOUT,
+}
+
+# 界面刷新设置：主线程每秒消费接收队列的次数、队列容量（满时丢弃最旧的更新）
+UI_REFRESH_HZ = 20
+UI_QUEUE_CAPACITY = 20000
+
+# 日志设置：界面保留的日志行数、日志文件刷新间隔（秒）和写缓冲大小（字节）
+LOG_VIEW_CAPACITY = 5000
+LOG_FLUSH_INTERVAL = 1.0
+LOG_FILE_BUFFER_SIZE = 64 * 1024
+
+# 电芯一致性监控：单电池内和整组（全部电池）的电芯压差/温差超过阈值时产生不均衡事件，
+# 回落到阈值*CELL_IMBALANCE_HYSTERESIS以下时恢复
+CELL_VOLTAGE_COUNT = 16
+CELL_TEMPERATURE_COUNT = 4
+CELL_IMBALANCE_THRESHOLDS = {
+    'cell_voltage': {'battery': 0.05, 'stack': 0.10},  # V
+    'cell_temperature': {'battery': 5.0, 'stack': 8.0},  # °C
+}
+CELL_IMBALANCE_HYSTERESIS = 0.8
+
+# 变化输出：只输出与上次输出相比有变化的信号。模拟量按信号名前缀匹配死区，
+# 变化不超过死区时不输出；每个ID至少每DELTA_REFRESH_INTERVAL秒完整输出一次（None为不强制）
+SIGNAL_DEADBANDS = {
+    'cell_voltage': 0.002,  # V
+    'cell_temperature': 0.2,  # °C
+    'battery_voltage': 0.05,  # V
+    'rail_voltage': 0.05,  # V
+    'battery_current': 0.1,  # A
+    'fet_temperature': 0.2,  # °C
+}
+DELTA_REFRESH_INTERVAL = 1.0
+
+# 硬件验收滤波：除解码器支持的ID外额外接收的ID（如其它设备的报文），
+# CANalyst-II的SJA1000最多两组验收码/屏蔽码，SocketCAN最多使用的过滤器条数
+ACCEPTANCE_EXTRA_IDS = ()
+ACCEPTANCE_MAX_FILTERS_SJA1000 = 2
+ACCEPTANCE_MAX_FILTERS_SOCKETCAN = 32
+
 # 创芯科技设备设置
 CANALYST_DEVICE_TYPE = 4  # VCI_USBCAN2
 CANALYST_DEVICE_INDEX = 0
@@ -267,56 +328,6 @@ def signed_16bit(high_byte, low_byte):
         value -= 65536
     return value
 
-def parse_351_message(data):
-    """解析0x351报文 - 充放电信息（用作心跳标志）"""
-    if len(data) >= 8:
-        # 解析充放电信息
-        charge_voltage_limit = (data[1] << 8 | data[0]) * 0.1  # 充电电压限制 (V)
-        max_charge_current = (data[3] << 8 | data[2]) * 0.1    # 最大充电电流 (A)
-        max_discharge_current = (data[5] << 8 | data[4]) * 0.1  # 最大放电电流 (A)
-        discharge_voltage = (data[7] << 8 | data[6]) * 0.1      # 放电电压 (V)
-        
-        return {
-            'charge_voltage_limit': charge_voltage_limit,
-            'max_charge_current': max_charge_current,
-            'max_discharge_current': max_discharge_current,
-            'discharge_voltage': discharge_voltage
-        }
-    else:
-        return None
-
-def parse_355_message(data):
-    """解析0x355报文 - BMS状态信息"""
-    if len(data) >= 6:
-        # 解析SOC和SOH信息
-        soc_value = (data[1] << 8 | data[0])  # SOC值 (%)
-        soh_value = (data[3] << 8 | data[2])  # SOH值 (%)
-        high_res_soc = (data[5] << 8 | data[4]) * 0.01  # 高精度SOC (%)
-        
-        return {
-            'soc_value': soc_value,
-            'soh_value': soh_value,
-            'high_res_soc': high_res_soc
-        }
-    else:
-        return None
-
-def parse_356_message(data):
-    """解析0x356报文 - 电池信息"""
-    if len(data) >= 6:
-        # 解析电池信息（注意：sn16是有符号16位整数）
-        battery_voltage = signed_16bit(data[1], data[0]) * 0.01  # 电池电压 (V)
-        battery_current = signed_16bit(data[3], data[2]) * 0.1    # 电池电流 (A)
-        battery_temperature = signed_16bit(data[5], data[4]) * 0.1 # 电池温度 (°C)
-        
-        return {
-            'battery_voltage': battery_voltage,
-            'battery_current': battery_current,
-            'battery_temperature': battery_temperature
-        }
-    else:
-        return None
-
 def parse_35A_message(data):
     """解析0x35A报文 - BMS警告和报警信息"""
     if len(data) >= 8:
@@ -539,82 +550,6 @@ def parse_20n_message(data, battery_address=1):
         }
     return None
 
-def parse_21n_message(data, battery_address=1):
-    """解析0x21n报文 - 电池电流、电压和温度"""
-    if len(data) >= 8:
-        battery_current = signed_16bit(data[1], data[0]) * 0.1  # A
-        battery_voltage = unsigned_16bit(data[3], data[2]) * 0.001  # V
-        rail_voltage = unsigned_16bit(data[5], data[4]) * 0.001  # V
-        fet_temperature = signed_16bit(data[7], data[6]) * 0.1  # °C
-        
-        return {
-            'battery_current': battery_current,
-            'battery_voltage': battery_voltage,
-            'rail_voltage': rail_voltage,
-            'fet_temperature': fet_temperature,
-            'battery_address': battery_address
-        }
-    return None
-
-def parse_22n_message(data, battery_address=1):
-    """解析0x22n报文 - 电芯电压1-4"""
-    if len(data) >= 8:
-        return {
-            'cell_voltage_1': unsigned_16bit(data[1], data[0]) * 0.001,
-            'cell_voltage_2': unsigned_16bit(data[3], data[2]) * 0.001,
-            'cell_voltage_3': unsigned_16bit(data[5], data[4]) * 0.001,
-            'cell_voltage_4': unsigned_16bit(data[7], data[6]) * 0.001,
-            'battery_address': battery_address
-        }
-    return None
-
-def parse_23n_message(data, battery_address=1):
-    """解析0x23n报文 - 电芯电压5-8"""
-    if len(data) >= 8:
-        return {
-            'cell_voltage_5': unsigned_16bit(data[1], data[0]) * 0.001,
-            'cell_voltage_6': unsigned_16bit(data[3], data[2]) * 0.001,
-            'cell_voltage_7': unsigned_16bit(data[5], data[4]) * 0.001,
-            'cell_voltage_8': unsigned_16bit(data[7], data[6]) * 0.001,
-            'battery_address': battery_address
-        }
-    return None
-
-def parse_24n_message(data, battery_address=1):
-    """解析0x24n报文 - 电芯电压9-12"""
-    if len(data) >= 8:
-        return {
-            'cell_voltage_9': unsigned_16bit(data[1], data[0]) * 0.001,
-            'cell_voltage_10': unsigned_16bit(data[3], data[2]) * 0.001,
-            'cell_voltage_11': unsigned_16bit(data[5], data[4]) * 0.001,
-            'cell_voltage_12': unsigned_16bit(data[7], data[6]) * 0.001,
-            'battery_address': battery_address
-        }
-    return None
-
-def parse_25n_message(data, battery_address=1):
-    """解析0x25n报文 - 电芯电压13-16"""
-    if len(data) >= 8:
-        return {
-            'cell_voltage_13': unsigned_16bit(data[1], data[0]) * 0.001,
-            'cell_voltage_14': unsigned_16bit(data[3], data[2]) * 0.001,
-            'cell_voltage_15': unsigned_16bit(data[5], data[4]) * 0.001,
-            'cell_voltage_16': unsigned_16bit(data[7], data[6]) * 0.001,
-            'battery_address': battery_address
-        }
-    return None
-
-def parse_26n_message(data, battery_address=1):
-    """解析0x26n报文 - 电芯温度1-4"""
-    if len(data) >= 8:
-        return {
-            'cell_temperature_1': signed_16bit(data[1], data[0]) * 0.1,
-            'cell_temperature_2': signed_16bit(data[3], data[2]) * 0.1,
-            'cell_temperature_3': signed_16bit(data[5], data[4]) * 0.1,
-            'cell_temperature_4': signed_16bit(data[7], data[6]) * 0.1,
-            'battery_address': battery_address
-        }
-    return None
 def parse_27n_message(data, battery_address=1):
     """解析0x20n报文 - On configuration from site controller"""
     if len(data) >= 8:
@@ -628,62 +563,6 @@ def parse_27n_message(data, battery_address=1):
         }
     return None
 
-def parse_40n_message(data, battery_address=1):
-    """解析0x40n报文 - 系统温度"""
-    if len(data) >= 8:
-        return {
-            'dcdc_temperature_deci_celsius': signed_16bit(data[1], data[0]) * 0.1,
-            'pos_terminal_temp_deci_celsius': signed_16bit(data[3], data[2]) * 0.1,
-            'neg_terminal_temp_deci_celsius': signed_16bit(data[5], data[4]) * 0.1,
-            'battery_address': battery_address
-        }
-    return None
-
-def parse_41n_message(data, battery_address=1):
-    """解析0x41n报文 - 内部温度"""
-    if len(data) >= 8:
-        return {
-            'neg_bat_temp_1_deci_celsius': signed_16bit(data[1], data[0]) * 0.1,
-            'neg_bat_temp_2_deci_celsius': signed_16bit(data[3], data[2]) * 0.1,
-            'pos_bat_temp_cb_deci_celsius': signed_16bit(data[5], data[4]) * 0.1,
-            'battery_address': battery_address
-        }
-    return None
-
-def parse_42n_message(data, battery_address=1):
-    """解析0x42n报文 - 健康状态和循环次数"""
-    if len(data) >= 8:
-        return {
-            'state_of_health': data[0] * 0.5,
-            'cycle_count': unsigned_16bit(data[2], data[1]),
-            'lifetime_hour': unsigned_24bit(data[5], data[4], data[3]),
-            'cell_balance_state': unsigned_16bit(data[7], data[6]),
-            'battery_address': battery_address
-        }
-    return None
-
-def parse_43n_message(data, battery_address=1):
-    """解析0x43n报文 - MCU状态"""
-    if len(data) >= 8:
-        return {
-            'mcu_uptime_seconds': unsigned_32bit(data[3], data[2], data[1], data[0]),
-            'mcu_temperature_deci_celsius': signed_16bit(data[5], data[4]) * 0.1,
-            'afe_temperature_deci_celsius': signed_16bit(data[7], data[6]) * 0.1,
-            'battery_address': battery_address
-        }
-    return None
-
-def parse_44n_message(data, battery_address=1):
-    """解析0x44n报文 - ESP32状态"""
-    if len(data) >= 8:
-        return {
-            'esp32_uptime_seconds': unsigned_32bit(data[3], data[2], data[1], data[0]),
-            'esp32_free_heap_size_byte': unsigned_24bit(data[6], data[5], data[4]),
-            'esp32_temperature_celsius': data[7] if data[7] < 128 else data[7] - 256,  # signed int8
-            'battery_address': battery_address
-        }
-    return None
-
 def parse_45n_message(data, battery_address=1):
     """解析0x45n报文 - 控制器版本前8字符"""
     if len(data) >= 8:
@@ -728,17 +607,6 @@ def parse_48n_message(data, battery_address=1):
         }
     return None
 
-def parse_49n_message(data, battery_address=1):
-    """解析0x49n报文 - 加速度计"""
-    if len(data) >= 8:
-        return {
-            'accelerometer_x': signed_16bit(data[1], data[0]),
-            'accelerometer_y': signed_16bit(data[3], data[2]),
-            'accelerometer_z': signed_16bit(data[5], data[4]),
-            'battery_address': battery_address
-        }
-    return None
-
 def parse_4An_message(data, battery_address=1):
     """解析0x4An报文 - MAC地址和模块ID"""
     if len(data) >= 8:
@@ -750,6 +618,113 @@ def parse_4An_message(data, battery_address=1):
         }
     return None
 
+# ---------- 由MESSAGE_STRUCTURES布局构造的解析函数 ----------
+# data_type -> struct格式（小端）
+STRUCT_FORMATS = {
+    'uint8': 'B', 'int8': 'b',
+    'uint16': 'H', 'int16': 'h', 'un16': 'H', 'sn16': 'h',
+    'uint24': 'HB',  # 低16位 + 高8位，解包后合并
+    'uint32': 'I', 'int32': 'i',
+}
+
+class MessageCodec:
+    """
+    一条报文定义编译后的解码器
+    整帧用一个预编译的struct.Struct解包，再按字段缩放；
+    每帧只有一次unpack_from调用，data须支持缓冲区协议（bytes/bytearray/memoryview）
+    """
+    __slots__ = ('can_id', 'name', 'struct', 'fields', 'layout', 'decode')
+
+    def __init__(self, can_id, structure):
+        """结构中含位标志、字符串或长度不符的字段时抛出ValueError"""
+        fmt = '<'
+        fields = []
+        layout = []
+        position = 0
+        slot = 0
+        for field in sorted(structure['fields'], key=lambda f: f['offset']):
+            data_type = field.get('data_type')
+            code = STRUCT_FORMATS.get(data_type)
+            if code is None or struct.calcsize('<' + code) != field['length']:
+                raise ValueError(f"0x{can_id:03X}.{field['name']} 无法编译")
+            if field['offset'] < position:
+                raise ValueError(f"0x{can_id:03X}.{field['name']} 与前一字段重叠")
+            fmt += 'x' * (field['offset'] - position) + code
+            position = field['offset'] + field['length']
+
+            scale = field.get('scaling', 1)
+            # (信号名, 解包结果中的位置, 是否为低16位+高8位, 缩放系数；为1时不缩放保持整数)
+            layout.append((field['name'], slot, code == 'HB', None if scale == 1 else scale))
+            fields.append((field['name'], field['offset'], data_type, scale))
+            slot += len(code)
+
+        self.can_id = can_id
+        self.name = structure['name']
+        self.struct = struct.Struct(fmt)
+        self.fields = tuple(fields)
+        self.layout = tuple(layout)
+        self.decode = self.build_parser()
+
+    def build_parser(self, addressed=False):
+        """返回解析函数；addressed为True时签名为(data, battery_address=1)并返回电池地址"""
+        unpack_from = self.struct.unpack_from
+        error = struct.error
+        layout = self.layout
+
+        def decode(data):
+            try:
+                values = unpack_from(data)
+            except error:
+                return None
+            parsed = {}
+            for name, slot, wide, scale in layout:
+                value = values[slot] | values[slot + 1] << 16 if wide else values[slot]
+                parsed[name] = value if scale is None else value * scale
+            return parsed
+
+        if addressed:
+            def parser(data, battery_address=1):
+                parsed = decode(data)
+                if parsed is not None:
+                    parsed['battery_address'] = battery_address
+                return parsed
+        else:
+            parser = decode
+        parser.__doc__ = f"解析0x{self.can_id:03X}报文 - {self.name}（由MESSAGE_STRUCTURES生成）"
+        return parser
+
+def compile_message_structures(structures=MESSAGE_STRUCTURES):
+    """编译所有可编译的报文定义，返回 {CAN ID: MessageCodec}"""
+    codecs = {}
+    for can_id, structure in structures.items():
+        try:
+            codecs[can_id] = MessageCodec(can_id, structure)
+        except ValueError:
+            continue  # 位标志、字符串等报文使用手写解析函数
+    return codecs
+
+MESSAGE_CODECS = compile_message_structures()
+
+def make_message_parser(can_id, addressed=False):
+    """由编译后的解码器生成与手写解析函数同签名的parse函数"""
+    return MESSAGE_CODECS[can_id].build_parser(addressed)
+
+parse_351_message = make_message_parser(0x351)
+parse_355_message = make_message_parser(0x355)
+parse_356_message = make_message_parser(0x356)
+parse_21n_message = make_message_parser(0x210, addressed=True)
+parse_22n_message = make_message_parser(0x220, addressed=True)
+parse_23n_message = make_message_parser(0x230, addressed=True)
+parse_24n_message = make_message_parser(0x240, addressed=True)
+parse_25n_message = make_message_parser(0x250, addressed=True)
+parse_26n_message = make_message_parser(0x260, addressed=True)
+parse_40n_message = make_message_parser(0x400, addressed=True)
+parse_41n_message = make_message_parser(0x410, addressed=True)
+parse_42n_message = make_message_parser(0x420, addressed=True)
+parse_43n_message = make_message_parser(0x430, addressed=True)
+parse_44n_message = make_message_parser(0x440, addressed=True)
+parse_49n_message = make_message_parser(0x490, addressed=True)
+
 def get_battery_address_from_can_id(can_id):
     """从CAN ID中提取电池地址"""
     # 对于0x20n格式的ID，n就是电池地址
@@ -759,64 +734,69 @@ def get_battery_address_from_can_id(can_id):
         return can_id & 0x0F
     return 1  # 默认地址
 
+# 固定ID的报文解析函数
+FIXED_ID_PARSERS = {
+    0x351: parse_351_message,
+    0x355: parse_355_message,
+    0x356: parse_356_message,
+    0x35A: parse_35A_message,
+    0x35E: parse_35E_message,
+    0x35F: parse_35F_message,
+}
+
+# 按电池地址编址的报文系列：基础ID -> 解析函数，ID低4位为电池地址
+ADDRESSED_PARSERS = {
+    0x200: parse_20n_message,
+    0x210: parse_21n_message,
+    0x220: parse_22n_message,
+    0x230: parse_23n_message,
+    0x240: parse_24n_message,
+    0x250: parse_25n_message,
+    0x260: parse_26n_message,
+    0x270: parse_27n_message,
+    0x400: parse_40n_message,
+    0x410: parse_41n_message,
+    0x420: parse_42n_message,
+    0x430: parse_43n_message,
+    0x440: parse_44n_message,
+    0x450: parse_45n_message,
+    0x460: parse_46n_message,
+    0x470: parse_47n_message,
+    0x480: parse_48n_message,
+    0x490: parse_49n_message,
+    0x4A0: parse_4An_message,
+}
+
+# 电池地址数量（ID低4位）
+BATTERY_ADDRESS_COUNT = 16
+
+def build_decoder_registry():
+    """构建 CAN ID -> (解析函数, 电池地址) 查找表，电池地址为None表示固定ID报文"""
+    registry = {}
+    for can_id, parser in FIXED_ID_PARSERS.items():
+        registry[can_id] = (parser, None)
+    for base_id, parser in ADDRESSED_PARSERS.items():
+        for i in range(BATTERY_ADDRESS_COUNT):
+            can_id = base_id + i
+            registry[can_id] = (parser, get_battery_address_from_can_id(can_id))
+    return registry
+
+# 导入时构建一次
+DECODER_REGISTRY = build_decoder_registry()
+SUPPORTED_CAN_IDS = frozenset(DECODER_REGISTRY)
+
+def is_supported_can_id(can_id):
+    """判断CAN ID是否有对应的解析函数"""
+    return can_id in DECODER_REGISTRY
+
 def parse_can_message(can_id, data):
     """通用CAN报文解析函数"""
-    if can_id == 0x351:
-        return parse_351_message(data)
-    elif can_id == 0x355:
-        return parse_355_message(data)
-    elif can_id == 0x356:
-        return parse_356_message(data)
-    elif can_id == 0x35A:
-        return parse_35A_message(data)
-    elif can_id == 0x35E:
-        return parse_35E_message(data)
-    elif can_id == 0x35F:
-        return parse_35F_message(data)
-    # 新增的报文解析
-    battery_address = get_battery_address_from_can_id(can_id)
-    
-    # 0x20n系列
-    if (can_id & 0xFF0) == 0x200:
-        return parse_20n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x210:
-        return parse_21n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x220:
-        return parse_22n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x230:
-        return parse_23n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x240:
-        return parse_24n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x250:
-        return parse_25n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x260:
-        return parse_26n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x270:
-        return parse_27n_message(data, battery_address)
-    
-    # 0x40n系列
-    elif (can_id & 0xFF0) == 0x400:
-        return parse_40n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x410:
-        return parse_41n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x420:
-        return parse_42n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x430:
-        return parse_43n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x440:
-        return parse_44n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x450:
-        return parse_45n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x460:
-        return parse_46n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x470:
-        return parse_47n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x480:
-        return parse_48n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x490:
-        return parse_49n_message(data, battery_address)
-    elif (can_id & 0xFF0) == 0x4A0:
-        return parse_4An_message(data, battery_address)
-    
-    else:
-        return None
\ No newline at end of file
+    entry = DECODER_REGISTRY.get(can_id)
+    if entry is None:
+        return None
+    parser, battery_address = entry
+    if not isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data)  # 列表等序列统一转换一次
+    if battery_address is None:
+        return parser(data)
+    return parser(data, battery_address)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+按CAN ID统计报文流量
+
+每个ID占用固定大小的槽位（数组存储，内存不随运行时间增长），每帧O(1)更新:
+帧数、近期帧率、帧间隔均值/抖动/p99/最大值、DLC与协议长度不符的次数、最后出现时间。
+帧间隔p99由对数分桶直方图估算（每倍频程4个桶，相对误差约19%）。
+"""
+
+import math
+from array import array
+from collections import namedtuple
+
+from can_frames import FRAME_STRUCT, TIMESTAMP_TICK
+from can_protocol_config import DECODER_REGISTRY, MESSAGE_STRUCTURES
+
+# 帧间隔直方图：1us起，每倍频程HIST_STEPS个桶，共HIST_BUCKETS个桶（最后一个桶收纳更长的间隔）
+HIST_STEPS = 4
+HIST_BUCKETS = 30 * HIST_STEPS
+
+# 近期帧率的指数平滑系数
+RATE_ALPHA = 0.1
+
+IDStatistics = namedtuple('IDStatistics', [
+    'can_id', 'count', 'rate', 'mean_gap', 'jitter', 'p99_gap', 'max_gap',
+    'dlc_errors', 'last_seen', 'age',
+])
+
+# 可用于排序的列
+STAT_FIELDS = IDStatistics._fields
+
+
+def build_expected_lengths():
+    """CAN ID -> MESSAGE_STRUCTURES中定义的数据长度（按地址编址的ID取系列基础ID）"""
+    lengths = {}
+    for can_id in MESSAGE_STRUCTURES:
+        lengths[can_id] = MESSAGE_STRUCTURES[can_id]['length']
+    for can_id, (_parser, battery_address) in DECODER_REGISTRY.items():
+        base_id = can_id & 0xFF0 if battery_address is not None else can_id
+        if base_id in MESSAGE_STRUCTURES:
+            lengths[can_id] = MESSAGE_STRUCTURES[base_id]['length']
+    return lengths
+
+
+EXPECTED_LENGTHS = build_expected_lengths()
+
+
+def gap_bucket(gap):
+    """帧间隔（秒）-> 直方图桶号"""
+    if gap <= 1e-6:
+        return 0
+    bucket = int(math.log2(gap * 1e6) * HIST_STEPS)
+    return bucket if bucket < HIST_BUCKETS else HIST_BUCKETS - 1
+
+
+def bucket_upper(bucket):
+    """直方图桶的上界（秒）"""
+    return 2.0 ** ((bucket + 1) / HIST_STEPS) / 1e6
+
+
+class CANStatistics:
+    """按ID统计报文流量，update()在接收线程中调用，rows()可在任意线程读取"""
+
+    def __init__(self, expected_lengths=None):
+        self.expected_lengths = EXPECTED_LENGTHS if expected_lengths is None else expected_lengths
+        self.clear()
+
+    def clear(self):
+        self._slots = {}  # can_id -> 槽位号
+        self._ids = array('I')
+        self._count = array('Q')
+        self._dlc_errors = array('I')
+        self._last_seen = array('d')
+        self._gap_sum = array('d')
+        self._gap_sq_sum = array('d')
+        self._gap_max = array('d')
+        self._gap_ewma = array('d')
+        self._hist = array('I')
+        self.total = 0
+        self.latest = 0.0
+
+    def _new_slot(self, can_id):
+        # 先扩展各列再登记ID，读取线程按len(self._ids)遍历时不会越界
+        slot = len(self._ids)
+        for column in (self._count, self._dlc_errors):
+            column.append(0)
+        for column in (self._last_seen, self._gap_sum, self._gap_sq_sum, self._gap_max, self._gap_ewma):
+            column.append(0.0)
+        self._hist.extend([0] * HIST_BUCKETS)
+        self._ids.append(can_id)
+        self._slots[can_id] = slot
+        return slot
+
+    def __len__(self):
+        return len(self._ids)
+
+    def update(self, can_id, dlc, timestamp):
+        """记录一帧，timestamp单位为秒"""
+        slot = self._slots.get(can_id)
+        if slot is None:
+            slot = self._new_slot(can_id)
+        count = self._count[slot]
+        if count:
+            gap = timestamp - self._last_seen[slot]
+            if gap < 0:
+                gap = 0.0
+            self._gap_sum[slot] += gap
+            self._gap_sq_sum[slot] += gap * gap
+            if gap > self._gap_max[slot]:
+                self._gap_max[slot] = gap
+            if count == 1:
+                self._gap_ewma[slot] = gap
+            else:
+                self._gap_ewma[slot] += RATE_ALPHA * (gap - self._gap_ewma[slot])
+            self._hist[slot * HIST_BUCKETS + gap_bucket(gap)] += 1
+        self._count[slot] = count + 1
+        self._last_seen[slot] = timestamp
+        expected = self.expected_lengths.get(can_id)
+        if expected is not None and dlc != expected:
+            self._dlc_errors[slot] += 1
+        self.total += 1
+        if timestamp > self.latest:
+            self.latest = timestamp
+
+    def update_batch(self, batch, times=None):
+        """
+        记录一批CANFrameBatch报文
+        times为DeviceTimebase换算后的各帧时间，未给出时直接取设备时间戳（不处理回绕）
+        """
+        update = self.update
+        if times is not None:
+            for (can_id, _ts, _tf, _st, _rf, _ef, dlc, _data, _r), t in zip(FRAME_STRUCT.iter_unpack(batch.raw), times):
+                update(can_id, dlc, t)
+            return
+        for (can_id, ticks, _tf, _st, _rf, _ef, dlc, _data, _r) in FRAME_STRUCT.iter_unpack(batch.raw):
+            update(can_id, dlc, ticks * TIMESTAMP_TICK)
+
+    def p99_gap(self, slot):
+        """由直方图估算帧间隔的99分位（秒）"""
+        gaps = self._count[slot] - 1
+        if gaps <= 0:
+            return 0.0
+        threshold = math.ceil(gaps * 0.99)
+        seen = 0
+        base = slot * HIST_BUCKETS
+        for bucket in range(HIST_BUCKETS):
+            seen += self._hist[base + bucket]
+            if seen >= threshold:
+                return min(bucket_upper(bucket), self._gap_max[slot])
+        return self._gap_max[slot]
+
+    def get(self, can_id):
+        """单个ID的统计，未出现过返回None"""
+        slot = self._slots.get(can_id)
+        return None if slot is None else self._row(slot)
+
+    def _row(self, slot):
+        count = self._count[slot]
+        gaps = count - 1
+        mean_gap = self._gap_sum[slot] / gaps if gaps > 0 else 0.0
+        variance = self._gap_sq_sum[slot] / gaps - mean_gap * mean_gap if gaps > 0 else 0.0
+        ewma = self._gap_ewma[slot]
+        return IDStatistics(
+            can_id=self._ids[slot],
+            count=count,
+            rate=1.0 / ewma if ewma > 0 else 0.0,
+            mean_gap=mean_gap,
+            jitter=math.sqrt(variance) if variance > 0 else 0.0,
+            p99_gap=self.p99_gap(slot),
+            max_gap=self._gap_max[slot],
+            dlc_errors=self._dlc_errors[slot],
+            last_seen=self._last_seen[slot],
+            age=self.latest - self._last_seen[slot],
+        )
+
+    def rows(self, sort_key='can_id', reverse=False):
+        """全部ID的统计，按sort_key（STAT_FIELDS之一）排序"""
+        if sort_key not in STAT_FIELDS:
+            raise ValueError(f"未知的统计列: {sort_key}")
+        rows = [self._row(slot) for slot in range(len(self._ids))]
+        rows.sort(key=lambda row: getattr(row, sort_key), reverse=reverse)
+        return rows
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+设备时间戳归一化
+
+VCI_CAN_OBJ.TimeStamp是设备上电以来的0.1ms计数，32位，约4.97天回绕一次。
+DeviceTimebase把它展开为不回绕的计数，再换算到主机单调时钟（time.monotonic）:
+    帧时间 = 偏移 + 展开计数 * 0.1ms
+接收函数返回时刻（CANFrameBatch.host_time）一定不早于批次最后一帧的实际到达时刻，
+因此每批给出偏移的一个上界，取各批上界的最小值即为传输延迟最小时的偏移，
+排队和调度延迟不会进入帧时间。为跟踪设备晶振与主机时钟的频差，
+偏移每秒最多上调DRIFT_ALLOWANCE；上界比当前偏移大出RESYNC_THRESHOLD以上时
+认为设备已复位（时间戳重新计数），重新同步。
+"""
+
+import time
+
+from can_frames import FRAME_STRUCT, TIMESTAMP_TICK
+
+# VCI_CAN_OBJ.TimeStamp的回绕周期（计数）
+TICK_WRAP = 1 << 32
+
+# 设备时钟与主机时钟的最大频差（每秒允许偏移上调的秒数）
+DRIFT_ALLOWANCE = 200e-6
+# 偏移上界超出当前偏移多少秒时重新同步
+RESYNC_THRESHOLD = 1.0
+
+# 单调时钟 -> Unix时间的差值（进程启动时取一次，界面显示和日志使用）
+WALL_OFFSET = time.time() - time.monotonic()
+
+
+def monotonic_to_wall(t):
+    """主机单调时钟时间 -> Unix秒"""
+    return t + WALL_OFFSET
+
+
+class DeviceTimebase:
+    """单个通道的设备时间戳 -> 主机单调时钟，在该通道的接收线程中使用"""
+
+    def __init__(self, tick=TIMESTAMP_TICK, drift_allowance=DRIFT_ALLOWANCE,
+                 resync_threshold=RESYNC_THRESHOLD):
+        self.tick = tick
+        self.drift_allowance = drift_allowance
+        self.resync_threshold = resync_threshold
+        self.reset()
+
+    def reset(self):
+        self._last_raw = None
+        self._wrap_base = 0
+        self.offset = None
+        self._offset_time = 0.0
+        self.wraps = 0
+        self.resyncs = 0
+
+    def unwrap(self, raw):
+        """32位计数 -> 展开计数（相邻两帧向后跳过半个周期以上视为回绕）"""
+        last = self._last_raw
+        if last is not None and raw < last and last - raw > TICK_WRAP // 2:
+            self._wrap_base += TICK_WRAP
+            self.wraps += 1
+        self._last_raw = raw
+        return self._wrap_base + raw
+
+    def convert_ticks(self, ticks, host_time):
+        """
+        一批帧的设备计数 -> 主机单调时钟时间
+        Args:
+            ticks: 按接收顺序的32位计数
+            host_time: 接收函数返回时的time.monotonic()
+        """
+        if not ticks:
+            return []
+        unwrap = self.unwrap
+        extended = [unwrap(raw) for raw in ticks]
+        tick = self.tick
+        bound = host_time - extended[-1] * tick
+        offset = self.offset
+        if offset is None or bound - offset > self.resync_threshold:
+            if offset is not None:
+                self.resyncs += 1
+            offset = bound
+        else:
+            allowed = offset + (host_time - self._offset_time) * self.drift_allowance
+            offset = bound if bound < allowed else allowed
+        self.offset = offset
+        self._offset_time = host_time
+        return [offset + ext * tick for ext in extended]
+
+    def convert(self, batch, host_time=None):
+        """CANFrameBatch -> 各帧的主机单调时钟时间，host_time默认取batch.host_time"""
+        if host_time is None:
+            host_time = batch.host_time if batch.host_time is not None else time.monotonic()
+        return self.convert_ticks([fields[1] for fields in FRAME_STRUCT.iter_unpack(batch.raw)],
+                                  host_time)
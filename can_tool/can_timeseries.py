@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+解码信号的内存时间序列存储
+
+每个(电池地址, 信号名)一条序列，全部使用预分配的环形数组：
+- 原始层: 最近RAW_CAPACITY个采样（时间 + 数值）
+- 降采样层: 按固定时间宽度分桶的min/max/mean，每层保留固定数量的桶，
+  采样写入时同时累加到各层当前桶（每个采样O(层数)）
+内存占用只与序列数有关，与运行时间无关；范围查询自动选择能覆盖该时间段的最细一层，
+不需要回看原始报文。
+"""
+
+import math
+from array import array
+from collections import namedtuple
+
+# 原始采样保留个数（10Hz约2分钟）
+RAW_CAPACITY = 1200
+
+# 降采样层: (桶宽度秒, 桶数)，依次约保留10分钟、2小时、24小时
+TIERS = (
+    (1.0, 600),
+    (10.0, 720),
+    (60.0, 1440),
+)
+
+SeriesRange = namedtuple('SeriesRange', ['times', 'mins', 'maxs', 'means'])
+
+
+class SeriesTier:
+    """一个降采样层：按桶号取模的环形数组，桶号即floor(时间/宽度)"""
+
+    __slots__ = ('width', 'capacity', 'newest', '_min', '_max', '_sum', '_count')
+
+    def __init__(self, width, capacity):
+        self.width = width
+        self.capacity = capacity
+        self.newest = None  # 最新桶号
+        self._min = array('f', bytes(4 * capacity))
+        self._max = array('f', bytes(4 * capacity))
+        self._sum = array('d', bytes(8 * capacity))
+        self._count = array('I', bytes(4 * capacity))
+
+    def add(self, t, value):
+        bucket = int(t // self.width)
+        newest = self.newest
+        if newest is None:
+            self.newest = bucket
+        elif bucket > newest:
+            # 进入新桶：清空跳过的桶（最多capacity个）
+            for b in range(max(newest + 1, bucket - self.capacity + 1), bucket + 1):
+                self._count[b % self.capacity] = 0
+            self.newest = bucket
+        elif bucket <= newest - self.capacity:
+            return  # 早于保留范围
+        slot = bucket % self.capacity
+        count = self._count[slot]
+        if count:
+            if value < self._min[slot]:
+                self._min[slot] = value
+            if value > self._max[slot]:
+                self._max[slot] = value
+            self._sum[slot] += value
+        else:
+            self._min[slot] = value
+            self._max[slot] = value
+            self._sum[slot] = value
+        self._count[slot] = count + 1
+
+    def oldest_time(self):
+        """保留范围的起始时间"""
+        if self.newest is None:
+            return math.inf
+        return (self.newest - self.capacity + 1) * self.width
+
+    def range(self, t0, t1):
+        """[t0, t1)内非空桶的 (桶起始时间, min, max, mean)"""
+        result = SeriesRange([], [], [], [])
+        if self.newest is None:
+            return result
+        first = max(int(t0 // self.width), self.newest - self.capacity + 1)
+        last = min(int(math.ceil(t1 / self.width)) - 1, self.newest)
+        for bucket in range(first, last + 1):
+            slot = bucket % self.capacity
+            count = self._count[slot]
+            if count:
+                result.times.append(bucket * self.width)
+                result.mins.append(self._min[slot])
+                result.maxs.append(self._max[slot])
+                result.means.append(self._sum[slot] / count)
+        return result
+
+
+class SignalSeries:
+    """单个信号的原始层 + 各降采样层"""
+
+    __slots__ = ('capacity', 'count', '_times', '_values', 'tiers')
+
+    def __init__(self, raw_capacity=RAW_CAPACITY, tiers=TIERS):
+        self.capacity = raw_capacity
+        self.count = 0  # 累计写入的采样数
+        self._times = array('d', bytes(8 * raw_capacity))
+        self._values = array('f', bytes(4 * raw_capacity))
+        self.tiers = [SeriesTier(width, capacity) for width, capacity in tiers]
+
+    def append(self, t, value):
+        """追加一个采样，时间应单调不减"""
+        slot = self.count % self.capacity
+        self._times[slot] = t
+        self._values[slot] = value
+        self.count += 1
+        for tier in self.tiers:
+            tier.add(t, value)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def _time_at(self, i):
+        """原始层第i个（从最旧算起）采样的时间"""
+        return self._times[(self.count - len(self) + i) % self.capacity]
+
+    def latest(self):
+        """最新采样 (时间, 数值)，没有采样时返回None"""
+        if not self.count:
+            return None
+        slot = (self.count - 1) % self.capacity
+        return self._times[slot], self._values[slot]
+
+    def raw_oldest_time(self):
+        return self._time_at(0) if self.count else math.inf
+
+    def _bisect(self, t):
+        """原始层中第一个时间>=t的位置"""
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._time_at(mid) < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def raw_range(self, t0, t1):
+        """原始层中[t0, t1)内的采样，min/max/mean均为原始值"""
+        n = len(self)
+        lo = self._bisect(t0)
+        hi = self._bisect(t1)
+        start = self.count - n
+        times = [self._times[(start + i) % self.capacity] for i in range(lo, hi)]
+        values = [self._values[(start + i) % self.capacity] for i in range(lo, hi)]
+        return SeriesRange(times, values, values, values)
+
+    def range(self, t0, t1, max_points=None):
+        """
+        查询[t0, t1)：原始层能覆盖t0且点数不超过max_points时返回原始采样，
+        否则返回能覆盖t0、点数不超过max_points的最细降采样层
+        """
+        if t0 >= self.raw_oldest_time():
+            raw = self.raw_range(t0, t1)
+            if max_points is None or len(raw.times) <= max_points:
+                return raw
+        for tier in self.tiers:
+            covers = t0 >= tier.oldest_time()
+            fits = max_points is None or (t1 - t0) / tier.width <= max_points
+            if covers and fits:
+                return tier.range(t0, t1)
+        # 都不满足时用最粗的一层
+        return self.tiers[-1].range(t0, t1)
+
+
+class TimeSeriesStore:
+    """
+    按(电池地址, 信号名)组织的时间序列，固定ID报文的电池地址为None
+    add_parsed()在接收线程中调用，查询可在其它线程进行
+    """
+
+    def __init__(self, raw_capacity=RAW_CAPACITY, tiers=TIERS):
+        self.raw_capacity = raw_capacity
+        self.tiers = tiers
+        self._series = {}
+
+    def __len__(self):
+        return len(self._series)
+
+    def append(self, battery_address, signal, t, value):
+        key = (battery_address, signal)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = SignalSeries(self.raw_capacity, self.tiers)
+        series.append(t, value)
+
+    def add_parsed(self, parsed_data, t):
+        """记录parse_can_message的结果中的数值信号"""
+        battery_address = parsed_data.get('battery_address')
+        for signal, value in parsed_data.items():
+            if signal == 'battery_address' or isinstance(value, bool):
+                continue
+            if isinstance(value, (int, float)):
+                self.append(battery_address, signal, t, value)
+
+    def keys(self):
+        """全部(电池地址, 信号名)"""
+        return list(self._series)
+
+    def get(self, battery_address, signal):
+        return self._series.get((battery_address, signal))
+
+    def query(self, battery_address, signal, t0, t1, max_points=None):
+        """查询单个信号[t0, t1)内的数据，返回SeriesRange"""
+        series = self._series.get((battery_address, signal))
+        if series is None:
+            return SeriesRange([], [], [], [])
+        return series.range(t0, t1, max_points)
+
+    def latest(self, signal):
+        """各电池地址上该信号的最新值 {电池地址: (时间, 数值)}"""
+        result = {}
+        for (battery_address, name), series in list(self._series.items()):
+            if name == signal:
+                sample = series.latest()
+                if sample is not None:
+                    result[battery_address] = sample
+        return result
+
+    def clear(self):
+        self._series = {}
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CAN报文记录的导入/导出
+
+支持的格式（按扩展名识别）:
+    candump  .log       candump -l 日志: (1436509052.249713) can0 123#DEADBEEF
+                        也可读取candump屏幕输出: (1436509052.249713) can0 123 [4] DE AD BE EF
+    asc      .asc       Vector ASC: 0.010000 1  351  Rx   d 8 30 02 7B 00 BB 00 B8 01
+                        时间相对文件头date行（本地时间，精确到秒），读取时加回date得到绝对时间
+    csv      .csv       timestamp,channel,can_id,extended,remote,dlc,data
+    cancap   .cancap    本工具的二进制录制格式
+内部统一用can_capture.CaptureRecord表示一帧（时间戳为微秒）。读取是逐行的生成器，
+写入按块（TRACE_CHUNK_SIZE帧）拼接后一次写出，任意大小的文件都以固定内存转换。
+转换时可同时把每帧交给parse_can_message，把解码后的信号写成CSV（长表: 每个信号一行）。
+
+用法: python can_trace_io.py 输入文件 输出文件 [--decoded 信号.csv]
+      python can_trace_io.py 输入文件 --decoded 信号.csv
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import re
+import sys
+import time
+
+from can_capture import CaptureReader, CaptureRecord, CaptureWriter, FLAG_EXTENDED, FLAG_REMOTE
+from can_protocol_config import parse_can_message
+
+# 写出时每块的帧数
+TRACE_CHUNK_SIZE = 4096
+
+TRACE_EXTENSIONS = {
+    '.log': 'candump',
+    '.candump': 'candump',
+    '.asc': 'asc',
+    '.csv': 'csv',
+    '.cancap': 'cancap',
+}
+
+CSV_TRACE_HEADER = ['timestamp', 'channel', 'can_id', 'extended', 'remote', 'dlc', 'data']
+CSV_DECODED_HEADER = ['timestamp', 'channel', 'can_id', 'battery_address', 'signal', 'value']
+
+_CANDUMP_LOG = re.compile(r'\(\s*([\d.]+)\)\s+(\S+)\s+([0-9A-Fa-f]+)#(\S*)')
+_CANDUMP_SCREEN = re.compile(r'(?:\(\s*([\d.]+)\)\s+)?(\S+)\s+([0-9A-Fa-f]+)\s+\[(\d)\]\s*(remote request|[0-9A-Fa-f ]*)')
+# ASC文件头的date行格式（本地时间），读取时也接受带毫秒的写法
+ASC_DATE_FORMATS = ('%a %b %d %I:%M:%S %p %Y', '%a %b %d %I:%M:%S.%f %p %Y', '%a %b %d %H:%M:%S %Y')
+
+_ASC_FRAME = re.compile(r'\s*([\d.]+)\s+(\d+)\s+([0-9A-Fa-f]+)(x?)\s+(Rx|Tx)\s+([dr])\s*(\d*)\s*([0-9A-Fa-f ]*)')
+
+
+def detect_format(filename):
+    """按扩展名识别格式"""
+    fmt = TRACE_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+    if fmt is None:
+        raise ValueError(f"无法识别的报文记录格式: {filename}")
+    return fmt
+
+
+def chunked(iterable, size=None):
+    """按块取出，每块为一个列表，默认每块TRACE_CHUNK_SIZE个"""
+    size = size or TRACE_CHUNK_SIZE
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _flags(extended, remote):
+    return (FLAG_EXTENDED if extended else 0) | (FLAG_REMOTE if remote else 0)
+
+
+class _ChannelNumbers:
+    """接口名 -> 通道号：名称以数字结尾时取该数字（can1 -> 1），否则按出现顺序编号"""
+
+    def __init__(self):
+        self._numbers = {}
+
+    def __call__(self, name):
+        number = self._numbers.get(name)
+        if number is None:
+            digits = re.search(r'(\d+)$', name)
+            number = int(digits.group(1)) if digits else len(self._numbers)
+            self._numbers[name] = number & 0xFF
+        return self._numbers[name]
+
+
+# ---------- 读取 ----------
+
+def _skip(on_skip, line, reason):
+    if on_skip is not None:
+        on_skip(line, reason)
+
+
+def _parse_candump_line(line, channel_number):
+    """解析一行candump，无法识别时返回None，格式错误时抛出ValueError"""
+    match = _CANDUMP_LOG.match(line)
+    if match:
+        timestamp, interface, can_id, payload = match.groups()
+        remote = payload.startswith('R')
+        if remote:
+            if not re.fullmatch(r'R\d?', payload):
+                raise ValueError(f"远程帧格式错误: {payload}")
+            data = b''
+            dlc = int(payload[1:]) if len(payload) > 1 else 0
+        else:
+            data = bytes.fromhex(payload)
+            dlc = len(data)
+    else:
+        match = _CANDUMP_SCREEN.match(line)
+        if not match:
+            return None
+        timestamp, interface, can_id, dlc, payload = match.groups()
+        dlc = int(dlc)
+        remote = payload.startswith('remote')
+        data = b'' if remote else bytes.fromhex(payload)[:dlc]
+    if len(data) > 8 or dlc > 8:
+        raise ValueError("数据超过8字节")
+    timestamp_us = int(round(float(timestamp) * 1e6)) if timestamp else 0
+    return CaptureRecord(timestamp_us, int(can_id, 16), dlc, channel_number(interface),
+                         _flags(len(can_id) > 3, remote), data)
+
+
+def read_candump(lines, on_skip=None):
+    """
+    解析candump日志行，跳过无法识别的行
+    数据不是偶数个十六进制字符等格式错误的行和CAN FD帧（ID##标志+数据）也跳过，
+    并调用on_skip(行, 原因)
+    """
+    channel_number = _ChannelNumbers()
+    for line in lines:
+        stripped = line.strip()
+        if '##' in stripped:
+            _skip(on_skip, line, "不支持CAN FD帧")
+            continue
+        try:
+            record = _parse_candump_line(stripped, channel_number)
+        except ValueError as e:
+            _skip(on_skip, line, str(e))
+            continue
+        if record is not None:
+            yield record
+
+
+def read_asc(lines, on_skip=None):
+    """解析Vector ASC行（只取CAN数据帧和远程帧，跳过事件和注释），格式错误的帧调用on_skip(行, 原因)"""
+    base = 16
+    start_us = 0
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith('base '):
+            base = 10 if stripped.split()[1] == 'dec' else 16
+            continue
+        if stripped.startswith('date '):
+            start_us = parse_asc_date(stripped[5:])
+            continue
+        match = _ASC_FRAME.match(line)
+        if not match:
+            continue
+        timestamp, channel, can_id, extended, _direction, kind, dlc, payload = match.groups()
+        remote = kind == 'r'
+        try:
+            dlc = int(dlc or 0, 16) if base == 16 else int(dlc or 0)
+            data = b'' if remote else bytes(int(item, base) for item in payload.split()[:dlc])
+            if dlc > 8:
+                raise ValueError("数据超过8字节")
+            record = CaptureRecord(start_us + int(round(float(timestamp) * 1e6)), int(can_id, base), dlc,
+                                   (int(channel) - 1) & 0xFF, _flags(extended, remote), data)
+        except ValueError as e:
+            _skip(on_skip, line, str(e))
+            continue
+        yield record
+
+
+def parse_asc_date(text):
+    """ASC的date行（本地时间）转为Unix微秒，无法识别时为0（时间保持相对）"""
+    for fmt in ASC_DATE_FORMATS:
+        try:
+            parsed = time.strptime(text.strip(), fmt)
+        except ValueError:
+            continue
+        milliseconds = re.search(r':\d+\.(\d{1,3})\b', text)
+        fraction = int(milliseconds.group(1).ljust(3, '0')) * 1000 if milliseconds else 0
+        return int(time.mktime(parsed)) * 1_000_000 + fraction
+    return 0
+
+
+def read_csv_trace(lines, on_skip=None):
+    """解析本工具导出的CSV（列名见CSV_TRACE_HEADER），格式错误的行调用on_skip(行, 原因)"""
+    for row in csv.DictReader(lines):
+        try:
+            data = bytes.fromhex(row['data'])
+            if len(data) > 8:
+                raise ValueError("数据超过8字节")
+            record = CaptureRecord(int(round(float(row['timestamp']) * 1e6)), int(row['can_id'], 16),
+                                   int(row['dlc']), int(row['channel']),
+                                   _flags(row['extended'] == '1', row['remote'] == '1'), data)
+        except (ValueError, TypeError) as e:  # 缺列时值为None
+            _skip(on_skip, ','.join(str(value) for value in row.values()), str(e))
+            continue
+        yield record
+
+
+def read_trace(filename, fmt=None, on_skip=None):
+    """逐帧读取报文记录文件，返回CaptureRecord生成器；文本格式中格式错误的行跳过并调用on_skip(行, 原因)"""
+    fmt = fmt or detect_format(filename)
+    if fmt == 'cancap':
+        with CaptureReader(filename) as reader:
+            yield from reader
+        return
+    readers = {'candump': read_candump, 'asc': read_asc, 'csv': read_csv_trace}
+    with open(filename, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        yield from readers[fmt](f, on_skip)
+
+
+# ---------- 写入 ----------
+
+class TraceWriter:
+    """文本格式写入的基类：format_records()把一块记录格式化为文本"""
+
+    def __init__(self, filename):
+        self._file = open(filename, 'w', encoding='utf-8', newline='')
+        self.count = 0
+        self._pending = []
+        self.write_header()
+
+    def write_header(self):
+        pass
+
+    def write_footer(self):
+        pass
+
+    def write(self, record):
+        self._pending.append(record)
+        if len(self._pending) >= TRACE_CHUNK_SIZE:
+            self.flush()
+
+    def write_many(self, records):
+        for chunk in chunked(records):
+            self._pending.extend(chunk)
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._file.write(self.format_records(self._pending))
+            self.count += len(self._pending)
+            self._pending = []
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self.write_footer()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CandumpWriter(TraceWriter):
+    """candump -l 日志格式，通道n写为接口名can<n>"""
+
+    def format_records(self, records):
+        lines = []
+        for r in records:
+            can_id = f"{r.can_id:08X}" if r.flags & FLAG_EXTENDED else f"{r.can_id:03X}"
+            payload = f"R{r.dlc}" if r.flags & FLAG_REMOTE else r.data.hex().upper()
+            lines.append(f"({r.timestamp_us / 1e6:.6f}) can{r.channel} {can_id}#{payload}\n")
+        return ''.join(lines)
+
+
+class AscWriter(TraceWriter):
+    """
+    Vector ASC格式（十六进制），通道n写为n+1
+    date行为第一帧所在的整秒（本地时间），各帧时间相对date行，读回时可还原绝对时间；
+    没有任何帧时date为start_time
+    """
+
+    def __init__(self, filename, start_time=None):
+        self.start_time = time.time() if start_time is None else start_time
+        self._start_us = None
+        super().__init__(filename)
+
+    def write_header(self):
+        pass  # 文件头在第一块记录时写出，date取第一帧的时间
+
+    def _write_date_header(self, start_time):
+        date = time.strftime(ASC_DATE_FORMATS[0], time.localtime(start_time))
+        self._file.write(f"date {date}\nbase hex  timestamps absolute\nno internal events logged\n"
+                         f"Begin Triggerblock {date}\n")
+
+    def write_footer(self):
+        if self._start_us is None:
+            self._write_date_header(self.start_time)
+        self._file.write("End TriggerBlock\n")
+
+    def format_records(self, records):
+        if self._start_us is None:
+            start = records[0].timestamp_us // 1_000_000
+            self._start_us = start * 1_000_000
+            self._write_date_header(start)
+        start_us = self._start_us
+        lines = []
+        for r in records:
+            can_id = f"{r.can_id:X}x" if r.flags & FLAG_EXTENDED else f"{r.can_id:X}"
+            if r.flags & FLAG_REMOTE:
+                frame = f"r {r.dlc:X}"
+            else:
+                frame = f"d {r.dlc:X} " + ' '.join(f"{b:02X}" for b in r.data)
+            lines.append(f"{(r.timestamp_us - start_us) / 1e6:11.6f} {r.channel + 1}  {can_id:<15} Rx   {frame}\n")
+        return ''.join(lines)
+
+
+class CsvTraceWriter(TraceWriter):
+    """CSV格式，列名见CSV_TRACE_HEADER"""
+
+    def write_header(self):
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(CSV_TRACE_HEADER)
+
+    def flush(self):
+        if self._pending:
+            self._csv.writerows(
+                (f"{r.timestamp_us / 1e6:.6f}", r.channel, f"{r.can_id:X}",
+                 1 if r.flags & FLAG_EXTENDED else 0, 1 if r.flags & FLAG_REMOTE else 0,
+                 r.dlc, r.data.hex().upper())
+                for r in self._pending)
+            self.count += len(self._pending)
+            self._pending = []
+
+
+class CaptureTraceWriter:
+    """写入.cancap录制文件"""
+
+    def __init__(self, filename):
+        self._writer = CaptureWriter(filename)
+        self.count = 0
+
+    def write(self, record):
+        self._writer.write_frame(record.can_id, record.data, record.timestamp_us,
+                                 record.channel, record.flags)
+        self.count += 1
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+TRACE_WRITERS = {
+    'candump': CandumpWriter,
+    'asc': AscWriter,
+    'csv': CsvTraceWriter,
+    'cancap': CaptureTraceWriter,
+}
+
+
+def open_trace_writer(filename, fmt=None):
+    """按格式创建写入对象，支持write/write_many/close和with语句"""
+    return TRACE_WRITERS[fmt or detect_format(filename)](filename)
+
+
+class DecodedCsvWriter(TraceWriter):
+    """把解析后的信号写成长表CSV（每个信号一行），无法解析的帧跳过"""
+
+    def write_header(self):
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(CSV_DECODED_HEADER)
+        self.decoded_frames = 0
+
+    def flush(self):
+        if not self._pending:
+            return
+        rows = []
+        for r in self._pending:
+            if r.flags & FLAG_REMOTE:
+                continue
+            parsed = parse_can_message(r.can_id, r.data)
+            if not parsed:
+                continue
+            self.decoded_frames += 1
+            timestamp = f"{r.timestamp_us / 1e6:.6f}"
+            battery_address = parsed.get('battery_address', '')
+            can_id = f"{r.can_id:X}"
+            for signal, value in parsed.items():
+                if signal != 'battery_address':
+                    rows.append((timestamp, r.channel, can_id, battery_address, signal, value))
+        self._csv.writerows(rows)
+        self.count += len(self._pending)
+        self._pending = []
+
+
+def convert_trace(source, destination=None, decoded_csv=None, source_format=None, destination_format=None,
+                  on_skip=None):
+    """
+    一次遍历完成格式转换和/或信号解码，输入中格式错误的行跳过并调用on_skip(行, 原因)
+    Returns:
+        (帧数, 成功解码的帧数)
+    """
+    if destination is None and decoded_csv is None:
+        raise ValueError("没有指定输出文件")
+    writers = []
+    try:
+        if destination is not None:
+            writers.append(open_trace_writer(destination, destination_format))
+        decoded = DecodedCsvWriter(decoded_csv) if decoded_csv is not None else None
+        if decoded is not None:
+            writers.append(decoded)
+        count = 0
+        for chunk in chunked(read_trace(source, source_format, on_skip)):
+            for writer in writers:
+                writer.write_many(chunk)
+            count += len(chunk)
+    finally:
+        for writer in writers:
+            writer.close()
+    return count, decoded.decoded_frames if decoded is not None else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CAN报文记录格式转换（candump/ASC/CSV/cancap）")
+    parser.add_argument('source', help="输入文件")
+    parser.add_argument('destination', nargs='?', help="输出文件，格式按扩展名识别")
+    parser.add_argument('--decoded', help="同时把解析后的信号写入该CSV文件")
+    args = parser.parse_args()
+    skipped = [0]  # 跳过的行数，前几行打印到标准错误
+
+    def on_skip(line, reason):
+        if skipped[0] < 5:
+            print(f"跳过: {line.strip()}（{reason}）", file=sys.stderr)
+        skipped[0] += 1
+
+    start = time.perf_counter()
+    try:
+        count, decoded = convert_trace(args.source, args.destination, args.decoded, on_skip=on_skip)
+    except (OSError, ValueError) as e:
+        print(f"转换失败: {e}", file=sys.stderr)
+        return 1
+    if skipped[0]:
+        print(f"共跳过 {skipped[0]} 行格式错误或不支持的报文", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"转换 {count} 帧（解码 {decoded} 帧），耗时 {elapsed:.2f} s, {count / max(elapsed, 1e-9):,.0f} 帧/秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+周期报文发送调度
+
+每条周期报文按绝对截止时间排程（第n次发送的计划时刻 = 起始时刻 + n * 周期），
+发送耗时、日志和调度延迟不会累积成周期漂移。同一时刻到期的报文合并为一次send_many调用。
+落后超过一个周期时跳过错过的周期（计入missed），不连续补发。
+每条报文统计实际发送间隔的均值、标准差（抖动）、与标称周期的最大偏差，以及相对计划时刻的最大延迟。
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import namedtuple
+
+# 截止时间前多少秒内到期的报文与当前报文一起发送
+TX_MERGE_WINDOW = 0.0005
+
+TxStatistics = namedtuple('TxStatistics', [
+    'can_id', 'period', 'count', 'mean_period', 'jitter', 'max_deviation', 'max_lateness', 'missed',
+])
+
+
+class PeriodicMessage:
+    """一条周期报文及其发送统计"""
+
+    __slots__ = ('can_id', 'period', 'data', 'start', 'index', 'count', 'missed', 'last_sent',
+                 '_gap_sum', '_gap_sq_sum', 'max_deviation', 'max_lateness', 'active')
+
+    def __init__(self, can_id, period, data, start):
+        self.can_id = can_id
+        self.period = period
+        self.data = data  # bytes，或每次发送时调用的函数
+        self.start = start
+        self.index = 0  # 下一次发送的序号
+        self.count = 0
+        self.missed = 0
+        self.last_sent = None
+        self._gap_sum = 0.0
+        self._gap_sq_sum = 0.0
+        self.max_deviation = 0.0
+        self.max_lateness = 0.0
+        self.active = True
+
+    @property
+    def deadline(self):
+        return self.start + self.index * self.period
+
+    def payload(self):
+        data = self.data() if callable(self.data) else self.data
+        return bytes(data[:8])
+
+    def record(self, sent_time):
+        """记录一次发送，并把下一次截止时间推到sent_time之后"""
+        lateness = sent_time - self.deadline
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+        if self.last_sent is not None:
+            gap = sent_time - self.last_sent
+            self._gap_sum += gap
+            self._gap_sq_sum += gap * gap
+            deviation = abs(gap - self.period)
+            if deviation > self.max_deviation:
+                self.max_deviation = deviation
+        self.last_sent = sent_time
+        self.count += 1
+        self.index += 1
+        behind = int((sent_time - self.deadline) // self.period) + 1
+        if behind > 0:
+            self.index += behind
+            self.missed += behind
+
+    def statistics(self):
+        gaps = self.count - 1
+        mean = self._gap_sum / gaps if gaps > 0 else 0.0
+        variance = self._gap_sq_sum / gaps - mean * mean if gaps > 0 else 0.0
+        return TxStatistics(self.can_id, self.period, self.count, mean,
+                            math.sqrt(variance) if variance > 0 else 0.0,
+                            self.max_deviation, self.max_lateness, self.missed)
+
+
+class TxScheduler:
+    """
+    周期发送调度器
+    - send_many(frames) -> 实际发送帧数，一般为总线的send_many
+    - on_sent(frames, sent_time)在调度线程中调用，frames为[(can_id, data)]
+    - on_error(exception)在发送失败（异常或未全部发出）时调用，之后调度线程退出
+    """
+
+    def __init__(self, send_many, on_sent=None, on_error=None, clock=time.monotonic):
+        self.send_many = send_many
+        self.on_sent = on_sent
+        self.on_error = on_error
+        self.clock = clock
+        self._messages = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def add(self, can_id, period, data, delay=0.0):
+        """添加（或替换）一条周期报文，delay秒后第一次发送"""
+        if period <= 0:
+            raise ValueError(f"发送周期必须大于0: 0x{can_id:03X}")
+        with self._cond:
+            old = self._messages.get(can_id)
+            if old is not None:
+                old.active = False
+            message = PeriodicMessage(can_id, period, data, self.clock() + delay)
+            self._messages[can_id] = message
+            heapq.heappush(self._heap, (message.deadline, next(self._seq), message))
+            self._cond.notify()
+        return message
+
+    def remove(self, can_id):
+        with self._cond:
+            message = self._messages.pop(can_id, None)
+            if message is not None:
+                message.active = False
+
+    def messages(self):
+        return list(self._messages.values())
+
+    def statistics(self):
+        """各报文的发送统计，按ID排序"""
+        return [self._messages[can_id].statistics() for can_id in sorted(self._messages)]
+
+    def next_deadline(self):
+        with self._cond:
+            while self._heap and not self._heap[0][2].active:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def run_once(self, now=None):
+        """
+        发送全部到期的报文（一次send_many）
+        Returns:
+            本次发送的[(can_id, data)]
+        """
+        now = self.clock() if now is None else now
+        due = []
+        with self._cond:
+            heap = self._heap
+            while heap and heap[0][0] <= now + TX_MERGE_WINDOW:
+                _deadline, _seq, message = heapq.heappop(heap)
+                if message.active:
+                    due.append(message)
+        if not due:
+            return []
+        frames = [(message.can_id, message.payload()) for message in due]
+        try:
+            sent = self.send_many(frames)
+        finally:
+            sent_time = self.clock()
+            with self._cond:
+                for message in due:
+                    message.record(sent_time)
+                    if message.active:
+                        heapq.heappush(self._heap, (message.deadline, next(self._seq), message))
+        if sent != len(frames):
+            raise Exception(f"发送CAN报文失败，仅发送 {sent}/{len(frames)} 帧")
+        if self.on_sent is not None:
+            self.on_sent(frames, sent_time)
+        return frames
+
+    @property
+    def is_running(self):
+        return self._running
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='can-tx', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        thread, self._thread = self._thread, None
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1)
+
+    def _run(self):
+        while self._running:
+            try:
+                self.run_once()
+            except Exception as e:
+                self._running = False
+                if self.on_error is not None:
+                    self.on_error(e)
+                break
+            deadline = self.next_deadline()
+            with self._cond:
+                if not self._running:
+                    break
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    wait = deadline - self.clock()
+                    if wait > 0:
+                        self._cond.wait(wait)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+接收/发送线程与Tk主线程之间的有界事件队列
+
+工作线程只调用put()，不碰任何Tk控件；主线程用after()定时drain()，
+合并后一次性刷新界面。deque的append/popleft本身是原子操作，不需要加锁。
+"""
+
+from collections import deque
+
+# 事件类型
+UI_LOG = 'log'                              # 已格式化的日志行
+UI_PARSED = 'parsed'                        # (can_id, 解析结果)
+UI_HEARTBEAT = 'heartbeat'                  # 收到0x351
+UI_HEARTBEAT_TIMEOUT = 'heartbeat_timeout'  # 心跳超时
+UI_SENT = 'sent'                            # 完成一轮发送
+
+
+class UIEventQueue:
+    """有界事件队列，满时丢弃最旧的事件并计数"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.dropped = 0
+        self._items = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, kind, payload=None):
+        """工作线程调用，从不阻塞"""
+        if len(self._items) >= self.capacity:
+            self.dropped += 1
+        self._items.append((kind, payload))
+
+    def drain(self, limit=None):
+        """主线程调用，取出当前队列中（最多limit个）事件"""
+        count = len(self._items)
+        if limit is not None:
+            count = min(count, limit)
+        pop = self._items.popleft
+        events = []
+        for _ in range(count):
+            try:
+                events.append(pop())
+            except IndexError:
+                break
+        return events
+
+    def take_dropped(self):
+        """返回并清零自上次调用以来丢弃的事件数"""
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+def coalesce_events(events):
+    """
+    合并一批事件：日志保持顺序，同一CAN ID的解析结果只保留最新值，
+    心跳状态取最后一个事件
+    Returns:
+        (日志行列表, {can_id: 解析结果}, 心跳事件类型或None, 发送事件数)
+    """
+    logs = []
+    parsed = {}
+    heartbeat = None
+    sent = 0
+    for kind, payload in events:
+        if kind == UI_LOG:
+            logs.append(payload)
+        elif kind == UI_PARSED:
+            can_id, data = payload
+            parsed.pop(can_id, None)  # 保持最近一次出现的顺序
+            parsed[can_id] = data
+        elif kind == UI_HEARTBEAT or kind == UI_HEARTBEAT_TIMEOUT:
+            heartbeat = kind
+        elif kind == UI_SENT:
+            sent += 1
+    return logs, parsed, heartbeat, sent
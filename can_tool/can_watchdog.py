@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+周期报文超时监控
+
+DeadlineWatchdog按键（CAN ID）维护截止时间堆，由独立线程在最早的截止时间到达时检查，
+与接收循环无关。每个键在堆中最多只有一项：收到报文时只更新最后出现时间（O(1)），
+堆顶到期时若该键在此期间收到过报文则按新的截止时间重新入堆（O(log n)），否则触发超时。
+超时后再次收到报文触发恢复。
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from can_protocol_config import DECODER_REGISTRY, WATCHDOG_TIMEOUTS
+
+
+def build_watch_timeouts(timeouts=None):
+    """
+    展开超时配置：固定ID直接使用，按电池地址编址的系列（基础ID）展开到全部地址
+    Returns:
+        {can_id: 超时秒数}
+    """
+    timeouts = WATCHDOG_TIMEOUTS if timeouts is None else timeouts
+    table = {}
+    for can_id, (_parser, battery_address) in DECODER_REGISTRY.items():
+        base_id = can_id & 0xFF0 if battery_address is not None else can_id
+        if base_id in timeouts:
+            table[can_id] = timeouts[base_id]
+    for can_id, timeout in timeouts.items():
+        table.setdefault(can_id, timeout)
+    return table
+
+
+class DeadlineWatchdog:
+    """
+    截止时间调度器
+    - feed(key)在接收线程中调用，键第一次出现时开始监控
+    - on_timeout(key, 静默秒数)在监控线程中调用
+    - on_recovery(key, 中断秒数)在调用feed的线程中调用
+    """
+
+    def __init__(self, timeouts, on_timeout, on_recovery=None, clock=time.monotonic):
+        self.timeouts = timeouts
+        self.on_timeout = on_timeout
+        self.on_recovery = on_recovery
+        self.clock = clock
+        self._states = {}  # key -> [最后出现时间, 是否已超时]
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def _push(self, deadline, key):
+        """入堆并唤醒监控线程（需持有锁）"""
+        heapq.heappush(self._heap, (deadline, next(self._seq), key))
+        self._cond.notify()
+
+    def feed(self, key, now=None):
+        """记录一次报文，未配置超时的键直接忽略"""
+        state = self._states.get(key)
+        if state is not None and not state[1]:
+            state[0] = self.clock() if now is None else now
+            return
+        timeout = self.timeouts.get(key)
+        if timeout is None:
+            return
+        now = self.clock() if now is None else now
+        with self._cond:
+            state = self._states.get(key)
+            if state is None:
+                self._states[key] = [now, False]
+                self._push(now + timeout, key)
+                return
+            if not state[1]:
+                state[0] = now
+                return
+            downtime = now - state[0]
+            state[0] = now
+            state[1] = False
+            self._push(now + timeout, key)
+        if self.on_recovery is not None:
+            self.on_recovery(key, downtime)
+
+    def check(self, now=None):
+        """处理到期的截止时间，返回本次触发超时的键"""
+        now = self.clock() if now is None else now
+        fired = []
+        with self._cond:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                _deadline, _seq, key = heapq.heappop(heap)
+                state = self._states.get(key)
+                if state is None or state[1]:
+                    continue
+                expiry = state[0] + self.timeouts[key]
+                if expiry > now:
+                    # 期间收到过报文，按新的截止时间重新入堆
+                    heapq.heappush(heap, (expiry, next(self._seq), key))
+                    continue
+                state[1] = True
+                fired.append((key, now - state[0]))
+        for key, silence in fired:
+            self.on_timeout(key, silence)
+        return [key for key, _ in fired]
+
+    def next_deadline(self):
+        """最早的截止时间，没有监控项时返回None"""
+        with self._cond:
+            return self._heap[0][0] if self._heap else None
+
+    def timed_out(self):
+        """当前处于超时状态的键"""
+        return [key for key, state in list(self._states.items()) if state[1]]
+
+    def clear(self):
+        with self._cond:
+            self._states.clear()
+            self._heap.clear()
+
+    def start(self):
+        """启动监控线程"""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='can-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止监控线程"""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        thread.join(timeout=1)
+
+    def _run(self):
+        while self._running:
+            self.check()
+            with self._cond:
+                if not self._running:
+                    break
+                if self._heap:
+                    wait = self._heap[0][0] - self.clock()
+                    if wait > 0:
+                        self._cond.wait(wait)
+                else:
+                    self._cond.wait()
@@ -7,7 +7,30 @@ LANGUAGES = {
         'stop_send': "停止发送",
         'receive_control': "接收控制:",
         'open_receive': "开启接收",
+        'record_capture': "录制报文",
+        'id_statistics': "报文统计",
+        'signal_plot': "信号曲线",
+        'plot_signal': "信号:",
+        'plot_window': "时间窗(秒):",
+        'plot_cell_spread': "电芯电压离散（全部电池）",
+        'plot_max_spread': "当前最大压差",
+        'cell_overview': "电芯概况",
+        'stack': "整组",
+        'cell_overview_columns': {
+            'battery': "电池",
+            'voltage_min': "最低电压(V)", 'voltage_min_at': "位置", 'voltage_max': "最高电压(V)",
+            'voltage_max_at': "位置", 'voltage_mean': "平均电压(V)", 'voltage_spread': "压差(V)",
+            'temperature_min': "最低温度(°C)", 'temperature_min_at': "位置", 'temperature_max': "最高温度(°C)",
+            'temperature_max_at': "位置", 'temperature_mean': "平均温度(°C)", 'temperature_spread': "温差(°C)",
+        },
+        'id_statistics_columns': {
+            'can_id': "CAN ID", 'count': "帧数", 'rate': "帧率(帧/秒)",
+            'mean_gap': "平均间隔(ms)", 'jitter': "抖动(ms)", 'p99_gap': "P99间隔(ms)",
+            'max_gap': "最大间隔(ms)", 'dlc_errors': "DLC错误", 'last_seen': "最后出现(s)",
+            'age': "未出现(s)",
+        },
         'send_control': "发送控制:",
+        'send_period': "周期(ms):",
         'status': "状态",
         'send': "发送",
         'receive': "接收",
@@ -26,6 +49,13 @@ LANGUAGES = {
         'device_index': "设备索引:",
         'can_channel': "CAN通道:",
         'baud_rate': "波特率:",
+        'backend': "后端:",
+        'interface': "接口:",
+        'inject_rate': "注入速率(帧/秒):",
+        'replay_speed': "回放倍速:",
+        'hw_filter': "硬件滤波",
+        'extra_ids': "额外ID:",
+        'log_level': "日志级别:",
         'can_id': "CAN ID",
         'parameter': "参数",
         'value': "数值",
@@ -261,7 +291,30 @@ LANGUAGES = {
         'stop_send': "Stop Send",
         'receive_control': "Receive Control:",
         'open_receive': "Enable Receive",
+        'record_capture': "Record Capture",
+        'id_statistics': "ID Statistics",
+        'signal_plot': "Signal Plot",
+        'plot_signal': "Signal:",
+        'plot_window': "Window (s):",
+        'plot_cell_spread': "Cell voltage spread (all batteries)",
+        'plot_max_spread': "Max spread",
+        'cell_overview': "Cell Overview",
+        'stack': "Stack",
+        'cell_overview_columns': {
+            'battery': "Battery",
+            'voltage_min': "Min V", 'voltage_min_at': "At", 'voltage_max': "Max V",
+            'voltage_max_at': "At", 'voltage_mean': "Mean V", 'voltage_spread': "Spread V",
+            'temperature_min': "Min °C", 'temperature_min_at': "At", 'temperature_max': "Max °C",
+            'temperature_max_at': "At", 'temperature_mean': "Mean °C", 'temperature_spread': "Spread °C",
+        },
+        'id_statistics_columns': {
+            'can_id': "CAN ID", 'count': "Frames", 'rate': "Rate (fps)",
+            'mean_gap': "Mean Gap (ms)", 'jitter': "Jitter (ms)", 'p99_gap': "P99 Gap (ms)",
+            'max_gap': "Max Gap (ms)", 'dlc_errors': "DLC Errors", 'last_seen': "Last Seen (s)",
+            'age': "Age (s)",
+        },
         'send_control': "Send Control:",
+        'send_period': "Period (ms):",
         'status': "Status",
         'send': "Send",
         'receive': "Receive",
@@ -280,6 +333,13 @@ LANGUAGES = {
         'device_index': "Device Index:",
         'can_channel': "CAN Channel:",
         'baud_rate': "Baud Rate:",
+        'backend': "Backend:",
+        'interface': "Interface:",
+        'inject_rate': "Inject Rate (fps):",
+        'replay_speed': "Replay Speed:",
+        'hw_filter': "HW Filter",
+        'extra_ids': "Extra IDs:",
+        'log_level': "Log Level:",
         'can_id': "CAN ID",
         'parameter': "Parameter",
         'value': "Value",
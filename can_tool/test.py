@@ -7,6 +7,7 @@ import tkinter as tk
 
 from can_host_computer import CANHostComputer
 from can_protocol_config import parse_can_message  # 仅确保依赖就绪
+from can_frames import CANFrame
 
 class FakeCANBus:
     """
@@ -56,6 +57,13 @@ class FakeCANBus:
         print(f"[FakeCANBus] TX id=0x{msg_id:03X} data={bytes(data).hex(' ')}")
         return True
 
+    def send_many(self, frames):
+        count = 0
+        for msg_id, data in frames:
+            self.send(msg_id, data)
+            count += 1
+        return count
+
     # ---- 大端编码工具 ----
     @staticmethod
     def _u16_be(val):
@@ -85,7 +93,7 @@ class FakeCANBus:
         return bytes([v])
 
     def _mk_msg(self, can_id, payload8):
-        return {'id': can_id, 'data': bytes(payload8), 'length': len(payload8), 'timestamp': time.time()}
+        return CANFrame(can_id, bytes(payload8), len(payload8), time.time())
 
     # ---- 基本帧 ----
     def _frame_351(self):
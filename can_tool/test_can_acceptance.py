@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试由解码器注册表计算的硬件验收滤波
+"""
+
+import pytest
+
+from can_acceptance import (AcceptanceFilter, acceptance_ids, acceptance_table, accepted_count,
+                            build_acceptance_filters, parse_can_id_list, sja1000_acceptance,
+                            SJA1000_ACCEPT_ALL, SJA1000_DUAL_FILTER, SJA1000_SINGLE_FILTER)
+from can_backends import VirtualCANBus
+from can_protocol_config import DECODER_REGISTRY
+
+
+def sja1000_accepts(acc_code, acc_mask, filter_mode, can_id):
+    """按SJA1000验收规则判断标准数据帧（RTR=0，数据字节任意）是否被接收"""
+    def match(code, mask, value, bits):
+        return not ((code ^ value) & ~mask & ((1 << bits) - 1))
+    if filter_mode == SJA1000_SINGLE_FILTER:
+        return match(acc_code >> 21, acc_mask >> 21, can_id, 11)
+    first = match(acc_code >> 21, acc_mask >> 21, can_id, 11)
+    second = match(acc_code >> 5, acc_mask >> 5, can_id, 11)
+    return first or second
+
+
+def test_registry_filters():
+    """两组过滤器覆盖全部支持的ID，并挡住大部分无关ID"""
+    filters = build_acceptance_filters(acceptance_ids(()), 2)
+    assert len(filters) == 2
+    table = acceptance_table(filters)
+    assert all(table[can_id] for can_id in DECODER_REGISTRY)
+    assert accepted_count(filters) <= 512
+    assert not table[0x100] and not table[0x600] and not table[0x18F]
+
+    acc_code, acc_mask, mode = sja1000_acceptance(filters)
+    assert mode == SJA1000_DUAL_FILTER
+    for can_id in range(0x800):
+        assert sja1000_accepts(acc_code, acc_mask, mode, can_id) == bool(table[can_id])
+
+
+def test_single_filter_and_accept_all():
+    filters = build_acceptance_filters([0x351, 0x355, 0x356], 2)
+    assert filters == [AcceptanceFilter(0x350, 0x007)]
+    acc_code, acc_mask, mode = sja1000_acceptance(filters)
+    assert mode == SJA1000_SINGLE_FILTER
+    assert acc_code == 0x350 << 21 and acc_mask == (0x007 << 21) | 0x1FFFFF
+    # 扩展帧ID或空集合不滤波
+    assert build_acceptance_filters([0x18FF50E5], 2) is None
+    assert sja1000_acceptance(None) == SJA1000_ACCEPT_ALL
+    assert parse_can_id_list("0x305, 307 0x7ff") == [0x305, 0x307, 0x7FF]
+    with pytest.raises(ValueError):
+        parse_can_id_list("0x3G5")
+
+
+def test_virtual_bus_drops_unrelated_ids():
+    """虚拟总线模拟验收滤波：无关ID不出现在接收批次中"""
+    sender = VirtualCANBus(channel='test_acceptance')
+    receiver = VirtualCANBus(channel='test_acceptance')
+    receiver.set_acceptance_ids(acceptance_ids(()))
+    sender.connect()
+    receiver.connect()
+    try:
+        sender.send_many([(0x100, b'x'), (0x351, b'a'), (0x6A0, b'y'), (0x211, b'b')])
+        batch = receiver.receive(timeout=100)
+        assert batch.ids() == [0x351, 0x211]
+    finally:
+        sender.disconnect()
+        receiver.disconnect()
+
+
+if __name__ == "__main__":
+    test_registry_filters()
+    test_single_filter_and_accept_all()
+    test_virtual_bus_drops_unrelated_ids()
+    print("全部测试通过")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试numpy批量解码与逐帧解析结果一致
+"""
+
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from can_backends import build_virtual_bms_frames
+from can_batch_decoder import decode_batch, merge_decoded
+from can_frames import CANFrameBatch
+from can_protocol_config import parse_can_message
+
+
+def test_batch_matches_per_frame():
+    """批量解码结果与parse_can_message逐帧结果一致"""
+    rng = random.Random(7)
+    frames = []
+    for can_id, _ in build_virtual_bms_frames() * 4:
+        frames.append((can_id, bytes(rng.randrange(256) for _ in range(8)), len(frames)))
+    payloads = [data for _, data, _ in frames]  # 时间戳即原始序号
+    rng.shuffle(frames)
+    batch = CANFrameBatch.from_frames(frames)
+
+    decoded = decode_batch(batch)
+    assert 0x210 in decoded and 0x220 in decoded and 0x260 in decoded
+    assert 0x35A not in decoded  # 位标志报文不做批量解码
+
+    checked = 0
+    for base_id, columns in decoded.items():
+        for row, can_id in enumerate(columns['can_id']):
+            expected = parse_can_message(int(can_id), payloads[int(columns['timestamp'][row])])
+            for name, value in expected.items():
+                assert columns[name][row] == pytest.approx(value)
+            checked += 1
+    assert checked == sum(len(c['can_id']) for c in decoded.values())
+
+
+def test_short_frames_dropped_and_merge():
+    """DLC不足的帧被丢弃，多批结果可拼接"""
+    batch_a = CANFrameBatch.from_frames([(0x211, b'\x01\x02'), (0x212, bytes(8))])
+    batch_b = CANFrameBatch.from_frames([(0x213, bytes(8)), (0x7FF, bytes(8))])
+    merged = merge_decoded([decode_batch(batch_a), decode_batch(batch_b)])
+    assert list(merged[0x210]['battery_address']) == [2, 3]
+    assert list(merged) == [0x210]
+
+
+if __name__ == "__main__":
+    test_batch_matches_per_frame()
+    test_short_frames_dropped_and_merge()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试二进制录制文件的写入和mmap读取
+"""
+
+import os
+import tempfile
+
+import pytest
+
+import can_capture
+from can_backends import build_virtual_bms_frames
+from can_capture import CaptureReader, CaptureWriter, HEADER_SIZE, RECORD_SIZE
+from can_frames import CANFrameBatch
+from can_timebase import monotonic_to_wall
+
+
+@pytest.fixture
+def capture_path():
+    fd, filename = tempfile.mkstemp(suffix='.cancap')
+    os.close(fd)
+    yield filename
+    os.remove(filename)
+
+
+def write_capture(filename, rounds=20):
+    frames = build_virtual_bms_frames()
+    with CaptureWriter(filename, start_time=1700000000.0) as writer:
+        for r in range(rounds):
+            batch = CANFrameBatch.from_frames([(can_id, data, r * 10000 + i)
+                                               for i, (can_id, data) in enumerate(frames)])
+            batch.host_time = 1000.0 + r + len(frames) * 0.0001
+            writer.write_batch(batch, channel=1)
+    return frames
+
+
+def test_roundtrip_iter(capture_path):
+    """逐条读取的记录与写入一致"""
+    frames = write_capture(capture_path, rounds=2)
+    with CaptureReader(capture_path) as reader:
+        assert reader.start_time == 1700000000.0
+        assert len(reader) == 2 * len(frames)
+        records = list(reader)
+    assert records[0].can_id == frames[0][0]
+    assert records[0].data == bytes(frames[0][1])
+    assert records[0].channel == 1
+    # 设备计数换算为Unix微秒
+    first = records[0].timestamp_us
+    assert first == round(monotonic_to_wall(1000.0 + 0.0001) * 1e6)
+    assert records[1].timestamp_us - first == 100  # 1个0.1ms单位
+    assert records[len(frames)].timestamp_us - first == 10000 * 100
+
+
+def test_select_by_id(capture_path):
+    """按ID索引取出记录，未正常关闭的文件临时建立索引"""
+    np = pytest.importorskip('numpy')
+    rounds = 20
+    frames = write_capture(capture_path, rounds)
+    with CaptureReader(capture_path) as reader:
+        counts = reader.ids()
+        assert counts[0x351] == rounds
+        assert sum(counts.values()) == len(reader)
+        selected = reader.select(0x213)
+        assert len(selected) == rounds
+        assert (selected['can_id'] == 0x213).all()
+        assert (np.diff(selected['timestamp_us'].astype(np.int64)) > 0).all()
+        both = reader.select([0x351, 0x213])
+        assert len(both) == 2 * rounds
+        first = int(reader.records['timestamp_us'][0])
+        assert len(reader.time_range(first, first + 10000 * 100)) == len(frames)
+        expected = reader.select(0x426).copy()
+
+    # 去掉索引、清零文件头中的记录数，模拟录制中断
+    with open(capture_path, 'r+b') as f:
+        f.truncate(HEADER_SIZE + rounds * len(frames) * RECORD_SIZE)
+        header = bytearray(f.read(HEADER_SIZE))
+        header[24:40] = bytes(16)
+        f.seek(0)
+        f.write(header)
+    with CaptureReader(capture_path) as reader:
+        assert len(reader) == rounds * len(frames)
+        assert (reader.select(0x426) == expected).all()
+
+
+def test_index_spill(capture_path, monkeypatch):
+    """索引分段转存到临时文件后仍能正确合并"""
+    pytest.importorskip('numpy')
+    monkeypatch.setattr(can_capture, 'INDEX_SPILL_RECORDS', 100)
+    rounds = 7
+    write_capture(capture_path, rounds)
+    with CaptureReader(capture_path) as reader:
+        positions = reader.select(0x351)
+        assert len(positions) == rounds
+        assert reader.ids()[0x220] == rounds
+
+
+def test_tick_wrap_and_device_restart(capture_path):
+    """设备计数回绕、设备重新连接后从0计数，录制时间仍递增，time_range按时间取出"""
+    np = pytest.importorskip('numpy')
+    batches = [
+        (0xFFFFFF00, 5000.0),   # 回绕前
+        (0x00000100, 5000.0512),  # 回绕后
+        (0, 5100.0),            # 设备复位，计数重新开始
+        (50, 5100.005),
+    ]
+    with CaptureWriter(capture_path) as writer:
+        for ticks, host_time in batches:
+            batch = CANFrameBatch.from_frames([(0x351, b'\x01', ticks), (0x355, b'\x02', ticks + 1)])
+            batch.host_time = host_time
+            writer.write_batch(batch)
+    with CaptureReader(capture_path) as reader:
+        timestamps = reader.records['timestamp_us'].astype(np.int64)
+        assert (np.diff(timestamps) >= 0).all()
+        assert timestamps[2] - timestamps[0] == 0x200 * 100
+        assert timestamps[4] - timestamps[0] > 99 * 1000000
+        start = int(timestamps[4])
+        assert list(reader.time_range(start, start + 1000)['can_id']) == [0x351, 0x355]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
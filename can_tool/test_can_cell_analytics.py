@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试电芯一致性增量统计和不均衡事件
+"""
+
+import random
+import struct
+import threading
+
+import pytest
+
+from can_backends import build_virtual_bms_frames
+from can_cell_analytics import CellAnalytics, CellGroup, describe_event
+from can_dispatcher import CANDispatcher
+
+
+def test_cell_group_matches_full_scan():
+    """随机更新/删除后，增量结果与全表扫描一致"""
+    rng = random.Random(7)
+    group = CellGroup(16)
+    for _ in range(5000):
+        index = rng.randrange(16)
+        if rng.random() < 0.05:
+            group.clear(index)
+        else:
+            group.set(index, rng.choice([3.2, 3.3, 3.4]) + rng.randrange(10) * 0.001)
+        known = [(value, i) for i, value in enumerate(group.values) if value is not None]
+        assert group.count == len(known)
+        if not known:
+            assert group.min is None and group.spread is None
+            continue
+        assert group.min == min(known)[0] and group.values[group.min_index] == group.min
+        assert group.max == max(known)[0] and group.values[group.max_index] == group.max
+        assert group.mean == pytest.approx(sum(value for value, _ in known) / len(known))
+
+
+def feed_virtual_frames(dispatcher, battery_count=2):
+    for can_id, data in build_virtual_bms_frames(battery_count):
+        dispatcher.dispatch(can_id, bytes(data), 1.0)
+
+
+def test_summaries_from_dispatcher():
+    dispatcher = CANDispatcher()
+    analytics = CellAnalytics()
+    analytics.subscribe(dispatcher)
+    feed_virtual_frames(dispatcher)
+
+    battery0, battery1 = analytics.summaries('cell_voltage')
+    assert battery0.count == 16
+    assert (battery0.min, battery0.min_at, battery0.max, battery0.max_at) == pytest.approx(
+        (3.300, 1, 3.315, 16))
+    assert battery1.min == pytest.approx(3.301)
+    stack = analytics.stack('cell_voltage')
+    assert stack.count == 32
+    assert stack.min_at == (0, 1) and stack.max_at == (1, 16)
+    assert stack.spread == pytest.approx(0.016)
+    temperature = analytics.stack('cell_temperature')
+    assert temperature.count == 8 and temperature.max_at == (0, 4)
+    assert analytics.alarms() == []
+
+
+def test_imbalance_events_with_hysteresis():
+    events = []
+    dispatcher = CANDispatcher()
+    analytics = CellAnalytics(on_event=events.append)
+    analytics.subscribe(dispatcher)
+    feed_virtual_frames(dispatcher)
+
+    # 电池1的第5节电芯掉到3.200 V：电池内压差和整组压差都超限
+    dispatcher.dispatch(0x231, struct.pack('<4H', 3200, 3306, 3307, 3308), 2.0)
+    assert [(e.kind, e.battery_address, e.active) for e in events] == [
+        ('cell_voltage', 1, True), ('cell_voltage', None, True)]
+    assert events[0].min_at == 5 and events[1].min_at == (1, 5)
+    assert "电池1电芯压差" in describe_event(events[0])
+    assert set(analytics.alarms()) == {('cell_voltage', 1), ('cell_voltage', None)}
+
+    # 电池压差0.046 V仍高于0.05*0.8，保持报警；整组压差0.046 V低于0.10*0.8，恢复
+    events.clear()
+    dispatcher.dispatch(0x231, struct.pack('<4H', 3270, 3306, 3307, 3308), 3.0)
+    assert [(e.battery_address, e.active) for e in events] == [(None, False)]
+    events.clear()
+    dispatcher.dispatch(0x231, struct.pack('<4H', 3305, 3306, 3307, 3308), 4.0)
+    assert [(e.battery_address, e.active, e.timestamp) for e in events] == [(1, False, 4.0)]
+    assert analytics.alarms() == []
+
+    # 删除离线电池后整组统计只剩电池0
+    analytics.clear_battery(1)
+    assert analytics.stack('cell_voltage').count == 16
+    assert analytics.stack('cell_voltage').max_at == (0, 16)
+
+
+def test_summaries_while_updating():
+    """接收线程更新/删除电池的同时，界面线程读取统计不出错"""
+    analytics = CellAnalytics(thresholds={})
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        rng = random.Random(3)
+        while not stop.is_set():
+            address = rng.randrange(4)
+            if rng.random() < 0.1:
+                analytics.clear_battery(address)
+            else:
+                try:
+                    analytics.update(0x220 + address, {'cell_voltage_1': 3.3 + rng.random() * 0.01,
+                                                       'battery_address': address})
+                except Exception as e:
+                    errors.append(e)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(20000):
+            for summary in analytics.summaries('cell_voltage') + [analytics.stack('cell_voltage')]:
+                # 读到的是近似快照，只要求不出错且字段完整
+                assert summary is None or None not in summary[1:]
+    finally:
+        stop.set()
+        thread.join()
+    assert not errors
+
+
+if __name__ == "__main__":
+    test_cell_group_matches_full_scan()
+    test_summaries_from_dispatcher()
+    test_imbalance_events_with_hysteresis()
+    test_summaries_while_updating()
+    print("全部测试通过")
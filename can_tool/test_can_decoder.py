@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试CAN报文解析：ID查找表、由MESSAGE_STRUCTURES编译的解码器
+"""
+
+import struct
+
+from can_protocol_config import (ADDRESSED_PARSERS, DECODER_REGISTRY, FIXED_ID_PARSERS,
+                                 MESSAGE_CODECS, SUPPORTED_CAN_IDS, is_supported_can_id,
+                                 parse_21n_message, parse_42n_message, parse_44n_message,
+                                 parse_351_message, parse_can_message)
+
+
+def test_registry_covers_all_ids():
+    """查找表与协议定义的ID范围一致"""
+    expected = set(FIXED_ID_PARSERS)
+    for base_id in ADDRESSED_PARSERS:
+        expected.update(base_id + i for i in range(16))
+    assert SUPPORTED_CAN_IDS == expected
+
+    for can_id in range(0x800):
+        assert is_supported_can_id(can_id) == (can_id in expected)
+    assert not is_supported_can_id(0x305)
+    assert not is_supported_can_id(0x10000205)  # 扩展帧不匹配
+
+
+def test_dispatch_battery_address():
+    """按电池地址编址的报文带上ID低4位作为电池地址"""
+    data = [1, 2, 3, 4, 5, 6, 7, 8]
+    for base_id in ADDRESSED_PARSERS:
+        for addr in range(16):
+            result = parse_can_message(base_id + addr, data)
+            assert result is not None
+            assert result['battery_address'] == addr
+            assert DECODER_REGISTRY[base_id + addr][1] == addr
+
+    result = parse_can_message(0x351, data)
+    assert 'battery_address' not in result
+    assert parse_can_message(0x280, data) is None
+
+
+def test_compiled_codecs():
+    """编译后的解码器与协议定义的缩放和符号一致"""
+    assert {0x351, 0x355, 0x356, 0x210, 0x220, 0x260, 0x420, 0x440} <= set(MESSAGE_CODECS)
+    # 位标志、字符串报文不编译
+    assert not {0x35A, 0x200, 0x270, 0x450, 0x4A0} & set(MESSAGE_CODECS)
+
+    result = parse_351_message(struct.pack('<HHHH', 560, 123, 187, 440))
+    assert result == {'charge_voltage_limit': 560 * 0.1, 'max_charge_current': 123 * 0.1,
+                      'max_discharge_current': 187 * 0.1, 'discharge_voltage': 440 * 0.1}
+
+    result = parse_21n_message(struct.pack('<hHHh', -12, 51250, 51000, -55), battery_address=3)
+    assert result == {'battery_current': -12 * 0.1, 'battery_voltage': 51250 * 0.001,
+                      'rail_voltage': 51000 * 0.001, 'fet_temperature': -55 * 0.1,
+                      'battery_address': 3}
+
+    # uint24字段和int8字段
+    data = struct.pack('<BH', 190, 200) + (0x123456).to_bytes(3, 'little') + struct.pack('<H', 7)
+    result = parse_42n_message(data, battery_address=2)
+    assert result['state_of_health'] == 95.0
+    assert result['cycle_count'] == 200
+    assert result['lifetime_hour'] == 0x123456
+    assert result['cell_balance_state'] == 7
+    data = struct.pack('<I', 3600) + (120000).to_bytes(3, 'little') + struct.pack('<b', -5)
+    result = parse_44n_message(memoryview(data))
+    assert parse_can_message(0x441, list(data)) == dict(result, battery_address=1)
+    assert result['esp32_free_heap_size_byte'] == 120000
+    assert result['esp32_temperature_celsius'] == -5
+
+    # 数据不足返回None
+    assert parse_21n_message(b'\x01\x02') is None
+    assert parse_can_message(0x351, [0] * 4) is None
+
+
+if __name__ == "__main__":
+    test_registry_covers_all_ids()
+    test_dispatch_battery_address()
+    test_compiled_codecs()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试解析结果的变化输出（死区、完整刷新）
+"""
+
+import struct
+
+from can_delta import DeltaFilter, delta_subscriber
+from can_dispatcher import CANDispatcher
+
+
+def test_deadband_against_last_emitted_value():
+    delta = DeltaFilter(refresh_interval=None)
+    first = {'cell_voltage_1': 3.300, 'cell_voltage_2': 3.301, 'battery_address': 2}
+    assert delta.changes(0x222, first, 0.0) == first
+
+    # 死区2 mV以内不输出
+    assert delta.changes(0x222, {'cell_voltage_1': 3.3015, 'cell_voltage_2': 3.301, 'battery_address': 2}, 0.1) == {}
+    # 缓慢漂移：与上次输出值（3.300）之差超过死区后输出
+    assert delta.changes(0x222, {'cell_voltage_1': 3.3025, 'cell_voltage_2': 3.301, 'battery_address': 2}, 0.2) == {
+        'cell_voltage_1': 3.3025, 'battery_address': 2}
+    # 没有配置死区的浮点信号、布尔和字典按值比较
+    assert delta.deadband('cell_voltage_16') == 0.002 and delta.deadband('soc_value') == 0.0
+    delta.changes(0x35A, {'alarms': {'OV': False}, 'soc': 80.0}, 0.0)
+    assert delta.changes(0x35A, {'alarms': {'OV': False}, 'soc': 80.0}, 0.1) == {}
+    assert delta.changes(0x35A, {'alarms': {'OV': True}, 'soc': 80.01}, 0.2) == {'alarms': {'OV': True}, 'soc': 80.01}
+    assert delta.emitted_frames == 4 and delta.frames == 6
+    # battery_address不计入信号数：输入2+2+2+2+2+2，输出2+1+2+2
+    assert (delta.signals, delta.emitted_signals) == (12, 7)
+    assert delta.ratio() == 7 / 12
+
+
+def test_refresh_interval_and_reset():
+    delta = DeltaFilter(refresh_interval=1.0)
+    parsed = {'Firmware_version': '1.23', 'battery_address': 1}
+    assert delta.changes(0x461, parsed, 10.0) == parsed
+    assert delta.changes(0x461, parsed, 10.5) == {}
+    assert delta.changes(0x461, parsed, 11.0) == parsed
+    delta.reset(0x461)
+    assert delta.changes(0x461, parsed, 11.1) == parsed
+
+
+def test_channels_are_independent():
+    """两个通道上的同一ID互不影响：各自与本通道上次输出的值比较"""
+    delta = DeltaFilter(refresh_interval=None)
+    pack_a = {'soc_value': 80, 'battery_voltage': 51.2}
+    pack_b = {'soc_value': 60, 'battery_voltage': 49.0}
+    assert delta.changes(0x355, pack_a, 0.0, channel=0) == pack_a
+    assert delta.changes(0x355, pack_b, 0.0, channel=1) == pack_b
+    for t in (0.1, 0.2):
+        assert delta.changes(0x355, pack_a, t, channel=0) == {}
+        assert delta.changes(0x355, pack_b, t, channel=1) == {}
+    # 通道1变到与通道0相同的值，仍按通道1自己的上次输出判断为变化
+    assert delta.changes(0x355, {'soc_value': 80, 'battery_voltage': 49.0}, 0.3, channel=1) == {'soc_value': 80}
+    delta.reset(0x355, channel=0)
+    assert delta.changes(0x355, pack_a, 0.4, channel=0) == pack_a
+    assert delta.changes(0x355, {'soc_value': 80, 'battery_voltage': 49.0}, 0.4, channel=1) == {}
+
+
+def test_delta_subscriber_on_dispatcher():
+    """静态报文只在第一次和完整刷新时输出，变化的电芯电压每次输出"""
+    received = []
+    dispatcher = CANDispatcher()
+    on_change = delta_subscriber(lambda can_id, changed, t: received.append((can_id, changed)))
+    dispatcher.subscribe(on_change, battery_address=1)
+    static = bytes([0x24, 0x0A, 0xC4, 0x00, 0x00, 1, 1, 0])
+    for i in range(10):
+        t = i * 0.1
+        dispatcher.dispatch(0x4A1, static, t)
+        dispatcher.dispatch(0x221, struct.pack('<4H', 3300 + i * 5, 3301, 3302, 3303), t)
+        dispatcher.dispatch(0x222, struct.pack('<4H', 3300, 3301, 3302, 3303), t)  # 电池2，不订阅
+    ids = [can_id for can_id, _ in received]
+    assert ids.count(0x4A1) == 1
+    assert ids.count(0x221) == 10
+    assert received[-1] == (0x221, {'cell_voltage_1': 3.345, 'battery_address': 1})
+    assert on_change.delta_filter.ratio() < 0.5
+
+
+if __name__ == "__main__":
+    test_deadband_against_last_emitted_value()
+    test_refresh_interval_and_reset()
+    test_channels_are_independent()
+    test_delta_subscriber_on_dispatcher()
+    print("全部测试通过")
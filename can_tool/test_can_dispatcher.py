@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试接收报文的订阅与分发
+"""
+
+import queue
+import struct
+
+import pytest
+
+import can_dispatcher
+from can_dispatcher import CANDispatcher
+from can_frames import CANFrameBatch
+
+DATA_351 = struct.pack('<HHHH', 560, 123, 187, 440)
+
+
+def test_subscription_matching():
+    """精确ID、ID+屏蔽码、电池地址和原始报文订阅"""
+    dispatcher = CANDispatcher()
+    exact, family, battery, raw = [], [], [], []
+    dispatcher.subscribe(lambda *args: exact.append(args), can_id=0x351)
+    dispatcher.subscribe(lambda *args: family.append(args[0]), can_id=0x210, id_mask=0x7F0)
+    dispatcher.subscribe(lambda *args: battery.append(args[0]), battery_address=1)
+    dispatcher.subscribe(lambda *args: raw.append(args), can_id=0x600, decoded=False)
+
+    parsed = dispatcher.dispatch(0x351, DATA_351, 12.5)
+    assert parsed['charge_voltage_limit'] == 56.0
+    assert exact == [(0x351, parsed, 12.5)]
+    for can_id in (0x210, 0x211, 0x221, 0x421):
+        dispatcher.dispatch(can_id, bytes(8))
+    assert family == [0x210, 0x211]
+    assert battery == [0x211, 0x221, 0x421]
+
+    # 没有解析函数的ID只交给原始报文订阅者
+    assert dispatcher.dispatch(0x600, b'\x01\x02') is None
+    assert raw == [(0x600, b'\x01\x02', None)]
+    assert dispatcher.lookup(0x123) == ()
+
+
+def test_decode_once_and_unsubscribe(monkeypatch):
+    """同一帧只解析一次；退订后分发表重建"""
+    calls = []
+    original = can_dispatcher.parse_can_message
+
+    def counting_parse(can_id, data):
+        calls.append(can_id)
+        return original(can_id, data)
+    monkeypatch.setattr(can_dispatcher, 'parse_can_message', counting_parse)
+
+    dispatcher = CANDispatcher()
+    received = []
+    tokens = [dispatcher.subscribe(lambda *args: received.append(args[0])) for _ in range(5)]
+    dispatcher.dispatch(0x351, DATA_351)
+    assert calls == [0x351] and len(received) == 5
+
+    for token in tokens[1:]:
+        dispatcher.unsubscribe(token)
+    dispatcher.dispatch(0x351, DATA_351)
+    assert len(received) == 6
+
+
+def test_queue_and_failing_subscriber():
+    """队列订阅满时丢弃并计数，回调出错不影响其它订阅者，错误只报告一次"""
+    messages = []
+    dispatcher = CANDispatcher(log=messages.append)
+    sink = queue.Queue(maxsize=2)
+    dispatcher.subscribe(lambda *args: 1 / 0, can_id=0x351)
+    dispatcher.subscribe(sink, can_id=0x351)
+    batch = CANFrameBatch.from_frames([(0x351, DATA_351)] * 3)
+    dispatcher.dispatch_batch(batch, times=[1.0, 2.0, 3.0])
+    failing, queued = dispatcher.subscriptions()
+    assert failing.errors == 3
+    assert len(messages) == 1 and "回调错误" in messages[0]
+    assert sink.qsize() == 2 and queued.dropped == 1
+    assert sink.get()[2] == 1.0
+
+
+def test_extended_cache_is_bounded(monkeypatch):
+    """扩展ID的订阅者缓存有上限，清空后仍能正确查到订阅者"""
+    monkeypatch.setattr(can_dispatcher, 'EXTENDED_CACHE_SIZE', 16)
+    received = []
+    dispatcher = CANDispatcher()
+    dispatcher.subscribe(lambda *args: received.append(args[0]), can_id=0x18FF50E5, decoded=False)
+    for can_id in range(0x18000000, 0x18000000 + 100):
+        dispatcher.dispatch(can_id, b'')
+        dispatcher.dispatch(0x18FF50E5, b'\x01')
+        assert len(dispatcher._extended) <= 16
+    assert received == [0x18FF50E5] * 100
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试接收批次的只读视图CANFrameBatch
+"""
+
+import pytest
+
+import can_frames
+from can_frames import CANFrame, CANFrameBatch, FRAME_SIZE, FRAME_STRUCT
+
+FRAMES = [
+    (0x351, b'\x30\x02\x7B\x00', 10),
+    (0x18FF50E5, b'\x01\x02\x03\x04\x05\x06\x07\x08', 20),
+    (0x305, b'', 0xFFFFFFFF + 31),  # 时间戳按32位截断
+]
+
+
+def test_from_frames_and_iteration():
+    batch = CANFrameBatch.from_frames(FRAMES)
+    assert len(batch) == 3 and batch
+    assert len(batch.raw) == 3 * FRAME_SIZE
+    assert list(batch) == [
+        CANFrame(0x351, b'\x30\x02\x7B\x00', 4, 10),
+        CANFrame(0x18FF50E5, b'\x01\x02\x03\x04\x05\x06\x07\x08', 8, 20),
+        CANFrame(0x305, b'', 0, 30),
+    ]
+    assert batch.ids() == [0x351, 0x18FF50E5, 0x305]
+    assert batch.to_dicts()[0] == {'id': 0x351, 'data': [0x30, 0x02, 0x7B, 0x00], 'length': 4, 'timestamp': 10}
+    assert not CANFrameBatch.from_frames([])
+
+
+def test_read_only_view_and_count():
+    """可写缓冲区也得到只读视图；count小于缓冲区帧数时只取前count帧"""
+    buffer = bytearray(CANFrameBatch.from_frames(FRAMES).raw)
+    batch = CANFrameBatch(buffer, 2, host_time=1.5)
+    assert batch.raw.readonly
+    with pytest.raises(TypeError):
+        batch.raw[0] = 0
+    assert len(batch) == 2 and len(batch.raw) == 2 * FRAME_SIZE
+    assert batch.ids() == [0x351, 0x18FF50E5]
+    assert len(batch.to_dicts()) == 2
+    assert batch.host_time == 1.5
+
+    # 不给count时按字节长度计算，末尾不足一帧的字节忽略
+    assert len(CANFrameBatch(bytes(buffer) + b'\x00' * 5)) == 3
+    # 视图引用原缓冲区（不拷贝），后续改写缓冲区可见
+    FRAME_STRUCT.pack_into(buffer, 0, 0x123, 0, 0, 0, 0, 0, 0, b'', b'')
+    assert batch.ids()[0] == 0x123
+
+
+def test_to_numpy():
+    np = pytest.importorskip('numpy')
+    buffer = bytearray(CANFrameBatch.from_frames(FRAMES).raw) + bytes(FRAME_SIZE)
+    array = CANFrameBatch(buffer, 3).to_numpy()
+    assert len(array) == 3
+    assert list(array['ID']) == [0x351, 0x18FF50E5, 0x305]
+    assert list(array['DataLen']) == [4, 8, 0]
+    assert bytes(array['Data'][0][:4]) == b'\x30\x02\x7B\x00'
+    assert not array.flags.writeable
+    assert np.shares_memory(array, np.frombuffer(buffer, dtype=np.uint8))
+
+
+def test_to_numpy_without_numpy(monkeypatch):
+    monkeypatch.setattr(can_frames, 'NUMPY_AVAILABLE', False)
+    batch = CANFrameBatch.from_frames(FRAMES)
+    with pytest.raises(RuntimeError):
+        batch.to_numpy()
+    # 其余接口不依赖numpy
+    assert batch.ids() == [0x351, 0x18FF50E5, 0x305]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试无界面采集：不导入tkinter，对虚拟总线端到端输出解析结果
+"""
+
+import io
+import json
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+from can_acquisition import TaggedFrame, create_channel_buses
+from can_backends import create_can_bus
+from can_capture import CaptureReader
+from can_headless import CaptureSink, HeadlessRunner, JsonLinesSink, SocketSink, main
+from can_protocol_config import HEARTBEAT_TIMEOUT
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_no_tkinter_import():
+    """导入无界面模块不会导入tkinter"""
+    code = "import sys, can_headless; print('tkinter' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
+
+
+def test_virtual_bus_to_json_and_capture():
+    """虚拟总线 -> 解析 -> JSON行 + 录制文件，按电池地址筛选输出"""
+    stream = io.StringIO()
+    with tempfile.TemporaryDirectory() as tmp:
+        capture = os.path.join(tmp, 'headless.cancap')
+        buses = create_channel_buses('virtual', 'headless0', frame_rate=2000)
+        runner = HeadlessRunner(buses, [JsonLinesSink(stream), CaptureSink(capture)],
+                                battery_address=1, send_period=0.05, log=lambda message: None)
+        runner.connect()
+        runner.start()
+        runner.run(duration=0.3)
+        runner.close()
+        with CaptureReader(capture) as reader:
+            captured = len(reader)
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert records and captured > len(records)
+    assert all(record['signals']['battery_address'] == 1 for record in records)
+    assert {'0x211', '0x221'} <= {record['id'] for record in records}
+
+
+def test_changes_only_per_channel():
+    """两个通道发送同一ID、不同数据：变化输出按通道分别比较，每个通道只输出首帧"""
+    stream = io.StringIO()
+    payloads = {0: struct.pack('<HHH2x', 80, 95, 8000), 1: struct.pack('<HHH2x', 60, 90, 6000)}
+    buses = {channel: create_can_bus('virtual', channel=f'headless_delta{channel}', frame_rate=500,
+                                     frames=[(0x355, data)])
+             for channel, data in payloads.items()}
+    runner = HeadlessRunner(buses, [JsonLinesSink(stream)], changes_only=True, hw_filter=False,
+                            log=lambda message: None)
+    runner.connect()
+    runner.start()
+    runner.run(duration=0.3)
+    runner.close()
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert sorted(record['channel'] for record in records) == [0, 1]
+    by_channel = {record['channel']: record['signals'] for record in records}
+    assert by_channel[0]['soc_value'] == 80 and by_channel[1]['soc_value'] == 60
+    assert runner.delta_filter.frames > 10
+
+
+def test_watchdog_per_channel():
+    """超时按(通道, ID)监控：一个通道停发0x351，另一个通道仍在发送也会报超时，事件带通道号"""
+    stream = io.StringIO()
+    buses = create_channel_buses('virtual', 'headless_wd0,headless_wd1')
+    runner = HeadlessRunner(buses, [JsonLinesSink(stream)], can_ids=[0x7FF], log=lambda message: None)
+    data = struct.pack('<HHHH', 560, 123, 187, 440)
+    runner.on_frames([TaggedFrame(100.0, 0, 0x351, data, 8), TaggedFrame(100.0, 1, 0x351, data, 8)])
+    later = 100.0 + HEARTBEAT_TIMEOUT * 0.75
+    runner.on_frames([TaggedFrame(later, 0, 0x351, data, 8)])
+    assert runner.watchdog.check(100.0 + HEARTBEAT_TIMEOUT + 0.1) == [(1, 0x351)]
+    runner.on_frames([TaggedFrame(later + HEARTBEAT_TIMEOUT, 1, 0x351, data, 8)])
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(r['event'], r['channel'], r['id']) for r in records] == [
+        ('timeout', 1, '0x351'), ('recovery', 1, '0x351')]
+    assert runner.timeouts == 1
+
+
+def test_socket_sink():
+    """本地TCP客户端收到JSON行"""
+    sink = SocketSink(0)
+    client = socket.create_connection(sink.address, timeout=2)
+    try:
+        for _ in range(200):
+            if sink.client_count():
+                break
+            time.sleep(0.01)  # 等待监听线程接受连接
+        buses = create_channel_buses('virtual', 'headless1', frame_rate=2000)
+        runner = HeadlessRunner(buses, [sink], can_ids=[0x351], log=lambda message: None)
+        runner.connect()
+        runner.start()
+        runner.run(duration=0.3)
+        runner.close()
+        data = b''
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        client.close()
+    lines = data.decode('utf-8').splitlines()
+    assert lines and all(json.loads(line)['id'] == '0x351' for line in lines)
+
+
+def test_main_replay_exit_code():
+    """回放录制文件到结束后退出，返回码为0"""
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)}
+    with tempfile.TemporaryDirectory() as tmp:
+        capture = os.path.join(tmp, 'soak.cancap')
+        output = os.path.join(tmp, 'soak.jsonl')
+        assert main(['--backend', 'virtual', '--channels', 'headless2', '--frame-rate', '2000',
+                     '--duration', '0.2', '-o', capture]) == 0
+        assert main(['--backend', 'replay', '--replay', capture, '-o', output]) == 0
+        with open(output, encoding='utf-8') as f:
+            assert sum(1 for _ in f) > 0
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+if __name__ == "__main__":
+    test_no_tkinter_import()
+    test_virtual_bus_to_json_and_capture()
+    test_changes_only_per_channel()
+    test_watchdog_per_channel()
+    test_socket_sink()
+    test_main_replay_exit_code()
+    print("全部测试通过")
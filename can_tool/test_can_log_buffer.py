@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试日志环形缓冲区和后台日志写入
+"""
+
+import os
+import tempfile
+import threading
+
+from can_log_buffer import LogRingBuffer, LogFileWriter
+
+
+def test_ring_buffer_capacity():
+    """缓冲区只保留最近capacity行，待显示行按批取出"""
+    buffer = LogRingBuffer(capacity=100)
+    buffer.extend([f"line {i}\n" for i in range(250)])
+    assert len(buffer) == 100
+    assert buffer.total == 250
+    assert buffer.lines()[0] == "line 150\n"
+
+    pending = buffer.take_pending()
+    assert len(pending) == 100 and pending[-1] == "line 249\n"
+    assert buffer.take_pending() == []
+
+    buffer.extend(["new\n"])
+    assert buffer.take_pending() == ["new\n"]
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.total == 0
+
+
+def test_file_writer_background_flush():
+    """多线程写入的内容在关闭时全部落盘，定时flush后文件可见"""
+    fd, filename = tempfile.mkstemp(suffix='.txt')
+    os.close(fd)
+    try:
+        writer = LogFileWriter(filename, flush_interval=0.02)
+
+        def worker(n):
+            for i in range(1000):
+                writer.write(f"{n}:{i}\n")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        writer.flush()
+        writer.close("end\n")
+
+        with open(filename, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 4001
+        assert lines[-1] == "end"
+        assert writer.take_error() is None
+    finally:
+        os.remove(filename)
+
+
+if __name__ == "__main__":
+    test_ring_buffer_capacity()
+    test_file_writer_background_flush()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试信号曲线的按像素列降采样
+"""
+
+import pytest
+
+from can_plot import decimate_minmax, merge_columns, cell_spread_columns
+from can_timeseries import TimeSeriesStore
+
+
+def test_decimate_minmax():
+    """每列只保留一对min/max，窗口外的数据丢弃"""
+    times = [i * 0.01 for i in range(-100, 1100)]  # 窗口[0, 10)前后各多1秒
+    values = [float(i % 7) for i in range(len(times))]
+    columns = decimate_minmax(times, values, values, 0.0, 10.0, 100)
+    assert [c for c, _, _ in columns] == list(range(100))
+    assert all(lo == 0.0 and hi == 6.0 for _, lo, hi in columns)
+    assert decimate_minmax(times, values, values, 0.0, 10.0, 0) == []
+
+
+def test_point_count_independent_of_samples():
+    """采样数增加时输出点数不变"""
+    store = TimeSeriesStore()
+    for i in range(20000):
+        store.append(1, 'cell_voltage_1', i * 0.005, 3.3 + (i % 10) * 0.001)
+    result = store.query(1, 'cell_voltage_1', 40.0, 100.0, max_points=200)
+    assert len(result.times) <= 200
+    assert len(decimate_minmax(result.times, result.mins, result.maxs, 40.0, 100.0, 200)) <= 200
+
+
+def test_cell_spread():
+    """全部电池全部电芯的包络和最新最大压差"""
+    store = TimeSeriesStore()
+    for address in range(4):
+        for cell in range(1, 17):
+            for i in range(10):
+                store.append(address, f'cell_voltage_{cell}', float(i), 3.2 + address * 0.01 + cell * 0.001)
+    store.append(None, 'battery_current', 1.0, 50.0)
+    columns, spread = cell_spread_columns(store, 0.0, 10.0, 10)
+    assert len(columns) == 10
+    assert columns[0][1] == pytest.approx(3.201, abs=1e-5)
+    assert columns[0][2] == pytest.approx(3.246, abs=1e-5)
+    assert spread == pytest.approx(0.045, abs=1e-5)
+    assert merge_columns([[(0, 1.0, 2.0)], [(0, 0.5, 1.5), (1, 3.0, 4.0)]]) == [(0, 0.5, 2.0), (1, 3.0, 4.0)]
+
+
+if __name__ == "__main__":
+    test_decimate_minmax()
+    test_point_count_independent_of_samples()
+    test_cell_spread()
+    print("全部测试通过")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按CAN ID的流量统计
+"""
+
+import pytest
+
+from can_frames import CANFrameBatch
+from can_statistics import CANStatistics, EXPECTED_LENGTHS
+
+
+def test_rate_gaps_and_p99():
+    """固定周期的报文：帧率、间隔、p99和最大间隔"""
+    stats = CANStatistics()
+    t = 0.0
+    for i in range(1000):
+        t += 0.1 if i != 500 else 0.5  # 中间丢了4个周期
+        stats.update(0x351, 8, t)
+    row = stats.get(0x351)
+    assert row.count == 1000
+    assert row.rate == pytest.approx(10.0, rel=0.01)
+    assert row.mean_gap == pytest.approx((998 * 0.1 + 0.5) / 999, rel=1e-6)
+    assert row.max_gap == pytest.approx(0.5)
+    assert 0.1 <= row.p99_gap <= 0.1 * 1.2
+    assert row.jitter > 0
+    assert row.dlc_errors == 0
+    assert row.age == 0
+
+
+def test_dlc_errors_and_sorting():
+    """DLC与协议长度不符计数；视图可按任意列排序"""
+    assert EXPECTED_LENGTHS[0x213] == 8
+    stats = CANStatistics()
+    frames = []
+    for i in range(20):
+        frames.append((0x213, bytes(8 if i % 5 else 6), i * 100))
+        if i % 2 == 0:
+            frames.append((0x351, bytes(8), i * 100))
+    frames.append((0x7FF, bytes(3), 2000))  # 协议中未定义的ID不检查DLC
+    stats.update_batch(CANFrameBatch.from_frames(frames))
+
+    assert stats.get(0x213).dlc_errors == 4
+    assert stats.get(0x7FF).dlc_errors == 0
+    assert stats.get(0x213).rate == pytest.approx(100.0)  # 0.01s周期
+    assert stats.get(0x351).age == pytest.approx(0.2 - 0.18)
+
+    assert [row.can_id for row in stats.rows()] == [0x213, 0x351, 0x7FF]
+    assert [row.can_id for row in stats.rows('count', reverse=True)] == [0x213, 0x351, 0x7FF]
+    assert stats.rows('dlc_errors', reverse=True)[0].can_id == 0x213
+    with pytest.raises(ValueError):
+        stats.rows('unknown')
+
+    stats.clear()
+    assert len(stats) == 0 and stats.get(0x213) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, '-q'])
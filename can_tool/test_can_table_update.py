@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试数据表格的行索引和合并刷新（用假Treeview，无需显示器）
+"""
+
+from can_host_computer import CANHostComputer
+
+
+class FakeTreeview:
+    """只记录insert/item调用的Treeview替身"""
+
+    def __init__(self):
+        self.rows = {}
+        self.calls = 0
+
+    def insert(self, parent, index, values):
+        self.calls += 1
+        iid = f"I{len(self.rows):03d}"
+        self.rows[iid] = values
+        return iid
+
+    def item(self, iid, values=None, tags=None):
+        self.calls += 1
+        if values is not None:
+            self.rows[iid] = values
+
+    def tag_configure(self, tag, **kwargs):
+        pass
+
+
+def make_app():
+    app = CANHostComputer.__new__(CANHostComputer)
+    app.data_tree = FakeTreeview()
+    app.table_index = {}
+    app.table_values = {}
+    app.table_dirty = {}
+    return app
+
+
+def test_flush_only_changed_rows():
+    """刷新只写变化的行，同一行多次更新只保留最新值"""
+    app = make_app()
+    for addr in range(16):
+        app.insert_table_row((f"0x21{addr:X}", '电流', '--', 'A', '等待', '--'))
+    tree = app.data_tree
+    tree.calls = 0
+
+    for value in range(100):
+        app.update_table_item('0x213', '电流', f"{value}", 'A', '正常', '12:00:00')
+    app.update_table_item('0x214', '电流', '--', 'A', '等待', '--')  # 值未变化
+    app.flush_table_updates()
+    assert tree.calls == 1
+    assert tree.rows[app.table_index[('0x213', '电流')]][2] == '99'
+
+    # 新行在刷新时创建并加入索引
+    app.update_table_item('0x351', '心跳', '1', '', '正常', '12:00:01')
+    app.flush_table_updates()
+    assert ('0x351', '心跳') in app.table_index
+    assert len(tree.rows) == 17
+    assert app.table_dirty == {}
+
+
+if __name__ == "__main__":
+    test_flush_only_changed_rows()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试设备时间戳归一化
+"""
+
+import pytest
+
+from can_frames import CANFrameBatch
+from can_timebase import DeviceTimebase, TICK_WRAP
+
+
+def test_min_latency_offset():
+    """偏移取各批上界的最小值，排队延迟不进入帧时间"""
+    timebase = DeviceTimebase(drift_allowance=0)
+    # 设备计数每批10ms，主机接收延迟在1~50ms之间变化
+    delays = [0.050, 0.001, 0.030, 0.020]
+    for i, delay in enumerate(delays):
+        ticks = 100000 + i * 100
+        times = timebase.convert_ticks([ticks - 50, ticks], 1000.0 + i * 0.01 + delay)
+    assert timebase.offset == pytest.approx(1000.0 + 0.001 + 0.01 - 100100 * 0.0001)
+    # 最后一批: 最小延迟对应的时间，帧间隔保持设备计数的5ms
+    assert times[1] == pytest.approx(1000.0 + 0.03 + 0.001)
+    assert times[1] - times[0] == pytest.approx(0.005)
+
+
+def test_rollover_and_resync():
+    """32位回绕后时间连续，设备复位后重新同步"""
+    timebase = DeviceTimebase()
+    before = timebase.convert_ticks([TICK_WRAP - 20, TICK_WRAP - 10], 500.0)
+    after = timebase.convert_ticks([0, 10], 500.002)
+    assert timebase.wraps == 1
+    assert after[0] - before[1] == pytest.approx(0.001)
+    assert after[1] == pytest.approx(500.002)
+
+    # 设备复位：计数回到很小的值，但不是回绕
+    reset = timebase.convert_ticks([5], 600.0)
+    assert timebase.resyncs == 1
+    assert reset[0] == pytest.approx(600.0)
+
+
+def test_convert_batch_uses_host_time():
+    batch = CANFrameBatch(CANFrameBatch.from_frames([(0x351, b'', 1000), (0x355, b'', 1100)]).raw,
+                          host_time=42.0)
+    times = DeviceTimebase().convert(batch)
+    assert times == pytest.approx([41.99, 42.0])
+
+
+if __name__ == "__main__":
+    test_min_latency_offset()
+    test_rollover_and_resync()
+    test_convert_batch_uses_host_time()
+    print("全部测试通过")
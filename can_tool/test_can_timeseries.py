@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试解码信号时间序列存储
+"""
+
+import pytest
+
+from can_protocol_config import parse_can_message
+from can_timeseries import SignalSeries, TimeSeriesStore
+
+
+def test_raw_and_tiers():
+    """原始层只保留最近的采样，降采样层给出每桶的min/max/mean"""
+    series = SignalSeries(raw_capacity=100, tiers=((1.0, 10), (10.0, 10)))
+    for i in range(1000):  # 10Hz，100秒
+        series.append(i * 0.1, float(i % 10))
+    assert len(series) == 100
+    assert series.latest() == pytest.approx((99.9, 9.0))
+
+    raw = series.range(95.0, 96.0)
+    assert len(raw.times) == 10
+    assert raw.mins == pytest.approx([float(i) for i in range(10)])
+
+    # 原始采样点数超过max_points时取1秒层
+    tier = series.range(90.0, 95.0, max_points=8)
+    assert tier.times == pytest.approx([float(t) for t in range(90, 95)])
+    assert tier.mins == [0.0] * 5 and tier.maxs == [9.0] * 5
+    assert tier.means == pytest.approx([4.5] * 5)
+
+    # 1秒层只保留最近10秒，更早的时间段取10秒层
+    assert series.range(85.0, 95.0).times == pytest.approx([80.0, 90.0])
+    tier = series.range(0.0, 100.0)
+    assert tier.times == pytest.approx([float(t) for t in range(0, 100, 10)])
+
+    # 限制点数时选择更粗的一层
+    limited = series.range(95.0, 100.0, max_points=10)
+    assert len(limited.times) <= 10
+
+
+def test_gaps_clear_old_buckets():
+    """跳过的时间段不会留下旧数据"""
+    series = SignalSeries(raw_capacity=10, tiers=((1.0, 4),))
+    series.append(0.5, 1.0)
+    series.append(1.5, 2.0)
+    series.append(5.5, 3.0)  # 桶1~4之后环形位置与桶1、桶2重叠
+    tier = series.tiers[0].range(0.0, 10.0)
+    assert tier.times == [5.0]
+
+
+def test_store_from_parsed_frames():
+    """按(电池地址, 信号名)记录解析结果中的数值信号"""
+    store = TimeSeriesStore()
+    for i in range(20):
+        for addr in range(16):
+            parsed = parse_can_message(0x220 + addr, bytes([0xE4, 0x0C] * 4))
+            store.add_parsed(parsed, 1000.0 + i)
+    assert (3, 'cell_voltage_1') in store.keys()
+    assert len(store) == 16 * 4
+    latest = store.latest('cell_voltage_1')
+    assert len(latest) == 16
+    assert latest[5][1] == pytest.approx(3.3, abs=1e-3)
+    result = store.query(5, 'cell_voltage_2', 1000.0, 1010.0)
+    assert len(result.times) == 10
+
+
+if __name__ == "__main__":
+    test_raw_and_tiers()
+    test_gaps_clear_old_buckets()
+    test_store_from_parsed_frames()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试candump/ASC/CSV/cancap报文记录的导入导出
+"""
+
+import csv
+import os
+import tempfile
+import time
+
+from can_backends import build_virtual_bms_frames
+from can_capture import CaptureRecord, FLAG_EXTENDED, FLAG_REMOTE
+import can_trace_io
+from can_trace_io import (convert_trace, detect_format, open_trace_writer, parse_asc_date, read_asc,
+                          read_candump, read_csv_trace, read_trace)
+
+
+def sample_records():
+    records = [CaptureRecord(1_700_000_000_000_000 + i * 1000, can_id, len(data), i % 2, 0, data)
+               for i, (can_id, data) in enumerate(build_virtual_bms_frames(2))]
+    records.append(CaptureRecord(1_700_000_001_000_000, 0x18FF50E5, 3, 1, FLAG_EXTENDED, b'\x01\x02\x03'))
+    records.append(CaptureRecord(1_700_000_001_001_000, 0x305, 2, 0, FLAG_REMOTE, b''))
+    return records
+
+
+def test_round_trip_all_formats():
+    """各格式写出再读回，帧内容一致；块大小小于帧数时也能正确分块写出"""
+    chunk_size = can_trace_io.TRACE_CHUNK_SIZE
+    can_trace_io.TRACE_CHUNK_SIZE = 7
+    records = sample_records()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for suffix in ('.log', '.asc', '.csv', '.cancap'):
+                filename = os.path.join(tmp, 'trace' + suffix)
+                with open_trace_writer(filename) as writer:
+                    writer.write_many(records)
+                loaded = list(read_trace(filename))
+                assert [(r.can_id, r.data, r.channel, r.flags) for r in loaded] == \
+                       [(r.can_id, r.data, r.channel, r.flags) for r in records], suffix
+                if suffix != '.cancap':
+                    assert [r.timestamp_us for r in loaded] == [r.timestamp_us for r in records]
+    finally:
+        can_trace_io.TRACE_CHUNK_SIZE = chunk_size
+
+
+def test_read_foreign_lines():
+    """读取其他工具生成的candump和ASC行"""
+    candump = list(read_candump([
+        "(1436509052.249713) vcan0 351#3002\n",
+        "(1436509052.250000) can1 18FF50E5#R\n",
+        "  can0  356   [2]  05 14\n",
+        "garbage\n",
+    ]))
+    assert [(r.can_id, r.dlc, r.channel, r.flags, r.data) for r in candump] == [
+        (0x351, 2, 0, 0, b'\x30\x02'),
+        (0x18FF50E5, 0, 1, FLAG_EXTENDED | FLAG_REMOTE, b''),
+        (0x356, 2, 0, 0, b'\x05\x14'),
+    ]
+    asc = list(read_asc([
+        "date Mon Jan 01 12:00:00 am 2024\n",
+        "base dec  timestamps absolute\n",
+        "   0.001000 1  849             Rx   d 2 48 2\n",
+        "   0.002000 2  ErrorFrame\n",
+        "base hex  timestamps absolute\n",
+        "   0.003000 2  1FFFFFFx        Tx   r 8\n",
+    ]))
+    # 时间加回date行（本地时间）
+    start_us = int(time.mktime((2024, 1, 1, 0, 0, 0, 0, 1, -1))) * 1_000_000
+    assert [(r.timestamp_us - start_us, r.can_id, r.channel, r.flags, r.data) for r in asc] == [
+        (1000, 0x351, 0, 0, b'\x30\x02'),
+        (3000, 0x1FFFFFF, 1, FLAG_EXTENDED | FLAG_REMOTE, b''),
+    ]
+    assert parse_asc_date("Mon Jan 01 12:00:00.250 pm 2024") == start_us + 12 * 3600_000_000 + 250_000
+    assert parse_asc_date("unknown") == 0
+    assert detect_format('bench.ASC') == 'asc'
+
+
+def test_skip_malformed_lines():
+    """格式错误的行和CAN FD帧跳过并报告原因，后面的行照常读取，转换不中断"""
+    skipped = []
+    on_skip = lambda line, reason: skipped.append(line.strip())
+    candump = list(read_candump([
+        "(1.000000) can0 351#300\n",         # 奇数个十六进制字符
+        "(1.000001) can0 351#30ZZ\n",        # 非十六进制
+        "(1.000002) can0 123##1DEADBEEF\n",  # CAN FD
+        "(1.000003) can0 123#00112233445566778899\n",  # 超过8字节
+        "(1.000004) can0 351#3002\n",
+    ], on_skip))
+    assert [(r.timestamp_us, r.can_id, r.data) for r in candump] == [(1000004, 0x351, b'\x30\x02')]
+    assert len(skipped) == 4 and skipped[2].endswith("123##1DEADBEEF")
+
+    skipped.clear()
+    rows = list(read_csv_trace([
+        "timestamp,channel,can_id,extended,remote,dlc,data\n",
+        "1.0,0,351,0,0,2,300\n",
+        "1.1,0,351,0,0\n",
+        "1.2,0,351,0,0,2,3002\n",
+    ], on_skip))
+    assert [(r.timestamp_us, r.data) for r in rows] == [(1200000, b'\x30\x02')]
+    assert len(skipped) == 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'bad.log')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write("(1.0) can0 351#3\n(1.1) can0 351#3002\n(1.2) can0 7FF##0\n(1.3) can0 355#01\n")
+        count, _ = convert_trace(source, os.path.join(tmp, 'out.csv'))
+    assert count == 2
+
+
+def test_convert_with_decoded_signals():
+    """一次遍历同时完成格式转换和信号解码"""
+    records = sample_records()
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'bench.log')
+        with open_trace_writer(source) as writer:
+            writer.write_many(records)
+        count, decoded = convert_trace(source, os.path.join(tmp, 'bench.csv'),
+                                       decoded_csv=os.path.join(tmp, 'signals.csv'))
+        assert count == len(records)
+        assert 0 < decoded < count
+        with open(os.path.join(tmp, 'signals.csv'), encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+    assert {row['can_id'] for row in rows} >= {'351', '211'}
+    assert all(row['signal'] != 'battery_address' for row in rows)
+    assert any(row['can_id'] == '211' and row['battery_address'] == '1' for row in rows)
+
+
+if __name__ == "__main__":
+    test_round_trip_all_formats()
+    test_read_foreign_lines()
+    test_skip_malformed_lines()
+    test_convert_with_decoded_signals()
+    print("全部测试通过")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试周期报文发送调度
+"""
+
+import time
+
+import pytest
+
+from can_backends import VirtualCANBus
+from can_tx_scheduler import TxScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_absolute_deadlines():
+    """同时到期的报文合并发送；发送延迟不累积，落后超过一个周期时跳过"""
+    clock = FakeClock()
+    calls = []
+    scheduler = TxScheduler(lambda frames: calls.append(frames) or len(frames), clock=clock)
+    scheduler.add(0x305, 1.0, bytes(8))
+    scheduler.add(0x307, 1.0, lambda: b'\x12\x34\x56\x78VIC\x00')
+    scheduler.add(0x310, 0.5, b'\x01')
+
+    assert [can_id for can_id, _ in scheduler.run_once()] == [0x305, 0x307, 0x310]
+    assert len(calls) == 1 and calls[0][1][1] == b'\x12\x34\x56\x78VIC\x00'
+
+    # 第二次发送晚了0.3秒，第三次仍按计划时刻101.0
+    clock.now = 100.8
+    assert [can_id for can_id, _ in scheduler.run_once()] == [0x310]
+    assert scheduler.next_deadline() == pytest.approx(101.0)
+    clock.now = 101.0
+    assert len(scheduler.run_once()) == 3
+
+    # 停顿2.2秒：0x310跳过错过的周期，下次按103.5
+    clock.now = 103.2
+    scheduler.run_once()
+    stats = {s.can_id: s for s in scheduler.statistics()}
+    assert stats[0x310].missed == 3
+    assert stats[0x310].max_lateness == pytest.approx(1.7)
+    assert scheduler.next_deadline() == pytest.approx(103.5)
+    assert stats[0x305].count == 3 and stats[0x305].mean_period == pytest.approx(1.6)
+
+
+def test_short_send_raises():
+    scheduler = TxScheduler(lambda frames: len(frames) - 1, clock=FakeClock())
+    scheduler.add(0x305, 1.0, bytes(8))
+    scheduler.add(0x307, 1.0, bytes(8))
+    with pytest.raises(Exception):
+        scheduler.run_once()
+
+
+def test_scheduler_thread_on_virtual_bus():
+    """10ms周期在虚拟总线上运行，平均周期接近标称值"""
+    sender = VirtualCANBus(channel='test_tx_scheduler')
+    receiver = VirtualCANBus(channel='test_tx_scheduler')
+    sender.connect()
+    receiver.connect()
+    sent = []
+    scheduler = TxScheduler(sender.send_many, on_sent=lambda frames, t: sent.extend(frames))
+    scheduler.add(0x305, 0.01, bytes(8))
+    try:
+        scheduler.start()
+        time.sleep(0.3)
+        scheduler.stop()
+        received = receiver.receive(timeout=10)
+    finally:
+        sender.disconnect()
+        receiver.disconnect()
+    stats = scheduler.statistics()[0]
+    assert 20 <= stats.count <= 32
+    assert stats.mean_period == pytest.approx(0.01, abs=0.003)
+    assert len(received) == len(sent) == stats.count
+
+
+if __name__ == "__main__":
+    test_absolute_deadlines()
+    test_short_send_raises()
+    test_scheduler_thread_on_virtual_bus()
+    print("全部测试通过")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试接收线程到界面线程的事件队列
+"""
+
+import threading
+
+from can_ui_queue import (UIEventQueue, coalesce_events, UI_LOG, UI_PARSED, UI_HEARTBEAT,
+                          UI_HEARTBEAT_TIMEOUT, UI_SENT)
+
+
+def test_bounded_queue_drops_oldest():
+    """队列满时丢弃最旧事件并计数"""
+    queue = UIEventQueue(capacity=4)
+    for i in range(10):
+        queue.put(UI_LOG, f"line {i}\n")
+    assert len(queue) == 4
+    assert queue.take_dropped() == 6
+    assert queue.take_dropped() == 0
+    assert [payload for _, payload in queue.drain(limit=2)] == ["line 6\n", "line 7\n"]
+    assert len(queue.drain()) == 2
+    assert queue.drain() == []
+
+
+def test_coalesce_last_value_wins():
+    """同一ID只保留最新解析结果，日志保持顺序，心跳取最后状态"""
+    events = [
+        (UI_PARSED, (0x211, {'battery_current': 1.0})),
+        (UI_LOG, "a\n"),
+        (UI_PARSED, (0x351, {'charge_voltage_limit': 56.0})),
+        (UI_HEARTBEAT, None),
+        (UI_PARSED, (0x211, {'battery_current': 2.0})),
+        (UI_HEARTBEAT_TIMEOUT, None),
+        (UI_SENT, None),
+        (UI_LOG, "b\n"),
+        (UI_SENT, None),
+    ]
+    logs, parsed, heartbeat, sent = coalesce_events(events)
+    assert logs == ["a\n", "b\n"]
+    assert parsed == {0x351: {'charge_voltage_limit': 56.0}, 0x211: {'battery_current': 2.0}}
+    assert list(parsed) == [0x351, 0x211]
+    assert heartbeat == UI_HEARTBEAT_TIMEOUT
+    assert sent == 2
+
+
+def test_producer_consumer_threads():
+    """生产者线程写入的同时消费者不断取出，事件不丢不重"""
+    queue = UIEventQueue(capacity=100000)
+    total = 50000
+    received = []
+
+    def producer():
+        for i in range(total):
+            queue.put(UI_PARSED, (i, None))
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    while thread.is_alive() or len(queue):
+        received.extend(payload[0] for _, payload in queue.drain())
+    thread.join()
+    assert received == list(range(total))
+    assert queue.dropped == 0
+
+
+if __name__ == "__main__":
+    test_bounded_queue_drops_oldest()
+    test_coalesce_last_value_wins()
+    test_producer_consumer_threads()
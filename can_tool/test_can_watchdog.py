@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试周期报文超时监控
+"""
+
+import threading
+import time
+
+from can_watchdog import DeadlineWatchdog, build_watch_timeouts
+
+
+def test_watch_table_expands_battery_addresses():
+    """按电池地址编址的系列展开到每个地址"""
+    table = build_watch_timeouts({0x351: 3, 0x210: 2})
+    assert table[0x351] == 3
+    assert all(table[0x210 + addr] == 2 for addr in range(16))
+    assert 0x220 not in table
+
+
+def test_timeout_and_recovery_per_key():
+    """每个键独立超时和恢复，持续收到报文的键不超时"""
+    events = []
+    watchdog = DeadlineWatchdog({0x211: 1.0, 0x212: 1.0, 0x351: 3.0},
+                                lambda key, silence: events.append(('timeout', key, silence)),
+                                lambda key, downtime: events.append(('recovery', key, downtime)))
+    watchdog.feed(0x211, now=0.0)
+    watchdog.feed(0x212, now=0.0)
+    watchdog.feed(0x351, now=0.0)
+    watchdog.feed(0x7FF, now=0.0)  # 未配置的ID忽略
+
+    for t in range(1, 30):
+        now = t * 0.1
+        watchdog.feed(0x211, now)
+        watchdog.check(now)
+    assert events == [('timeout', 0x212, 1.0)]
+    assert watchdog.timed_out() == [0x212]
+    assert watchdog.check(3.0) == [0x351]
+
+    watchdog.feed(0x212, now=5.0)
+    assert events[-1] == ('recovery', 0x212, 5.0)
+    assert watchdog.next_deadline() is not None
+    assert watchdog.check(5.5) == [0x211]  # 2.9之后再没收到
+    assert watchdog.check(6.5) == [0x212]
+
+
+def test_thread_fires_without_receive_loop():
+    """监控线程在截止时间到达时自行触发，不依赖接收循环"""
+    fired = threading.Event()
+    watchdog = DeadlineWatchdog({0x351: 0.05}, lambda key, silence: fired.set())
+    watchdog.start()
+    try:
+        watchdog.feed(0x351)
+        start = time.monotonic()
+        assert fired.wait(1.0)
+        assert time.monotonic() - start >= 0.04
+    finally:
+        watchdog.stop()
+
+
+if __name__ == "__main__":
+    test_watch_table_expands_battery_addresses()
+    test_timeout_and_recovery_per_key()
+    test_thread_fires_without_receive_loop()
@@ -35,6 +35,13 @@ a = Analysis(
         'threading', 'time', 'json', 'os', 'functools', 'traceback', 'subprocess', 'ctypes',
         'datetime', 'struct',
         'can_tool.can_protocol_config', 'can_tool.lang_config', 'can_tool.can_host_computer',
+        'can_tool.can_frames', 'can_tool.can_backends', 'can_tool.can_batch_decoder',
+        'can_tool.can_ui_queue', 'can_tool.can_log_buffer', 'can_tool.can_capture',
+        'can_tool.can_statistics', 'can_tool.can_watchdog', 'can_tool.can_timeseries',
+        'can_tool.can_plot', 'can_tool.can_acquisition', 'can_tool.can_timebase',
+        'can_tool.can_acceptance', 'can_tool.can_dispatcher', 'can_tool.can_tx_scheduler',
+        'can_tool.can_trace_io', 'can_tool.can_headless', 'can_tool.can_offline_decode',
+        'can_tool.can_cell_analytics', 'can_tool.can_delta',
         'mobus_tool.main', 'mobus_tool.sunspec_protocol', 'mobus_tool.modbus_client',
         'mobus_tool.gui_components', 'mobus_tool.language_manager',
         'uart_test.uart_gui', 'uart_test.protocol', 'uart_test.uart_interface',